@@ -0,0 +1,231 @@
+"""
+权限检查微批处理模块
+
+把同一时刻大量并发的单条 check 调用合并成少量 BatchCheck 请求：
+- 在 max_delay 时间窗口内（默认 2ms）到达的调用进入同一批
+- 攒满 max_batch_size 条时立即发送，不再等待窗口结束
+- 每条结果通过 correlation_id 交还给对应的等待方
+
+作者: OpenFGA 集成示例
+日期: 2026-02-05
+"""
+
+import asyncio
+import time
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable
+
+from openfga_sdk import OpenFgaClient
+from openfga_sdk.client.models import (
+    ClientTuple,
+    ClientBatchCheckItem,
+    ClientBatchCheckRequest,
+)
+
+# 服务端单个 BatchCheck 请求默认允许的最大检查数
+SERVER_MAX_BATCH_SIZE = 50
+
+
+class BatchMetrics:
+    """
+    微批处理指标
+
+    记录批大小和排队等待时间（从调用进入队列到批次发出的时间）。
+    """
+
+    def __init__(self):
+        self.batches = 0
+        self.items = 0
+        self.max_batch_size = 0
+        self.full_batches = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.failed_batches = 0
+
+    def record_batch(self, size: int, waits: List[float], full: bool):
+        """记录一个已发出的批次"""
+        self.batches += 1
+        self.items += size
+        self.max_batch_size = max(self.max_batch_size, size)
+        if full:
+            self.full_batches += 1
+        self.total_queue_wait += sum(waits)
+        self.max_queue_wait = max(self.max_queue_wait, max(waits, default=0.0))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """导出当前指标"""
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': self.items / self.batches if self.batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'full_batches': self.full_batches,
+            'failed_batches': self.failed_batches,
+            'avg_queue_wait_ms': self.total_queue_wait / self.items * 1000 if self.items else 0.0,
+            'max_queue_wait_ms': self.max_queue_wait * 1000,
+        }
+
+
+class CheckBatcher:
+    """
+    权限检查微批处理器
+
+    submit() 把一条检查放入待发送队列并等待结果。队列在以下任一条件满足时发送：
+    1. 自第一条检查入队起经过了 max_delay 秒
+    2. 队列中的检查数达到 max_batch_size
+
+    不同 authorization_model_id 的检查会拆成不同的请求发送。
+    """
+
+    def __init__(
+        self,
+        client: OpenFgaClient,
+        max_batch_size: int = SERVER_MAX_BATCH_SIZE,
+        max_delay: float = 0.002,
+        max_parallel_requests: int = 10,
+        call: Optional[Callable[..., Awaitable]] = None
+    ):
+        """
+        初始化微批处理器
+
+        Args:
+            client: 已初始化的 OpenFgaClient
+            max_batch_size: 每批最多合并的检查数，超过服务端上限时由 SDK 拆分并行发送
+            max_delay: 第一条检查入队后最多等待的秒数（建议 0.001 ~ 0.005）
+            max_parallel_requests: 单批被拆分后最多同时发送的请求数
+            call: 发送请求的包装函数 call(endpoint, fn, weight=检查数)，如 OpenFGAClientWrapper._call，
+                用于让批次请求同样经过弹性策略和对冲；为 None 时直接发送
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size 必须大于 0")
+        if max_delay < 0:
+            raise ValueError("max_delay 不能为负数")
+
+        self.client = client
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_parallel_requests = max_parallel_requests
+        self.call = call
+        self.metrics = BatchMetrics()
+
+        # 待发送的检查：(检查项, 等待结果的 future, 入队时间, 模型 ID)
+        self._pending: List[Tuple[ClientBatchCheckItem, asyncio.Future, float, Optional[str]]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._dispatching: set = set()
+        self._closed = False
+
+    async def submit(
+        self,
+        user: str,
+        relation: str,
+        object: str,
+        contextual_tuples: Optional[List[ClientTuple]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        model_id: Optional[str] = None
+    ):
+        """
+        提交一条检查并等待结果
+
+        Returns:
+            BatchCheckSingleResponse，包含 allowed 和 error
+
+        Raises:
+            ApiException: 所在批次的请求失败时
+        """
+        if self._closed:
+            raise RuntimeError("CheckBatcher 已关闭")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        item = ClientBatchCheckItem(
+            user=user,
+            relation=relation,
+            object=object,
+            contextual_tuples=contextual_tuples,
+            context=context
+        )
+        self._pending.append((item, future, time.monotonic(), model_id))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush(full=True)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+
+        return await future
+
+    def _flush(self, full: bool = False):
+        """取出当前队列并在后台发送"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        sent_at = time.monotonic()
+        self.metrics.record_batch(len(batch), [sent_at - entry[2] for entry in batch], full)
+
+        # 按模型 ID 分组，每组一个请求
+        groups: Dict[Optional[str], list] = {}
+        for entry in batch:
+            groups.setdefault(entry[3], []).append(entry)
+
+        for model_id, entries in groups.items():
+            task = asyncio.ensure_future(self._dispatch(entries, model_id))
+            self._dispatching.add(task)
+            task.add_done_callback(self._dispatching.discard)
+
+    async def _dispatch(self, entries: list, model_id: Optional[str]):
+        """发送一组检查并把结果交还给各自的 future"""
+        futures: Dict[str, asyncio.Future] = {}
+        checks = []
+        for index, (item, future, _, _) in enumerate(entries):
+            item.correlation_id = str(index)
+            futures[item.correlation_id] = future
+            checks.append(item)
+
+        options: Dict[str, Any] = {
+            'max_batch_size': min(self.max_batch_size, SERVER_MAX_BATCH_SIZE),
+            'max_parallel_requests': self.max_parallel_requests
+        }
+        if model_id:
+            options['authorization_model_id'] = model_id
+
+        def send():
+            return self.client.batch_check(ClientBatchCheckRequest(checks=checks), options)
+
+        try:
+            if self.call is not None:
+                response = await self.call('batched_check', send, weight=len(checks))
+            else:
+                response = await send()
+        except Exception as e:
+            self.metrics.failed_batches += 1
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for result in response.result:
+            future = futures.pop(result.correlation_id, None)
+            if future is not None and not future.done():
+                future.set_result(result)
+
+        # 理论上不会出现：服务端漏掉了某些检查
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(RuntimeError("BatchCheck 响应中缺少该检查的结果"))
+
+    def stats(self) -> Dict[str, Any]:
+        """获取微批处理指标"""
+        stats = self.metrics.snapshot()
+        stats['pending'] = len(self._pending)
+        stats['in_flight_batches'] = len(self._dispatching)
+        return stats
+
+    async def close(self):
+        """发送剩余的检查并等待所有批次完成"""
+        self._closed = True
+        self._flush()
+        if self._dispatching:
+            await asyncio.gather(*self._dispatching, return_exceptions=True)
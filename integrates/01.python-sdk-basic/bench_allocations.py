@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+结果对象分配微基准
+
+对比返回字典的兼容接口（check_permission / batch_check）和轻量接口（check / check_many）
+在封装层的内存分配和耗时。使用不发网络请求的假客户端，只测量封装层本身的开销：
+- 每次检查保留的内存（调用方把结果保存下来时，tracemalloc 统计的字节数和内存块数）
+- 运行期间的 GC 次数
+- 每次检查的耗时
+
+使用方法:
+    python bench_allocations.py
+    python bench_allocations.py --iterations 50000 --batch-size 100
+
+不需要运行 OpenFGA 服务。
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Dict, Any, List, Callable, Awaitable
+
+from openfga_sdk.client.models import ClientCheckRequest
+
+from client import OpenFGAClientWrapper
+
+
+class FakeClient:
+    """立即返回预先构造好的响应的假 OpenFgaClient"""
+
+    def __init__(self):
+        self._response = SimpleNamespace(allowed=True)
+
+    async def check(self, body, options=None):
+        return self._response
+
+    async def client_batch_check(self, body, options=None):
+        return [SimpleNamespace(allowed=True, error=None, request=check) for check in body]
+
+
+def make_wrapper() -> OpenFGAClientWrapper:
+    """创建使用假客户端的封装（不进入 async with，不创建网络连接）"""
+    wrapper = OpenFGAClientWrapper(store_id='01HQXYZABCDEFGHJKMNPQRSTVW', api_token='bench')
+    wrapper.client = FakeClient()
+    return wrapper
+
+
+def gc_collections() -> int:
+    return sum(generation['collections'] for generation in gc.get_stats())
+
+
+async def measure(
+    name: str,
+    call: Callable[[], Awaitable[Any]],
+    iterations: int,
+    checks_per_call: int
+) -> Dict[str, Any]:
+    """
+    执行 iterations 次调用，统计每次检查的保留内存、GC 次数和耗时
+
+    结果全部保存在列表中（模拟调用方持有结果），以便 tracemalloc 统计到结果对象本身。
+    """
+    for _ in range(100):
+        await call()
+
+    # 内存：开启 tracemalloc 单独运行一次
+    gc.collect()
+    results: List[Any] = []
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(iterations):
+        results.append(await call())
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = [
+        stat for stat in after.compare_to(before, 'filename')
+        if not stat.traceback[0].filename.endswith('tracemalloc.py')
+    ]
+    total_checks = iterations * checks_per_call
+    size = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+    del results
+
+    # 耗时和 GC：不开启 tracemalloc 再运行一次
+    gc.collect()
+    results = []
+    collections = gc_collections()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        results.append(await call())
+    elapsed = time.perf_counter() - started
+    collections = gc_collections() - collections
+    del results
+
+    return {
+        'name': name,
+        'bytes_per_check': size / total_checks,
+        'blocks_per_check': blocks / total_checks,
+        'gc_collections': collections,
+        'us_per_check': elapsed / total_checks * 1e6
+    }
+
+
+async def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='对比字典结果和轻量结果的分配开销')
+    parser.add_argument(
+        '--iterations',
+        type=int,
+        default=20000,
+        help='单条检查的调用次数 (默认: 20000)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=50,
+        help='批量检查每次包含的检查数 (默认: 50)'
+    )
+    args = parser.parse_args()
+
+    wrapper = make_wrapper()
+    checks = [
+        ClientCheckRequest(user=f'user:{i}', relation='viewer', object=f'document:{i}')
+        for i in range(args.batch_size)
+    ]
+    batch_iterations = max(1, args.iterations // args.batch_size)
+
+    rows = [
+        await measure(
+            'check_permission (dict)',
+            lambda: wrapper.check_permission('user:anne', 'viewer', 'document:budget'),
+            args.iterations, 1
+        ),
+        await measure(
+            'check (bool)',
+            lambda: wrapper.check('user:anne', 'viewer', 'document:budget'),
+            args.iterations, 1
+        ),
+        await measure(
+            f'batch_check x{args.batch_size} (dict)',
+            lambda: wrapper.batch_check(checks),
+            batch_iterations, args.batch_size
+        ),
+        await measure(
+            f'check_many x{args.batch_size} (list)',
+            lambda: wrapper.check_many(checks),
+            batch_iterations, args.batch_size
+        ),
+    ]
+
+    print(f"{'接口':<28} {'字节/检查':>10} {'内存块/检查':>12} {'GC 次数':>8} {'微秒/检查':>10}")
+    for row in rows:
+        print(
+            f"{row['name']:<28} {row['bytes_per_check']:>10.1f} {row['blocks_per_check']:>12.2f} "
+            f"{row['gc_collections']:>8} {row['us_per_check']:>10.2f}"
+        )
+    print("\n说明: 使用假客户端，批量检查的数字包含假客户端构造响应列表的开销（两种接口相同）")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,354 @@
+"""
+批量元组写入模块
+
+把大量元组写入/删除拆成符合服务端限制的小块，并发执行：
+- 每块最多 chunk_size 个元组（OpenFGA 默认单次 Write 上限为 100）
+- 最多 max_parallel_requests 个块同时写入
+- 限流（429）、服务端错误（5xx）和网络错误按指数退避重试
+- 校验错误（400）自动二分拆块，定位到具体失败的元组
+- 认证失败、Store / 模型不存在等与元组无关的错误立即中止，不再拆块或写入其他块
+- 写入已存在的元组、删除不存在的元组通过 SDK 的冲突选项忽略（SDK 支持时）
+- 返回逐元组的结果报告
+
+作者: OpenFGA 集成示例
+日期: 2026-02-05
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from itertools import islice
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Tuple
+
+from openfga_sdk import OpenFgaClient
+from openfga_sdk.client.models import ClientTuple, ClientWriteRequest
+from openfga_sdk.rest import ApiException
+
+try:
+    from openfga_sdk.client.models import (
+        ConflictOptions,
+        ClientWriteRequestOnDuplicateWrites,
+        ClientWriteRequestOnMissingDeletes,
+    )
+except ImportError:  # 旧版本 openfga-sdk 没有写入冲突选项
+    ConflictOptions = None
+
+logger = logging.getLogger(__name__)
+
+# 服务端单次 Write 请求默认允许的最大元组数（写入与删除合计）
+SERVER_MAX_TUPLES_PER_WRITE = 100
+
+
+def _tuple_to_dict(t: ClientTuple) -> Dict[str, str]:
+    """把 ClientTuple 转换为报告中使用的字典"""
+    return {'user': t.user, 'relation': t.relation, 'object': t.object}
+
+
+def _is_retryable(error: Exception) -> bool:
+    """限流、服务端错误和网络错误可以重试，其余错误重试也不会成功"""
+    if isinstance(error, ApiException):
+        return error.status == 429 or (error.status or 0) >= 500
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError, OSError)) or \
+        type(error).__module__.startswith('aiohttp')
+
+
+# 与具体元组无关的错误：认证失败、无权限、Store 不存在
+_FATAL_STATUSES = {401, 403, 404}
+# 同样与元组无关、但服务端以 400 返回的错误码
+_FATAL_ERROR_CODES = {
+    'store_id_invalid',
+    'authorization_model_not_found',
+    'latest_authorization_model_not_found',
+    'invalid_authorization_model',
+}
+
+
+class BulkWriteAborted(Exception):
+    """遇到与元组无关的错误，继续写入其他块也不会成功"""
+
+    def __init__(self, error: Exception):
+        super().__init__(str(error))
+        self.error = error
+        self.status = getattr(error, 'status', None)
+
+
+def _error_code(error: ApiException) -> Optional[str]:
+    """服务端错误响应中的 code 字段"""
+    code = getattr(error, 'code', None)
+    if code:
+        return code
+    try:
+        return json.loads(error.body).get('code')
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _is_fatal(error: Exception) -> bool:
+    """认证、Store、授权模型类错误：应中止整个写入"""
+    if not isinstance(error, ApiException):
+        return False
+    return error.status in _FATAL_STATUSES or _error_code(error) in _FATAL_ERROR_CODES
+
+
+def _is_validation_error(error: Exception) -> bool:
+    """校验错误（400）：块中某个元组无效，拆块可以定位到它"""
+    return isinstance(error, ApiException) and error.status == 400
+
+
+def _is_noop_conflict(error: Exception, operation: str) -> bool:
+    """
+    写入已存在的元组、删除不存在的元组：结果已经是期望的状态
+
+    只在 SDK 不支持写入冲突选项时使用，按错误信息匹配。
+    """
+    if not isinstance(error, ApiException):
+        return False
+    body = str(error.body or '')
+    if operation == 'write':
+        return 'already exists' in body
+    return 'does not exist' in body
+
+
+class BulkTupleWriter:
+    """
+    批量元组写入器
+
+    writes / deletes 可以是任意可迭代对象（包括生成器），按块惰性读取，
+    写入 50 万个元组时不需要先把它们全部放进内存。
+
+    注意：块与块之间不是事务，部分块失败时其他块的修改仍然生效，
+    需要根据报告中的 failed 列表处理失败的元组。
+    """
+
+    def __init__(
+        self,
+        client: OpenFgaClient,
+        chunk_size: int = SERVER_MAX_TUPLES_PER_WRITE,
+        max_parallel_requests: int = 10,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 10.0,
+        ignore_noop_conflicts: bool = True,
+        model_id: Optional[str] = None
+    ):
+        """
+        初始化批量写入器
+
+        Args:
+            client: 已初始化的 OpenFgaClient
+            chunk_size: 每个 Write 请求包含的元组数，不能超过服务端限制
+            max_parallel_requests: 最多同时进行的 Write 请求数
+            max_retries: 可重试错误的最大重试次数
+            backoff_base: 第一次重试前的等待秒数，之后每次翻倍（带随机抖动）
+            backoff_max: 单次重试等待的上限秒数
+            ignore_noop_conflicts: 把“写入已存在的元组 / 删除不存在的元组”视为成功，
+                便于重试和重复导入保持幂等；SDK 支持时通过 on_duplicate / on_missing 冲突选项交给服务端处理
+            model_id: 可选的授权模型 ID
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size 必须大于 0")
+        if max_parallel_requests < 1:
+            raise ValueError("max_parallel_requests 必须大于 0")
+
+        self.client = client
+        self.chunk_size = chunk_size
+        self.max_parallel_requests = max_parallel_requests
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.ignore_noop_conflicts = ignore_noop_conflicts
+        self.model_id = model_id
+
+    async def write(
+        self,
+        writes: Optional[Iterable[ClientTuple]] = None,
+        deletes: Optional[Iterable[ClientTuple]] = None,
+        include_succeeded: bool = False
+    ) -> Dict[str, Any]:
+        """
+        批量写入和删除元组（先写入，后删除）
+
+        Args:
+            writes: 要写入的元组
+            deletes: 要删除的元组
+            include_succeeded: 报告中是否包含成功元组的列表（元组很多时会占用较多内存）
+
+        Returns:
+            报告字典：
+            - success: 是否全部成功
+            - written / deleted: 成功写入 / 删除的元组数
+            - failed: 失败的元组列表，每项包含 operation, tuple, error, status
+            - succeeded: 成功的元组列表（仅 include_succeeded=True 时）
+            - requests / retries / splits: 发送的请求数、重试次数、拆块次数
+            - aborted: 因认证、Store 或模型错误中止时的 {'error', 'status'}，未写入的元组不在 failed 中
+            - elapsed / tuples_per_second: 耗时和吞吐量
+        """
+        report = self._new_report(include_succeeded)
+
+        started = time.monotonic()
+
+        for operation, tuples in (('write', writes), ('delete', deletes)):
+            if tuples is None:
+                continue
+            chunks = self._chunks(operation, tuples)
+            workers = [
+                asyncio.create_task(self._worker(chunks, report))
+                for _ in range(self.max_parallel_requests)
+            ]
+            try:
+                await asyncio.gather(*workers)
+            except BulkWriteAborted as e:
+                for worker in workers:
+                    worker.cancel()
+                logger.error(f"批量写入中止: {e}")
+                report['aborted'] = {'error': str(e), 'status': e.status}
+                break
+            except BaseException:
+                for worker in workers:
+                    worker.cancel()
+                raise
+
+        elapsed = time.monotonic() - started
+        total = report['written'] + report['deleted']
+        report['success'] = not report['failed'] and 'aborted' not in report
+        report['elapsed'] = elapsed
+        report['tuples_per_second'] = total / elapsed if elapsed > 0 else 0.0
+
+        logger.info(
+            f"批量写入完成: 写入 {report['written']}, 删除 {report['deleted']}, "
+            f"失败 {len(report['failed'])}, 请求 {report['requests']}, 耗时 {elapsed:.2f}s"
+        )
+        return report
+
+    async def write_chunk(
+        self,
+        operation: str,
+        chunk: List[ClientTuple],
+        include_succeeded: bool = False
+    ) -> Dict[str, Any]:
+        """
+        写入单个块并返回该块的报告，供自定义的写入流水线使用
+
+        Args:
+            operation: 'write' 或 'delete'
+            chunk: 不超过 chunk_size 个元组
+            include_succeeded: 报告中是否包含成功元组的列表
+
+        Returns:
+            与 write() 相同结构的报告（不含 aborted / elapsed / tuples_per_second）
+
+        Raises:
+            BulkWriteAborted: 认证失败、Store 或授权模型不存在等与元组无关的错误，该块没有写入
+        """
+        report = self._new_report(include_succeeded)
+        await self._write_chunk(operation, chunk, report)
+        report['success'] = not report['failed']
+        return report
+
+    @staticmethod
+    def _new_report(include_succeeded: bool) -> Dict[str, Any]:
+        """创建空的结果报告"""
+        report: Dict[str, Any] = {
+            'success': True,
+            'written': 0,
+            'deleted': 0,
+            'failed': [],
+            'requests': 0,
+            'retries': 0,
+            'splits': 0
+        }
+        if include_succeeded:
+            report['succeeded'] = []
+        return report
+
+    def _chunks(
+        self,
+        operation: str,
+        tuples: Iterable[ClientTuple]
+    ) -> Iterator[Tuple[str, List[ClientTuple]]]:
+        """按 chunk_size 惰性切块"""
+        iterator = iter(tuples)
+        while True:
+            chunk = list(islice(iterator, self.chunk_size))
+            if not chunk:
+                return
+            yield operation, chunk
+
+    async def _worker(self, chunks: Iterator[Tuple[str, List[ClientTuple]]], report: Dict[str, Any]):
+        """从共享的块迭代器中取块写入，直到取完"""
+        # 单线程事件循环中 next() 不会被打断，多个 worker 共享迭代器是安全的
+        for operation, chunk in chunks:
+            await self._write_chunk(operation, chunk, report)
+
+    async def _write_chunk(self, operation: str, chunk: List[ClientTuple], report: Dict[str, Any]):
+        """写入一个块：可重试错误退避重试，校验错误二分拆块，与元组无关的错误中止"""
+        options: Dict[str, Any] = {}
+        if self.model_id:
+            options['authorization_model_id'] = self.model_id
+        if self.ignore_noop_conflicts and ConflictOptions is not None:
+            options['conflict'] = ConflictOptions(
+                on_duplicate_writes=ClientWriteRequestOnDuplicateWrites.IGNORE,
+                on_missing_deletes=ClientWriteRequestOnMissingDeletes.IGNORE
+            )
+
+        if operation == 'write':
+            body = ClientWriteRequest(writes=chunk)
+        else:
+            body = ClientWriteRequest(deletes=chunk)
+
+        attempt = 0
+        while True:
+            report['requests'] += 1
+            try:
+                await self.client.write(body, options)
+                self._record_success(operation, chunk, report)
+                return
+            except Exception as e:
+                error = e
+
+            if _is_retryable(error) and attempt < self.max_retries:
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                delay *= random.uniform(0.5, 1.0)
+                attempt += 1
+                report['retries'] += 1
+                logger.warning(f"写入块失败，{delay:.2f}s 后第 {attempt} 次重试: {error}")
+                await asyncio.sleep(delay)
+                continue
+            break
+
+        if _is_fatal(error):
+            raise BulkWriteAborted(error) from error
+
+        # 单个块是一个事务，一个元组无效会导致整块失败，拆开以找出真正出错的元组
+        if _is_validation_error(error) and len(chunk) > 1:
+            report['splits'] += 1
+            middle = len(chunk) // 2
+            await self._write_chunk(operation, chunk[:middle], report)
+            await self._write_chunk(operation, chunk[middle:], report)
+            return
+
+        if self.ignore_noop_conflicts and ConflictOptions is None and _is_noop_conflict(error, operation):
+            self._record_success(operation, chunk, report)
+            return
+
+        for t in chunk:
+            report['failed'].append({
+                'operation': operation,
+                'tuple': _tuple_to_dict(t),
+                'error': str(error),
+                'status': getattr(error, 'status', None)
+            })
+
+    @staticmethod
+    def _record_success(operation: str, chunk: List[ClientTuple], report: Dict[str, Any]):
+        """记录成功的块"""
+        if operation == 'write':
+            report['written'] += len(chunk)
+        else:
+            report['deleted'] += len(chunk)
+        if 'succeeded' in report:
+            report['succeeded'].extend(
+                {'operation': operation, 'tuple': _tuple_to_dict(t)} for t in chunk
+            )
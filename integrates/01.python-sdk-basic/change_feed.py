@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+关系元组变更订阅模块
+
+基于 ReadChanges API 持续拉取 Store 中的元组变更，按批分发给可插拔的下游（sink）：
+- 翻页令牌持久化到文件，进程重启后从上次的位置继续
+- 所有 sink 处理成功后才推进令牌，保证每条变更至少投递一次
+- 没有新变更时自适应退避，拉取间隔逐步增大到 max_interval；有变更时立即恢复
+
+内置 sink：
+- InvalidationSink: 对每条变更调用失效函数，例如 PermissionCache.invalidate_tuple
+- TupleReplicaSink: 在内存中维护元组副本
+- JsonlFileSink: 追加写入 JSONL 审计文件
+
+使用方法:
+    python change_feed.py --token-file .changes.token --output changes.jsonl
+    python change_feed.py --type document
+
+作者: OpenFGA 集成示例
+日期: 2026-02-05
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+from typing import Optional, Dict, Any, List, Callable, Set, Tuple
+
+from openfga_sdk import OpenFgaClient
+from openfga_sdk.client.models import ClientReadChangesRequest
+
+logger = logging.getLogger(__name__)
+
+# sink 接收一批变更事件，可以是同步或异步函数
+Sink = Callable[[List[Dict[str, Any]]], Any]
+
+
+def change_to_event(change) -> Dict[str, Any]:
+    """
+    把 ReadChanges 返回的 TupleChange 转换为事件字典
+
+    Returns:
+        包含 'operation'（'write' 或 'delete'）, 'user', 'relation', 'object', 'timestamp'，
+        带条件时包含 'condition'
+    """
+    operation = getattr(change.operation, 'value', change.operation)
+    key = change.tuple_key
+    event = {
+        'operation': 'delete' if operation == 'TUPLE_OPERATION_DELETE' else 'write',
+        'user': key.user,
+        'relation': key.relation,
+        'object': key.object,
+        'timestamp': change.timestamp.isoformat() if change.timestamp else None
+    }
+    if getattr(key, 'condition', None):
+        event['condition'] = {'name': key.condition.name, 'context': key.condition.context}
+    return event
+
+
+class FileTokenStore:
+    """把翻页令牌保存在本地文件中（原子替换写入）"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Optional[str]:
+        """读取令牌，文件不存在时返回 None"""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+
+    def save(self, token: str):
+        """保存令牌"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(token)
+        os.replace(tmp_path, self.path)
+
+
+class MemoryTokenStore:
+    """只保存在内存中的令牌（进程重启后从头开始）"""
+
+    def __init__(self, token: Optional[str] = None):
+        self.token = token
+
+    def load(self) -> Optional[str]:
+        """读取令牌"""
+        return self.token
+
+    def save(self, token: str):
+        """保存令牌"""
+        self.token = token
+
+
+class InvalidationSink:
+    """
+    对每条变更调用失效函数
+
+    示例:
+        cache = PermissionCache()
+        sink = InvalidationSink(cache.invalidate_tuple)
+    """
+
+    def __init__(self, invalidate: Callable[[str, str, str], Any]):
+        """
+        Args:
+            invalidate: invalidate(user, relation, object)，可以是同步或异步函数
+        """
+        self.invalidate = invalidate
+
+    async def __call__(self, events: List[Dict[str, Any]]):
+        for event in events:
+            result = self.invalidate(event['user'], event['relation'], event['object'])
+            if inspect.isawaitable(result):
+                await result
+
+
+class TupleReplicaSink:
+    """在内存中维护元组副本，按变更顺序应用写入和删除"""
+
+    def __init__(self):
+        self.tuples: Set[Tuple[str, str, str]] = set()
+
+    async def __call__(self, events: List[Dict[str, Any]]):
+        for event in events:
+            key = (event['user'], event['relation'], event['object'])
+            if event['operation'] == 'write':
+                self.tuples.add(key)
+            else:
+                self.tuples.discard(key)
+
+    def __contains__(self, key: Tuple[str, str, str]) -> bool:
+        return key in self.tuples
+
+    def __len__(self) -> int:
+        return len(self.tuples)
+
+
+class JsonlFileSink:
+    """把变更事件追加写入 JSONL 文件（在线程池中写入，不阻塞事件循环）"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def __call__(self, events: List[Dict[str, Any]]):
+        lines = "".join(json.dumps(event, ensure_ascii=False) + "\n" for event in events)
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines: str):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class ChangeFeedFollower:
+    """
+    ReadChanges 变更订阅器
+
+    每轮拉取一页变更，依次交给所有 sink，全部成功后保存新的令牌。
+    sink 失败时不推进令牌，退避后重新投递同一批变更（至少一次语义，sink 需要幂等）。
+    """
+
+    def __init__(
+        self,
+        client: OpenFgaClient,
+        sinks: List[Sink],
+        token_store=None,
+        object_type: Optional[str] = None,
+        page_size: int = 100,
+        min_interval: float = 0.5,
+        max_interval: float = 30.0,
+        backoff_factor: float = 2.0,
+        start_time: Optional[str] = None
+    ):
+        """
+        初始化变更订阅器
+
+        Args:
+            client: 已初始化的 OpenFgaClient
+            sinks: 变更事件的下游列表，每个 sink 接收一批事件
+            token_store: 令牌存储（FileTokenStore / MemoryTokenStore），默认只保存在内存中
+            object_type: 只订阅该对象类型的变更（可选，默认所有类型）
+            page_size: 每次拉取的最大变更数（OpenFGA 上限为 100）
+            min_interval: 有变更时的拉取间隔（秒）
+            max_interval: 没有变更时退避的最大间隔（秒）
+            backoff_factor: 每次空轮询后间隔的放大倍数
+            start_time: 没有令牌时从该时间开始读取（RFC3339，可选）
+        """
+        self.client = client
+        self.sinks = list(sinks)
+        self.token_store = token_store or MemoryTokenStore()
+        self.object_type = object_type
+        self.page_size = page_size
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.start_time = start_time
+
+        self.token: Optional[str] = self.token_store.load()
+        self.interval = min_interval
+        self._stop = asyncio.Event()
+
+        self.polls = 0
+        self.empty_polls = 0
+        self.events = 0
+        self.errors = 0
+        self.last_event_time: Optional[str] = None
+
+    async def poll_once(self) -> int:
+        """
+        拉取并投递一页变更
+
+        Returns:
+            本次投递的事件数
+
+        Raises:
+            ApiException: 拉取失败时
+            Exception: sink 处理失败时（令牌不会推进）
+        """
+        options: Dict[str, Any] = {'page_size': self.page_size}
+        if self.token:
+            options['continuation_token'] = self.token
+
+        # 已有令牌时 start_time 会被忽略
+        body = ClientReadChangesRequest(
+            type=self.object_type,
+            start_time=None if self.token else self.start_time
+        )
+        response = await self.client.read_changes(body, options)
+        self.polls += 1
+
+        events = [change_to_event(change) for change in response.changes or []]
+        if events:
+            for sink in self.sinks:
+                result = sink(events)
+                if inspect.isawaitable(result):
+                    await result
+            self.events += len(events)
+            self.last_event_time = events[-1]['timestamp']
+        else:
+            self.empty_polls += 1
+
+        # 没有新变更时服务端也会返回令牌，同样需要保存
+        if response.continuation_token and response.continuation_token != self.token:
+            self.token = response.continuation_token
+            self.token_store.save(self.token)
+
+        return len(events)
+
+    async def run(self):
+        """持续拉取变更，直到调用 stop()"""
+        logger.info(f"开始订阅变更: type={self.object_type or '*'}, token={self.token}")
+
+        while not self._stop.is_set():
+            try:
+                count = await self.poll_once()
+            except Exception as e:
+                self.errors += 1
+                self.interval = min(self.max_interval, max(self.interval, self.min_interval) * self.backoff_factor)
+                logger.error(f"拉取或投递变更失败，{self.interval:.1f}s 后重试: {e}")
+            else:
+                if count >= self.page_size:
+                    # 还有积压，立即拉取下一页
+                    self.interval = 0
+                elif count > 0:
+                    self.interval = self.min_interval
+                else:
+                    self.interval = min(
+                        self.max_interval,
+                        max(self.interval, self.min_interval) * self.backoff_factor
+                    )
+
+            if self.interval > 0:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+
+        logger.info("变更订阅已停止")
+
+    def stop(self):
+        """停止订阅（当前这一轮完成后退出 run()）"""
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取订阅统计信息"""
+        return {
+            'polls': self.polls,
+            'empty_polls': self.empty_polls,
+            'events': self.events,
+            'errors': self.errors,
+            'interval': self.interval,
+            'token': self.token,
+            'last_event_time': self.last_event_time
+        }
+
+
+async def main():
+    """主函数：把变更打印到终端，或追加写入 JSONL 文件"""
+    from client import create_client
+
+    parser = argparse.ArgumentParser(description='OpenFGA 元组变更订阅')
+    parser.add_argument('--type', help='只订阅指定对象类型的变更')
+    parser.add_argument(
+        '--token-file',
+        default='.changes.token',
+        help='翻页令牌文件 (默认: .changes.token)'
+    )
+    parser.add_argument('--output', help='追加写入变更事件的 JSONL 文件（默认打印到终端）')
+    parser.add_argument('--start-time', help='没有令牌时的起始时间（RFC3339）')
+    parser.add_argument(
+        '--max-interval',
+        type=float,
+        default=30.0,
+        help='没有变更时的最大拉取间隔秒数 (默认: 30)'
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    def print_events(events: List[Dict[str, Any]]):
+        for event in events:
+            sign = '+' if event['operation'] == 'write' else '-'
+            print(f"{event['timestamp']} {sign} {event['user']} -> {event['relation']} -> {event['object']}")
+
+    sinks: List[Sink] = [JsonlFileSink(args.output) if args.output else print_events]
+
+    async with create_client() as wrapper:
+        follower = ChangeFeedFollower(
+            wrapper.client,
+            sinks,
+            token_store=FileTokenStore(args.token_file),
+            object_type=args.type,
+            max_interval=args.max_interval,
+            start_time=args.start_time
+        )
+        try:
+            await follower.run()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            print(f"\n统计: {follower.stats()}")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
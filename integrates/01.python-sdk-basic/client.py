@@ -10,14 +10,37 @@ OpenFGA 客户端初始化和基础操作模块
 """
 
 import os
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterable, AsyncIterator
 from dotenv import load_dotenv
 
-from openfga_sdk import ClientConfiguration, OpenFgaClient
+from openfga_sdk import ClientConfiguration, OpenFgaClient, ReadRequestTupleKey
 from openfga_sdk.credentials import Credentials, CredentialConfiguration
-from openfga_sdk.client.models import ClientTuple, ClientWriteRequest, ClientCheckRequest
+from openfga_sdk.client.models import (
+    ClientTuple, ClientWriteRequest, ClientCheckRequest, ClientReadChangesRequest,
+    ClientListObjectsRequest, ClientExpandRequest
+)
+from openfga_sdk.client.models.list_users_request import ClientListUsersRequest
+from openfga_sdk.models import FgaObject, UserTypeFilter
+from openfga_sdk.configuration import RetryParams
 from openfga_sdk.rest import ApiException
 
+from batching import CheckBatcher
+from bulk import BulkTupleWriter, SERVER_MAX_TUPLES_PER_WRITE
+from resilience import ResiliencePolicy, ResilienceError
+from hedging import HedgingPolicy
+
+# 允许对冲的接口（幂等且延迟敏感）；batched_check 是微批处理合并后的 BatchCheck 请求
+HEDGED_ENDPOINTS = {'check', 'batch_check', 'batched_check'}
+
+
+class CheckError(Exception):
+    """单条检查在服务端返回了错误（批量检查或微批处理中的某一项）"""
+
+    def __init__(self, message: str, response=None, index: Optional[int] = None):
+        super().__init__(message)
+        self.response = response
+        self.index = index
+
 
 class OpenFGAClientWrapper:
     """
@@ -38,6 +61,12 @@ class OpenFGAClientWrapper:
         api_audience: Optional[str] = None,
         client_id: Optional[str] = None,
         client_secret: Optional[str] = None,
+        batch_checks: bool = False,
+        batch_max_size: int = 50,
+        batch_max_delay: float = 0.002,
+        resilience: Optional[ResiliencePolicy] = None,
+        hedging: Optional[HedgingPolicy] = None,
+        backend=None,
     ):
         """
         初始化 OpenFGA 客户端
@@ -52,6 +81,15 @@ class OpenFGAClientWrapper:
             api_audience: API 受众（当 auth_method='client_credentials' 时使用）
             client_id: 客户端 ID（当 auth_method='client_credentials' 时使用）
             client_secret: 客户端密钥（当 auth_method='client_credentials' 时使用）
+            batch_checks: 是否启用微批处理，开启后并发的 check_permission 调用会合并为 BatchCheck 请求
+            batch_max_size: 微批处理每批最多合并的检查数
+            batch_max_delay: 微批处理的最大等待时间（秒），建议 0.001 ~ 0.005
+            resilience: 弹性策略（重试、时间预算、熔断），设置后 SDK 自带的重试会被关闭；
+                微批处理的 BatchCheck 请求以接口名 'batched_check' 经过同一策略
+            hedging: 对冲策略，check_permission / batch_check 的慢请求会再发送一次，先返回的生效；
+                开启 batch_checks 时对冲的是合并后的整个 BatchCheck 请求（接口名 'batched_check'）
+            backend: 替代 OpenFgaClient 的后端（如 local_eval.LocalOpenFgaClient），
+                设置后不连接 OpenFGA 服务，也不需要 Store ID 和凭证
         """
         # 加载环境变量
         load_dotenv()
@@ -62,13 +100,18 @@ class OpenFGAClientWrapper:
         self.model_id = model_id or os.getenv('FGA_MODEL_ID')
         self.auth_method = auth_method or os.getenv('FGA_AUTH_METHOD', 'api_token')
 
+        self.backend = backend
+
         # 验证必需参数
-        if not self.store_id:
+        if not self.store_id and backend is None:
             raise ValueError("Store ID 是必需的，请通过参数或环境变量 FGA_STORE_ID 提供")
 
         # 根据认证方式配置凭证
         credentials = None
-        if self.auth_method == 'api_token':
+        if backend is not None:
+            # 本地后端不发送网络请求
+            pass
+        elif self.auth_method == 'api_token':
             token = api_token or os.getenv('FGA_API_TOKEN')
             if not token:
                 raise ValueError("使用 API Token 认证时，必须提供 api_token 或设置环境变量 FGA_API_TOKEN")
@@ -102,27 +145,81 @@ class OpenFGAClientWrapper:
         else:
             raise ValueError(f"不支持的认证方式: {self.auth_method}")
 
+        # 弹性策略和对冲策略：所有请求都经过 self._call()
+        self.resilience = resilience
+        self.hedging = hedging
+
         # 创建客户端配置
         self.configuration = ClientConfiguration(
             api_url=self.api_url,
             store_id=self.store_id,
             authorization_model_id=self.model_id,
-            credentials=credentials
+            credentials=credentials,
+            # 由弹性策略统一重试，避免 SDK 内部重试叠加后超出时间预算
+            retry_params=RetryParams(max_retry=0) if resilience else None
         )
 
         # 客户端实例（将在 async with 中创建）
         self.client: Optional[OpenFgaClient] = None
 
+        # 微批处理配置（批处理器将在 async with 中创建）
+        self.batch_checks = batch_checks
+        self.batch_max_size = batch_max_size
+        self.batch_max_delay = batch_max_delay
+        self.batcher: Optional[CheckBatcher] = None
+
     async def __aenter__(self):
         """异步上下文管理器入口"""
-        self.client = OpenFgaClient(self.configuration)
+        self.client = self.backend if self.backend is not None else OpenFgaClient(self.configuration)
+        if self.batch_checks:
+            self.batcher = CheckBatcher(
+                self.client,
+                max_batch_size=self.batch_max_size,
+                max_delay=self.batch_max_delay,
+                # 批次请求同样经过弹性策略（SDK 自带的重试已关闭）
+                call=self._call
+            )
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """异步上下文管理器出口"""
+        if self.batcher:
+            await self.batcher.close()
+            self.batcher = None
         if self.client:
             await self.client.close()
 
+    async def _call(self, endpoint: str, fn, idempotent: bool = True, weight: int = 1):
+        """
+        通过弹性策略发送请求，未配置策略时直接发送
+
+        对冲在重试之内：每次重试本身都可能被对冲。
+
+        Args:
+            endpoint: 接口名（用于熔断和统计）
+            fn: 发起请求的无参函数，返回协程
+            idempotent: 是否幂等，只有幂等请求才会重试
+            weight: 请求包含的检查数，对冲一个批量请求会重发其中全部检查，对冲预算按检查数扣除
+        """
+        if self.hedging is not None and idempotent and endpoint in HEDGED_ENDPOINTS:
+            request = fn
+
+            def fn():
+                return self.hedging.run(endpoint, request, weight=weight)
+
+        if self.resilience is None:
+            return await fn()
+        return await self.resilience.call(endpoint, fn, idempotent=idempotent)
+
+    def batch_stats(self) -> Dict[str, Any]:
+        """
+        获取微批处理指标
+
+        Returns:
+            包含批次数、平均/最大批大小、平均/最大排队等待时间的字典；未启用微批处理时为空字典
+        """
+        return self.batcher.stats() if self.batcher else {}
+
     async def write_tuples(
         self,
         writes: Optional[List[ClientTuple]] = None,
@@ -147,21 +244,12 @@ class OpenFGAClientWrapper:
             raise RuntimeError("客户端未初始化，请使用 async with 语句")
 
         try:
-            options = {}
-            if model_id:
-                options['authorization_model_id'] = model_id
-
-            body = ClientWriteRequest(
-                writes=writes or [],
-                deletes=deletes or []
-            )
-
-            response = await self.client.write(body, options)
+            response = await self._write(writes, deletes, model_id)
             return {
                 'success': True,
                 'response': response
             }
-        except ApiException as e:
+        except (ApiException, ResilienceError) as e:
             return {
                 'success': False,
                 'error': str(e),
@@ -169,6 +257,112 @@ class OpenFGAClientWrapper:
                 'body': e.body
             }
 
+    async def write_tuples_bulk(
+        self,
+        writes: Optional[Iterable[ClientTuple]] = None,
+        deletes: Optional[Iterable[ClientTuple]] = None,
+        chunk_size: int = SERVER_MAX_TUPLES_PER_WRITE,
+        max_parallel_requests: int = 10,
+        max_retries: int = 3,
+        include_succeeded: bool = False,
+        model_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        批量写入或删除大量关系元组
+
+        与 write_tuples 不同，元组会被拆成不超过服务端限制的块并发写入，
+        块与块之间不是事务。适用于租户初始化、数据迁移等一次写入成千上万个元组的场景。
+
+        Args:
+            writes: 要写入的元组（可以是生成器）
+            deletes: 要删除的元组（可以是生成器）
+            chunk_size: 每个 Write 请求包含的元组数
+            max_parallel_requests: 最多同时进行的 Write 请求数
+            max_retries: 限流、服务端错误和网络错误的最大重试次数
+            include_succeeded: 报告中是否列出成功的元组
+            model_id: 可选的授权模型 ID
+
+        Returns:
+            逐元组的结果报告，包括 'success', 'written', 'deleted', 'failed' 等
+
+        Example:
+            report = await client.write_tuples_bulk(writes=tuples)
+            for item in report['failed']:
+                print(item['tuple'], item['error'])
+        """
+        if not self.client:
+            raise RuntimeError("客户端未初始化，请使用 async with 语句")
+
+        writer = BulkTupleWriter(
+            self.client,
+            chunk_size=chunk_size,
+            max_parallel_requests=max_parallel_requests,
+            max_retries=max_retries,
+            model_id=model_id
+        )
+        return await writer.write(writes, deletes, include_succeeded=include_succeeded)
+
+    async def iter_tuples(
+        self,
+        user: Optional[str] = None,
+        relation: Optional[str] = None,
+        object: Optional[str] = None,
+        page_size: int = 100
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        逐页读取关系元组
+
+        自动跟随 continuation_token 读取所有分页，每次只在内存中保留一页，
+        适合导出或遍历大型 Store。不传任何过滤条件时读取整个 Store。
+
+        Args:
+            user: 用户标识符（可选）
+            relation: 关系类型（可选）
+            object: 对象标识符，可以只写类型（如 'document:'，此时必须同时指定 user）
+            page_size: 每页元组数（OpenFGA 上限为 100）
+
+        Yields:
+            元组字典，包含 'user', 'relation', 'object', 'timestamp'，带条件时包含 'condition'
+
+        Raises:
+            ApiException: 当 API 调用失败时
+
+        Example:
+            async for t in client.iter_tuples(object='document:budget'):
+                print(t['user'], t['relation'])
+        """
+        if not self.client:
+            raise RuntimeError("客户端未初始化，请使用 async with 语句")
+
+        body = ReadRequestTupleKey(user=user, relation=relation, object=object)
+        continuation_token = None
+
+        while True:
+            options: Dict[str, Any] = {'page_size': page_size}
+            if continuation_token:
+                options['continuation_token'] = continuation_token
+
+            # SDK 的 read() 会从 options 中取走分页参数，重试时需要传入新的副本
+            response = await self._call('read', lambda: self.client.read(body, dict(options)))
+
+            for t in response.tuples or []:
+                item = {
+                    'user': t.key.user,
+                    'relation': t.key.relation,
+                    'object': t.key.object,
+                    'timestamp': t.timestamp.isoformat() if t.timestamp else None
+                }
+                if t.key.condition:
+                    item['condition'] = {
+                        'name': t.key.condition.name,
+                        'context': t.key.condition.context
+                    }
+                yield item
+
+            continuation_token = response.continuation_token
+            if not continuation_token:
+                return
+
     async def check_permission(
         self,
         user: str,
@@ -181,6 +375,8 @@ class OpenFGAClientWrapper:
         """
         检查用户是否有权限访问对象
 
+        启用微批处理时，该调用会与同一时间窗口内的其他调用合并为一次 BatchCheck 请求。
+
         Args:
             user: 用户标识符（如 'user:anne'）
             relation: 关系类型（如 'reader', 'writer'）
@@ -199,25 +395,19 @@ class OpenFGAClientWrapper:
             raise RuntimeError("客户端未初始化，请使用 async with 语句")
 
         try:
-            options = {}
-            if model_id:
-                options['authorization_model_id'] = model_id
-
-            body = ClientCheckRequest(
-                user=user,
-                relation=relation,
-                object=object,
-                contextual_tuples=contextual_tuples,
-                context=context
-            )
-
-            response = await self.client.check(body, options)
+            response = await self._check(user, relation, object, contextual_tuples, context, model_id)
             return {
                 'success': True,
                 'allowed': response.allowed,
                 'response': response
             }
-        except ApiException as e:
+        except CheckError as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'response': e.response
+            }
+        except (ApiException, ResilienceError) as e:
             return {
                 'success': False,
                 'error': str(e),
@@ -247,11 +437,7 @@ class OpenFGAClientWrapper:
             raise RuntimeError("客户端未初始化，请使用 async with 语句")
 
         try:
-            options = {}
-            if model_id:
-                options['authorization_model_id'] = model_id
-
-            response = await self.client.batch_check(checks, options)
+            response = await self._batch_check(checks, model_id)
             return {
                 'success': True,
                 'responses': response,
@@ -265,7 +451,7 @@ class OpenFGAClientWrapper:
                     for check, resp in zip(checks, response)
                 ]
             }
-        except ApiException as e:
+        except (ApiException, ResilienceError) as e:
             return {
                 'success': False,
                 'error': str(e),
@@ -303,17 +489,8 @@ class OpenFGAClientWrapper:
             raise RuntimeError("客户端未初始化，请使用 async with 语句")
 
         try:
-            options = {}
-            if model_id:
-                options['authorization_model_id'] = model_id
-
-            response = await self.client.list_objects(
-                user=user,
-                relation=relation,
-                type=type,
-                contextual_tuples=contextual_tuples,
-                context=context,
-                options=options
+            response = await self._list_objects(
+                user, relation, type, contextual_tuples, context, model_id
             )
 
             return {
@@ -321,7 +498,7 @@ class OpenFGAClientWrapper:
                 'objects': response.objects if hasattr(response, 'objects') else [],
                 'response': response
             }
-        except ApiException as e:
+        except (ApiException, ResilienceError) as e:
             return {
                 'success': False,
                 'error': str(e),
@@ -363,21 +540,119 @@ class OpenFGAClientWrapper:
             if model_id:
                 options['authorization_model_id'] = model_id
 
-            response = await self.client.list_users(
-                object=object,
+            object_type, _, object_id = object.partition(':')
+            body = ClientListUsersRequest(
+                object=FgaObject(type=object_type, id=object_id),
                 relation=relation,
-                user_filters=user_filters or [],
+                user_filters=[
+                    UserTypeFilter(type=f['type'], relation=f.get('relation'))
+                    for f in user_filters or []
+                ],
                 contextual_tuples=contextual_tuples,
-                context=context,
-                options=options
+                context=context
             )
+            response = await self._call('list_users', lambda: self.client.list_users(body, options))
 
             return {
                 'success': True,
                 'users': response.users if hasattr(response, 'users') else [],
                 'response': response
             }
-        except ApiException as e:
+        except (ApiException, ResilienceError) as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'status': e.status,
+                'body': e.body
+            }
+
+    async def expand(
+        self,
+        relation: str,
+        object: str,
+        contextual_tuples: Optional[List[ClientTuple]] = None,
+        model_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        展开对象的权限树（一层）
+
+        直接授权列出用户和用户集，计算关系和 x from y 给出下一层的 object#relation。
+        使用 LocalOpenFgaClient 后端时，多个对象共享的下一层只展开一次。
+
+        Args:
+            relation: 关系类型
+            object: 对象标识符
+            contextual_tuples: 上下文元组列表
+            model_id: 可选的授权模型 ID
+
+        Returns:
+            包含权限树（'tree'）的字典
+        """
+        if not self.client:
+            raise RuntimeError("客户端未初始化，请使用 async with 语句")
+
+        try:
+            options = {'authorization_model_id': model_id} if model_id else None
+            body = ClientExpandRequest(relation=relation, object=object, contextual_tuples=contextual_tuples)
+            response = await self._call('expand', lambda: self.client.expand(body, options))
+
+            return {
+                'success': True,
+                'tree': response.tree,
+                'response': response
+            }
+        except (ApiException, ResilienceError) as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'status': e.status,
+                'body': e.body
+            }
+
+    async def read_changes(
+        self,
+        type: Optional[str] = None,
+        continuation_token: Optional[str] = None,
+        page_size: int = 100,
+        start_time: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        读取一页元组变更
+
+        持续订阅变更请使用 change_feed.ChangeFeedFollower。
+
+        Args:
+            type: 对象类型（可选，默认所有类型）
+            continuation_token: 上一页返回的令牌（可选）
+            page_size: 每页最大变更数
+            start_time: 没有令牌时的起始时间（RFC3339，可选）
+
+        Returns:
+            包含变更列表和下一页令牌的字典；API 调用失败时不抛出异常，
+            返回 {'success': False, 'error', 'status', 'body'}
+
+        Raises:
+            RuntimeError: 客户端未初始化时
+        """
+        if not self.client:
+            raise RuntimeError("客户端未初始化，请使用 async with 语句")
+
+        try:
+            options: Dict[str, Any] = {'page_size': page_size}
+            if continuation_token:
+                options['continuation_token'] = continuation_token
+
+            response = await self._call('read_changes', lambda: self.client.read_changes(
+                ClientReadChangesRequest(type=type, start_time=start_time),
+                options
+            ))
+            return {
+                'success': True,
+                'changes': response.changes or [],
+                'continuation_token': response.continuation_token,
+                'response': response
+            }
+        except (ApiException, ResilienceError) as e:
             return {
                 'success': False,
                 'error': str(e),
@@ -399,13 +674,15 @@ class OpenFGAClientWrapper:
             raise RuntimeError("客户端未初始化，请使用 async with 语句")
 
         try:
-            response = await self.client.read_authorization_models()
+            response = await self._call(
+                'read_authorization_models', lambda: self.client.read_authorization_models()
+            )
             return {
                 'success': True,
                 'models': response.authorization_models if hasattr(response, 'authorization_models') else [],
                 'response': response
             }
-        except ApiException as e:
+        except (ApiException, ResilienceError) as e:
             return {
                 'success': False,
                 'error': str(e),
@@ -413,6 +690,216 @@ class OpenFGAClientWrapper:
                 'body': e.body
             }
 
+    # ==================== 轻量接口 ====================
+    # 直接返回 bool / 列表，失败时抛出异常，不为每次调用构造结果字典。
+    # 上面返回字典的方法是在这些请求函数之上的兼容层。
+
+    async def _write(
+        self,
+        writes: Optional[List[ClientTuple]],
+        deletes: Optional[List[ClientTuple]],
+        model_id: Optional[str]
+    ):
+        """发送一次 Write 请求，返回 SDK 响应"""
+        options = {'authorization_model_id': model_id} if model_id else None
+        body = ClientWriteRequest(writes=writes or [], deletes=deletes or [])
+
+        # 写入不是幂等的，只受时间预算和熔断保护，不会重试
+        return await self._call(
+            'write', lambda: self.client.write(body, options), idempotent=False
+        )
+
+    async def _check(
+        self,
+        user: str,
+        relation: str,
+        object: str,
+        contextual_tuples: Optional[List[ClientTuple]],
+        context: Optional[Dict[str, Any]],
+        model_id: Optional[str]
+    ):
+        """发送一次检查（启用微批处理时进入批次），返回带 allowed 字段的响应"""
+        if self.batcher:
+            result = await self.batcher.submit(
+                user=user,
+                relation=relation,
+                object=object,
+                contextual_tuples=contextual_tuples,
+                context=context,
+                model_id=model_id
+            )
+            if result.error:
+                raise CheckError(str(result.error.message or result.error), result)
+            return result
+
+        options = {'authorization_model_id': model_id} if model_id else None
+        body = ClientCheckRequest(
+            user=user,
+            relation=relation,
+            object=object,
+            contextual_tuples=contextual_tuples,
+            context=context
+        )
+        return await self._call('check', lambda: self.client.check(body, options))
+
+    async def _batch_check(self, checks: List[ClientCheckRequest], model_id: Optional[str]):
+        """逐条并发检查，返回与 checks 顺序一致的 SDK 响应列表"""
+        options = {'authorization_model_id': model_id} if model_id else None
+
+        # SDK 0.9 起逐条并发检查的接口名为 client_batch_check
+        return await self._call(
+            'batch_check', lambda: self.client.client_batch_check(checks, options), weight=len(checks)
+        )
+
+    async def _list_objects(
+        self,
+        user: str,
+        relation: str,
+        type: str,
+        contextual_tuples: Optional[List[ClientTuple]],
+        context: Optional[Dict[str, Any]],
+        model_id: Optional[str]
+    ):
+        """发送一次 ListObjects 请求，返回 SDK 响应"""
+        options = {'authorization_model_id': model_id} if model_id else None
+        body = ClientListObjectsRequest(
+            user=user,
+            relation=relation,
+            type=type,
+            contextual_tuples=contextual_tuples,
+            context=context
+        )
+        return await self._call('list_objects', lambda: self.client.list_objects(body, options))
+
+    async def check(
+        self,
+        user: str,
+        relation: str,
+        object: str,
+        contextual_tuples: Optional[List[ClientTuple]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        model_id: Optional[str] = None
+    ) -> bool:
+        """
+        检查用户是否有权限访问对象（轻量接口）
+
+        参数与 check_permission 相同，直接返回是否允许。
+
+        Raises:
+            ApiException: 当 API 调用失败时
+            ResilienceError: 熔断或超出时间预算时
+            CheckError: 微批处理中该项检查返回错误时
+        """
+        if not self.client:
+            raise RuntimeError("客户端未初始化，请使用 async with 语句")
+
+        response = await self._check(user, relation, object, contextual_tuples, context, model_id)
+        return response.allowed
+
+    async def check_many(
+        self,
+        checks: List[ClientCheckRequest],
+        model_id: Optional[str] = None
+    ) -> List[bool]:
+        """
+        批量检查多个权限（轻量接口）
+
+        Returns:
+            与 checks 顺序一致的 allowed 列表
+
+        Raises:
+            ApiException / ResilienceError: 当请求失败时
+            CheckError: 任意一项检查返回错误时（index 为该项在 checks 中的位置）
+        """
+        if not self.client:
+            raise RuntimeError("客户端未初始化，请使用 async with 语句")
+
+        responses = await self._batch_check(checks, model_id)
+        for index, response in enumerate(responses):
+            if response.error is not None:
+                raise CheckError(f"第 {index} 项检查失败: {response.error}", response, index)
+        return [response.allowed for response in responses]
+
+    async def list_object_ids(
+        self,
+        user: str,
+        relation: str,
+        type: str,
+        contextual_tuples: Optional[List[ClientTuple]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        model_id: Optional[str] = None
+    ) -> List[str]:
+        """
+        列出用户有权限访问的所有对象（轻量接口）
+
+        Returns:
+            对象标识符列表
+
+        Raises:
+            ApiException / ResilienceError: 当请求失败时
+        """
+        if not self.client:
+            raise RuntimeError("客户端未初始化，请使用 async with 语句")
+
+        response = await self._list_objects(user, relation, type, contextual_tuples, context, model_id)
+        return response.objects or []
+
+    async def iter_objects(
+        self,
+        user: str,
+        relation: str,
+        type: str,
+        contextual_tuples: Optional[List[ClientTuple]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        model_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        逐个返回用户有权限访问的对象（StreamedListObjects）
+
+        不等待全部结果，适合对象很多或只需要前几个结果的场景；
+        使用 LocalOpenFgaClient 后端时在本地反向遍历关系图。
+
+        Yields:
+            对象标识符
+
+        Raises:
+            ApiException: 当 API 调用失败时
+
+        Example:
+            async for object in client.iter_objects('user:anne', 'viewer', 'document'):
+                print(object)
+        """
+        if not self.client:
+            raise RuntimeError("客户端未初始化，请使用 async with 语句")
+
+        options = {'authorization_model_id': model_id} if model_id else None
+        body = ClientListObjectsRequest(
+            user=user,
+            relation=relation,
+            type=type,
+            contextual_tuples=contextual_tuples,
+            context=context
+        )
+        async for response in self.client.streamed_list_objects(body, options):
+            yield response.object
+
+    async def write(
+        self,
+        writes: Optional[List[ClientTuple]] = None,
+        deletes: Optional[List[ClientTuple]] = None,
+        model_id: Optional[str] = None
+    ) -> None:
+        """
+        写入或删除关系元组（轻量接口）
+
+        Raises:
+            ApiException / ResilienceError: 当请求失败时
+        """
+        if not self.client:
+            raise RuntimeError("客户端未初始化，请使用 async with 语句")
+
+        await self._write(writes, deletes, model_id)
+
 
 def create_client(
     api_url: Optional[str] = None,
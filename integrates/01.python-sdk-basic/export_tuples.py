@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+关系元组导出（备份）脚本
+
+逐页读取 Store 中的关系元组（自动跟随 continuation_token），
+以每行一个元组的 JSONL 格式流式写入 gzip 或 zstd 压缩文件：
+1. 每次只在内存中保留一页元组，内存占用与 Store 大小无关
+2. 支持按对象类型过滤
+3. 定期输出进度和吞吐量
+
+输出格式与 import_tuples.py 的 JSONL 输入格式一致（解压后可直接导入）:
+    {"user": "user:anne", "relation": "viewer", "object": "document:budget", "timestamp": "..."}
+
+使用方法:
+    python export_tuples.py backup.jsonl.gz
+    python export_tuples.py backup.jsonl.zst --type document --type folder
+
+zstd 压缩需要安装 zstandard: pip install zstandard
+"""
+
+import argparse
+import asyncio
+import gzip
+import io
+import json
+import sys
+import time
+from typing import Optional, Dict, Any, List, AsyncIterator
+
+from client import OpenFGAClientWrapper, create_client
+
+
+def open_output(path: str, compression: Optional[str] = None, level: Optional[int] = None):
+    """
+    按压缩格式打开输出文件（文本模式）
+
+    Args:
+        path: 输出文件路径，'-' 表示标准输出（不压缩）
+        compression: 'gzip'、'zstd' 或 'none'，默认按扩展名判断
+        level: 压缩级别，默认 gzip 为 6，zstd 为 3
+    """
+    if path == '-':
+        return sys.stdout
+
+    if compression is None:
+        if path.endswith('.gz'):
+            compression = 'gzip'
+        elif path.endswith('.zst'):
+            compression = 'zstd'
+        else:
+            compression = 'none'
+
+    if compression == 'gzip':
+        return gzip.open(path, 'wt', encoding='utf-8', compresslevel=level or 6)
+
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd 压缩需要安装 zstandard: pip install zstandard")
+        raw = open(path, 'wb')
+        writer = zstandard.ZstdCompressor(level=level or 3).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(writer, encoding='utf-8')
+
+    if compression == 'none':
+        return open(path, 'w', encoding='utf-8')
+
+    raise ValueError(f"不支持的压缩格式: {compression}")
+
+
+async def filter_types(
+    tuples: AsyncIterator[Dict[str, Any]],
+    object_types: Optional[List[str]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    按对象类型过滤元组
+
+    Read API 只能在同时指定 user 时按类型过滤，导出整个 Store 时只能在客户端过滤。
+    """
+    if not object_types:
+        async for t in tuples:
+            yield t
+        return
+
+    prefixes = tuple(f"{object_type}:" for object_type in object_types)
+    async for t in tuples:
+        if t['object'].startswith(prefixes):
+            yield t
+
+
+async def export_tuples(
+    wrapper: OpenFGAClientWrapper,
+    output,
+    object_types: Optional[List[str]] = None,
+    page_size: int = 100,
+    progress_interval: float = 5.0
+) -> Dict[str, Any]:
+    """
+    把 Store 中的元组流式写入已打开的输出文件
+
+    Args:
+        wrapper: 已初始化的 OpenFGAClientWrapper
+        output: 文本模式的输出文件对象
+        object_types: 只导出这些对象类型的元组（可选）
+        page_size: 每页读取的元组数
+        progress_interval: 进度输出间隔（秒）
+
+    Returns:
+        导出统计，包括 'exported', 'elapsed', 'tuples_per_second'
+    """
+    started = time.monotonic()
+    last_report = started
+    exported = 0
+
+    tuples = filter_types(wrapper.iter_tuples(page_size=page_size), object_types)
+    async for t in tuples:
+        output.write(json.dumps(t, ensure_ascii=False, separators=(',', ':')) + '\n')
+        exported += 1
+
+        now = time.monotonic()
+        if now - last_report >= progress_interval:
+            last_report = now
+            print(f"  已导出 {exported} 个元组 | {exported / (now - started):.0f} 个/秒",
+                  file=sys.stderr, flush=True)
+
+    elapsed = time.monotonic() - started
+    return {
+        'exported': exported,
+        'elapsed': elapsed,
+        'tuples_per_second': exported / elapsed if elapsed > 0 else 0.0
+    }
+
+
+async def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description='OpenFGA 关系元组导出',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  # 导出整个 Store 到 gzip 文件
+  python export_tuples.py backup.jsonl.gz
+
+  # 只导出 document 和 folder 类型的元组，使用 zstd 压缩
+  python export_tuples.py backup.jsonl.zst --type document --type folder
+
+  # 输出到标准输出
+  python export_tuples.py - | head
+        """
+    )
+
+    parser.add_argument('output', help='输出文件路径（.gz / .zst / .jsonl），- 表示标准输出')
+    parser.add_argument(
+        '--type',
+        dest='types',
+        action='append',
+        help='只导出指定对象类型的元组，可重复指定'
+    )
+    parser.add_argument(
+        '--compression',
+        choices=['gzip', 'zstd', 'none'],
+        help='压缩格式 (默认: 按扩展名判断)'
+    )
+    parser.add_argument(
+        '--level',
+        type=int,
+        help='压缩级别 (默认: gzip 6, zstd 3)'
+    )
+    parser.add_argument(
+        '--page-size',
+        type=int,
+        default=100,
+        help='每页读取的元组数 (默认: 100)'
+    )
+    parser.add_argument(
+        '--progress-interval',
+        type=float,
+        default=5.0,
+        help='进度输出间隔秒数 (默认: 5)'
+    )
+
+    args = parser.parse_args()
+
+    # 进度信息输出到 stderr，避免污染输出到 stdout 的数据
+    print(f"OpenFGA 元组导出: {args.output}", file=sys.stderr)
+
+    try:
+        output = open_output(args.output, args.compression, args.level)
+    except (RuntimeError, ValueError) as e:
+        print(f"✗ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        async with create_client() as wrapper:
+            result = await export_tuples(
+                wrapper,
+                output,
+                object_types=args.types,
+                page_size=args.page_size,
+                progress_interval=args.progress_interval
+            )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(
+        f"✓ 导出完成: {result['exported']} 个元组, 耗时 {result['elapsed']:.1f}s, "
+        f"{result['tuples_per_second']:.0f} 个/秒",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
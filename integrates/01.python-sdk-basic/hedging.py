@@ -0,0 +1,196 @@
+"""
+对冲请求模块
+
+降低权限检查的尾延迟：第一次请求在一段时间内没有返回时，再发送一个相同的请求，
+先返回的结果生效，另一个请求被取消。
+- 对冲延迟取最近请求延迟的指定分位数（默认 p95），只有真正的慢请求才会触发对冲
+- 对冲预算：每个检查积累 max_hedge_ratio 个令牌，对冲一个包含 N 个检查的请求消耗 N 个，
+  额外负载按检查数计算，有上限
+- 统计对冲触发次数和对冲请求胜出次数
+
+只应用于幂等的读请求（Check、BatchCheck）。
+
+作者: OpenFGA 集成示例
+日期: 2026-02-05
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Callable, Awaitable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class LatencyTracker:
+    """
+    记录最近 window 个请求的延迟，计算分位数
+
+    分位数每 refresh_every 个样本重新计算一次，避免每次请求都排序。
+    """
+
+    def __init__(self, window: int = 1000, refresh_every: int = 50):
+        self.samples: deque = deque(maxlen=window)
+        self.refresh_every = refresh_every
+        self._sorted: list = []
+        self._since_refresh = 0
+
+    def record(self, latency: float):
+        """记录一个延迟样本（秒）"""
+        self.samples.append(latency)
+        self._since_refresh += 1
+        if self._since_refresh >= self.refresh_every or len(self._sorted) < self.refresh_every:
+            self._sorted = sorted(self.samples)
+            self._since_refresh = 0
+
+    def percentile(self, p: float) -> Optional[float]:
+        """返回第 p 百分位的延迟，没有样本时返回 None"""
+        if not self._sorted:
+            return None
+        index = min(len(self._sorted) - 1, int(len(self._sorted) * p / 100))
+        return self._sorted[index]
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+
+class HedgingPolicy:
+    """
+    对冲策略
+
+    示例:
+        hedging = HedgingPolicy(percentile=95, max_hedge_ratio=0.05)
+        response = await hedging.run('check', lambda: client.check(body))
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        initial_delay: float = 0.05,
+        min_delay: float = 0.005,
+        max_delay: float = 1.0,
+        min_samples: int = 20,
+        max_hedge_ratio: float = 0.05,
+        burst: float = 10.0,
+        window: int = 1000
+    ):
+        """
+        初始化对冲策略
+
+        Args:
+            percentile: 对冲延迟取最近延迟的第几百分位
+            initial_delay: 样本不足 min_samples 时使用的对冲延迟（秒）
+            min_delay: 对冲延迟下限（秒）
+            max_delay: 对冲延迟上限（秒）
+            min_samples: 开始使用分位数前需要的样本数
+            max_hedge_ratio: 对冲请求占总请求的最大比例
+            burst: 对冲预算最多积累的令牌数，限制空闲后的突发对冲
+            window: 每个接口保留的延迟样本数
+        """
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.burst = burst
+        self.window = window
+
+        self._trackers: Dict[str, LatencyTracker] = {}
+        self._tokens = 0.0
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _tracker(self, endpoint: str) -> LatencyTracker:
+        tracker = self._trackers.get(endpoint)
+        if tracker is None:
+            tracker = LatencyTracker(self.window)
+            self._trackers[endpoint] = tracker
+        return tracker
+
+    def _count(self, endpoint: str, name: str, weight: int = 1):
+        stats = self._stats.setdefault(endpoint, {
+            'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'suppressed': 0
+        })
+        stats[name] += weight
+
+    def delay(self, endpoint: str) -> float:
+        """当前接口的对冲延迟（秒）"""
+        tracker = self._tracker(endpoint)
+        if len(tracker) < self.min_samples:
+            return self.initial_delay
+        return min(self.max_delay, max(self.min_delay, tracker.percentile(self.percentile)))
+
+    def _take_tokens(self, weight: int) -> bool:
+        """从对冲预算中取 weight 个令牌"""
+        if self._tokens >= weight:
+            self._tokens -= weight
+            return True
+        return False
+
+    async def run(self, endpoint: str, fn: Callable[[], Awaitable[T]], weight: int = 1) -> T:
+        """
+        执行一次可能被对冲的请求
+
+        Args:
+            endpoint: 接口名，每个接口分别统计延迟
+            fn: 发起请求的无参协程函数，对冲时会再调用一次
+            weight: 请求包含的检查数（如 BatchCheck 的条数），预算和统计都按检查数计算
+
+        Returns:
+            先成功返回的结果；两个请求都失败时抛出最后一个异常
+        """
+        weight = max(1, weight)
+        self._count(endpoint, 'requests', weight)
+        # 上限至少为一个请求的检查数，否则大批次永远攒不够对冲所需的令牌
+        self._tokens = min(max(self.burst, weight), self._tokens + self.max_hedge_ratio * weight)
+        tracker = self._tracker(endpoint)
+
+        started = time.monotonic()
+        primary = asyncio.ensure_future(fn())
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.delay(endpoint))
+            if done or not self._take_tokens(weight):
+                if not done:
+                    self._count(endpoint, 'suppressed', weight)
+                result = await primary
+                tracker.record(time.monotonic() - started)
+                return result
+
+            self._count(endpoint, 'hedged', weight)
+            hedge_started = time.monotonic()
+            hedge = asyncio.ensure_future(fn())
+            tasks.append(hedge)
+            pending = {primary, hedge}
+
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    for other in pending:
+                        other.cancel()
+                    if task is hedge:
+                        self._count(endpoint, 'hedge_wins', weight)
+                        tracker.record(time.monotonic() - hedge_started)
+                    else:
+                        tracker.record(time.monotonic() - started)
+                    return task.result()
+
+            raise error
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """按接口返回对冲统计和当前对冲延迟（毫秒）"""
+        return {
+            endpoint: {**counters, 'delay_ms': self.delay(endpoint) * 1000}
+            for endpoint, counters in self._stats.items()
+        }
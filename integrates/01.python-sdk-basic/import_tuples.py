@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+关系元组批量导入脚本
+
+从 CSV 或 JSONL 文件流式读取关系元组，校验后通过有界的异步流水线写入 OpenFGA：
+1. 逐行读取文件，内存占用与文件大小无关
+2. 校验每一行，不合法的行写入错误文件
+3. 按块并发写入（复用 bulk.BulkTupleWriter 的重试和拆块逻辑）
+4. 定期输出进度和吞吐量
+5. 写入检查点文件，中断后重新执行会从上次完成的位置继续
+
+文件格式:
+    CSV（首行为表头）:
+        user,relation,object[,condition_name,condition_context]
+        user:anne,viewer,document:budget
+    JSONL（每行一个对象）:
+        {"user": "user:anne", "relation": "viewer", "object": "document:budget"}
+        {"user": "user:bob", "relation": "viewer", "object": "document:budget",
+         "condition": {"name": "non_expired_grant", "context": {"grant_duration": "1h"}}}
+
+使用方法:
+    python import_tuples.py tuples.csv
+    python import_tuples.py tuples.jsonl --workers 20 --chunk-size 100
+    python import_tuples.py tuples.csv --operation delete
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+import sys
+import time
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+
+from openfga_sdk.client.models import ClientTuple
+from openfga_sdk.models import RelationshipCondition
+
+from bulk import BulkTupleWriter, BulkWriteAborted, SERVER_MAX_TUPLES_PER_WRITE
+from client import create_client
+
+# type:id
+OBJECT_PATTERN = re.compile(r'^[^\s:#]+:[^\s#]+$')
+# type:id、type:* 或 type:id#relation
+USER_PATTERN = re.compile(r'^[^\s:#]+:[^\s#]+(#[^\s:#]+)?$')
+RELATION_PATTERN = re.compile(r'^[^\s:#@]+$')
+
+
+def validate_row(row: Dict[str, Any]) -> Tuple[Optional[ClientTuple], Optional[str]]:
+    """
+    校验一行数据并转换为 ClientTuple
+
+    Returns:
+        (元组, None) 或 (None, 错误原因)
+    """
+    user = (row.get('user') or '').strip()
+    relation = (row.get('relation') or '').strip()
+    obj = (row.get('object') or '').strip()
+
+    if not USER_PATTERN.match(user):
+        return None, f"user 格式不正确: {user!r}"
+    if not RELATION_PATTERN.match(relation):
+        return None, f"relation 格式不正确: {relation!r}"
+    if not OBJECT_PATTERN.match(obj):
+        return None, f"object 格式不正确: {obj!r}"
+
+    condition = None
+    condition_data = row.get('condition')
+    if condition_data:
+        if not isinstance(condition_data, dict) or not condition_data.get('name'):
+            return None, "condition 必须包含 name"
+        context = condition_data.get('context')
+        if context is not None and not isinstance(context, dict):
+            return None, "condition.context 必须是对象"
+        condition = RelationshipCondition(name=condition_data['name'], context=context)
+
+    return ClientTuple(user=user, relation=relation, object=obj, condition=condition), None
+
+
+class TupleFileReader:
+    """
+    流式读取元组文件
+
+    以二进制方式逐行读取，记录每行结束时的字节偏移，
+    检查点中保存偏移量，恢复时直接 seek 到该位置，不需要重新读取已导入的部分。
+    """
+
+    def __init__(self, path: str, file_format: Optional[str] = None):
+        self.path = path
+        self.format = file_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        if self.format not in ('csv', 'jsonl'):
+            raise ValueError(f"不支持的文件格式: {self.format}")
+        self.header: Optional[List[str]] = None
+
+    def read_header(self, f) -> int:
+        """读取 CSV 表头，返回数据部分的起始偏移"""
+        if self.format != 'csv':
+            return 0
+        line = f.readline().decode('utf-8-sig')
+        self.header = [name.strip() for name in next(csv.reader([line]))]
+        missing = {'user', 'relation', 'object'} - set(self.header)
+        if missing:
+            raise ValueError(f"CSV 表头缺少字段: {', '.join(sorted(missing))}")
+        return f.tell()
+
+    def parse_line(self, line: str) -> Dict[str, Any]:
+        """把一行文本解析为字典"""
+        if self.format == 'jsonl':
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("每行必须是 JSON 对象")
+            return row
+
+        values = next(csv.reader([line]))
+        row = dict(zip(self.header, values))
+        if row.get('condition_name'):
+            context = row.get('condition_context')
+            row['condition'] = {
+                'name': row['condition_name'],
+                'context': json.loads(context) if context else None
+            }
+        return row
+
+    def rows(self, f, line_number: int) -> Iterator[Tuple[int, int, Optional[Dict], Optional[str]]]:
+        """
+        逐行产出 (行号, 行结束偏移, 行数据, 解析错误)
+
+        空行会被跳过，但偏移量照常推进；无法解码或解析的行以错误信息产出，不会中断导入。
+        """
+        while True:
+            raw = f.readline()
+            if not raw:
+                return
+            line_number += 1
+            offset = f.tell()
+            try:
+                # UnicodeDecodeError 是 ValueError 的子类，非 UTF-8 的行记为无效行
+                line = raw.decode('utf-8').strip()
+                if not line:
+                    continue
+                row = self.parse_line(line)
+            except (ValueError, StopIteration) as e:
+                yield line_number, offset, None, f"无法解析: {e}"
+                continue
+            yield line_number, offset, row, None
+
+
+class Checkpoint:
+    """
+    导入检查点
+
+    块是并发写入的，完成顺序与文件顺序不一定一致。检查点只推进到
+    “之前所有块都已完成”的位置，恢复时最多重写几个已完成的块（写入是幂等的）。
+    """
+
+    def __init__(self, path: str, source: str, operation: str):
+        self.path = path
+        self.source = os.path.abspath(source)
+        self.operation = operation
+        self.state: Dict[str, Any] = {}
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """读取检查点，与当前导入的文件和操作不匹配时忽略"""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('source') != self.source or state.get('operation') != self.operation:
+            print(f"⚠ 检查点 {self.path} 属于其他导入任务，忽略")
+            return None
+        if state.get('offset', 0) > os.path.getsize(self.source):
+            print("⚠ 检查点偏移量超出文件大小，文件可能已被修改，忽略")
+            return None
+        self.state = state
+        return state
+
+    def save(self, **state):
+        """原子写入检查点"""
+        self.state.update(state, source=self.source, operation=self.operation, updated_at=time.time())
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class ImportStats:
+    """导入进度统计"""
+
+    def __init__(self, resumed: Optional[Dict[str, Any]] = None):
+        resumed = resumed or {}
+        self.imported = resumed.get('imported', 0)
+        self.invalid = resumed.get('invalid', 0)
+        self.failed = resumed.get('failed', 0)
+        self.requests = 0
+        self.retries = 0
+        self.read = 0
+        self.started = time.monotonic()
+        self.initial = self.imported
+
+    def rate(self) -> float:
+        """本次运行的导入速度（个/秒）"""
+        elapsed = time.monotonic() - self.started
+        return (self.imported - self.initial) / elapsed if elapsed > 0 else 0.0
+
+    def line(self) -> str:
+        """一行进度信息"""
+        return (
+            f"已读取 {self.read} 行 | 成功 {self.imported} | 失败 {self.failed} | "
+            f"无效 {self.invalid} | 请求 {self.requests} | {self.rate():.0f} 个/秒"
+        )
+
+
+async def import_tuples(
+    client,
+    path: str,
+    operation: str = 'write',
+    file_format: Optional[str] = None,
+    chunk_size: int = SERVER_MAX_TUPLES_PER_WRITE,
+    workers: int = 10,
+    checkpoint_file: Optional[str] = None,
+    errors_file: Optional[str] = None,
+    restart: bool = False,
+    progress_interval: float = 5.0,
+    model_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    流式导入元组文件
+
+    Args:
+        client: 已初始化的 OpenFgaClient
+        path: CSV 或 JSONL 文件路径
+        operation: 'write' 或 'delete'
+        file_format: 'csv' 或 'jsonl'，默认按扩展名判断
+        chunk_size: 每个 Write 请求包含的元组数
+        workers: 并发写入的 worker 数
+        checkpoint_file: 检查点文件，默认为 <path>.checkpoint.json
+        errors_file: 无效行和写入失败的元组，默认为 <path>.errors.jsonl
+        restart: 忽略已有检查点，从头开始
+        progress_interval: 进度输出间隔（秒）
+        model_id: 可选的授权模型 ID
+
+    Returns:
+        导入统计
+
+    Raises:
+        BulkWriteAborted: 认证失败、Store 或授权模型不存在，检查点保留在最后一个完成的块
+    """
+    reader = TupleFileReader(path, file_format)
+    checkpoint = Checkpoint(checkpoint_file or f"{path}.checkpoint.json", path, operation)
+    errors_path = errors_file or f"{path}.errors.jsonl"
+
+    resumed = None if restart else checkpoint.load()
+    if resumed and resumed.get('completed'):
+        print(f"✓ 检查点显示该文件已导入完成（{resumed['imported']} 个元组），使用 --restart 重新导入")
+        return resumed
+
+    writer = BulkTupleWriter(
+        client,
+        chunk_size=chunk_size,
+        max_parallel_requests=workers,
+        model_id=model_id
+    )
+    stats = ImportStats(resumed)
+
+    # 有界队列：读取速度受写入速度限制，内存中最多只有 workers * 2 个块
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+
+    # 已完成但前面还有未完成块的块：序号 -> (结束偏移, 结束行号, 成功数, 失败数, 无效行数)
+    done_chunks: Dict[int, Tuple[int, int, int, int, int]] = {}
+    next_to_commit = 0
+    # 检查点之前的累计数，恢复后从这里继续计数
+    committed = {
+        'imported': stats.imported,
+        'failed': stats.failed,
+        'invalid': stats.invalid
+    }
+
+    errors_mode = 'a' if resumed else 'w'
+    errors_out = open(errors_path, errors_mode, encoding='utf-8')
+
+    def record_error(entry: Dict[str, Any]):
+        errors_out.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def commit(index: int, chunk_state: Tuple[int, int, int, int, int]):
+        """记录块完成，并把检查点推进到连续完成的位置"""
+        nonlocal next_to_commit
+        done_chunks[index] = chunk_state
+        advanced = None
+        while next_to_commit in done_chunks:
+            advanced = done_chunks.pop(next_to_commit)
+            committed['imported'] += advanced[2]
+            committed['failed'] += advanced[3]
+            committed['invalid'] += advanced[4]
+            next_to_commit += 1
+        if advanced:
+            errors_out.flush()
+            checkpoint.save(
+                offset=advanced[0],
+                line=advanced[1],
+                completed=False,
+                **committed
+            )
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                index, tuples, line_numbers, offset, line_number, invalid = item
+                imported = failed = 0
+                if tuples:
+                    report = await writer.write_chunk(operation, tuples)
+                    imported = report['written'] + report['deleted']
+                    failed = len(report['failed'])
+                    stats.imported += imported
+                    stats.failed += failed
+                    stats.requests += report['requests']
+                    stats.retries += report['retries']
+                    # 失败元组在块中的行号
+                    lines_by_tuple = {
+                        (t.user, t.relation, t.object): n for t, n in zip(tuples, line_numbers)
+                    }
+                    for failure in report['failed']:
+                        t = failure['tuple']
+                        record_error({
+                            'line': lines_by_tuple.get((t['user'], t['relation'], t['object'])),
+                            'tuple': t,
+                            'error': failure['error'],
+                            'status': failure['status']
+                        })
+                commit(index, (offset, line_number, imported, failed, invalid))
+            finally:
+                queue.task_done()
+
+    async def report_progress():
+        while True:
+            await asyncio.sleep(progress_interval)
+            print(f"  {stats.line()}", flush=True)
+
+    with open(path, 'rb') as f:
+        data_start = reader.read_header(f)
+        line_number = 1 if reader.format == 'csv' else 0
+        if resumed:
+            f.seek(resumed['offset'])
+            line_number = resumed['line']
+            print(f"↻ 从检查点继续: 第 {line_number + 1} 行（已导入 {stats.imported} 个）")
+        else:
+            f.seek(data_start)
+
+        async def produce():
+            nonlocal line_number
+            index = 0
+            tuples: List[ClientTuple] = []
+            line_numbers: List[int] = []
+            invalid = 0
+            last_offset = f.tell()
+
+            for line_number, last_offset, row, error in reader.rows(f, line_number):
+                stats.read += 1
+                if row is not None:
+                    client_tuple, error = validate_row(row)
+                if error:
+                    stats.invalid += 1
+                    invalid += 1
+                    record_error({'line': line_number, 'error': error})
+                else:
+                    tuples.append(client_tuple)
+                    line_numbers.append(line_number)
+
+                if len(tuples) >= chunk_size:
+                    await queue.put((index, tuples, line_numbers, last_offset, line_number, invalid))
+                    index += 1
+                    tuples, line_numbers, invalid = [], [], 0
+
+            # 最后一块（即使没有元组也要提交，推进检查点到文件末尾）
+            await queue.put((index, tuples, line_numbers, last_offset, line_number, invalid))
+
+            for _ in range(workers):
+                await queue.put(None)
+
+        # 任一 worker 异常退出时取消全部任务，避免读取端在满队列上永久等待
+        tasks = [asyncio.create_task(produce())]
+        tasks += [asyncio.create_task(worker()) for _ in range(workers)]
+        progress = asyncio.create_task(report_progress())
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            progress.cancel()
+            errors_out.close()
+
+    checkpoint.save(completed=True, **committed)
+
+    return {
+        'imported': stats.imported,
+        'invalid': stats.invalid,
+        'failed': stats.failed,
+        'requests': stats.requests,
+        'retries': stats.retries,
+        'elapsed': time.monotonic() - stats.started,
+        'tuples_per_second': stats.rate(),
+        'errors_file': errors_path
+    }
+
+
+async def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description='OpenFGA 关系元组批量导入',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  # 导入 CSV 文件（表头: user,relation,object）
+  python import_tuples.py tuples.csv
+
+  # 导入 JSONL 文件，20 个并发请求
+  python import_tuples.py tuples.jsonl --workers 20
+
+  # 中断后再次执行同一命令即可从检查点继续；从头开始使用 --restart
+  python import_tuples.py tuples.csv --restart
+
+  # 批量删除文件中的元组
+  python import_tuples.py tuples.csv --operation delete
+        """
+    )
+
+    parser.add_argument('file', help='CSV 或 JSONL 文件路径')
+    parser.add_argument(
+        '--format',
+        choices=['csv', 'jsonl'],
+        help='文件格式 (默认: 按扩展名判断)'
+    )
+    parser.add_argument(
+        '--operation',
+        choices=['write', 'delete'],
+        default='write',
+        help='写入或删除 (默认: write)'
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=SERVER_MAX_TUPLES_PER_WRITE,
+        help=f'每个请求的元组数 (默认: {SERVER_MAX_TUPLES_PER_WRITE})'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=10,
+        help='并发请求数 (默认: 10)'
+    )
+    parser.add_argument(
+        '--checkpoint-file',
+        help='检查点文件 (默认: <file>.checkpoint.json)'
+    )
+    parser.add_argument(
+        '--errors-file',
+        help='无效行和失败元组的输出文件 (默认: <file>.errors.jsonl)'
+    )
+    parser.add_argument(
+        '--restart',
+        action='store_true',
+        help='忽略检查点，从头开始导入'
+    )
+    parser.add_argument(
+        '--progress-interval',
+        type=float,
+        default=5.0,
+        help='进度输出间隔秒数 (默认: 5)'
+    )
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"✗ 文件不存在: {args.file}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"OpenFGA 元组导入: {args.file}")
+    print("=" * 60)
+
+    async with create_client() as wrapper:
+        try:
+            result = await import_tuples(
+                wrapper.client,
+                args.file,
+                operation=args.operation,
+                file_format=args.format,
+                chunk_size=args.chunk_size,
+                workers=args.workers,
+                checkpoint_file=args.checkpoint_file,
+                errors_file=args.errors_file,
+                restart=args.restart,
+                progress_interval=args.progress_interval,
+                model_id=wrapper.model_id
+            )
+        except ValueError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        except BulkWriteAborted as e:
+            # 认证、Store 或模型错误：检查点停在最后一个完成的块，修正配置后再次执行即可继续
+            print(f"✗ 导入中止（HTTP {e.status}）: {e}")
+            print("  修正配置后再次执行同一命令，将从检查点继续")
+            sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print(f"✓ 导入完成: 成功 {result['imported']} 个, 失败 {result['failed']} 个, 无效 {result['invalid']} 行")
+    if 'elapsed' in result:
+        print(f"  耗时 {result['elapsed']:.1f}s, {result['tuples_per_second']:.0f} 个/秒")
+    if result.get('failed') or result.get('invalid'):
+        print(f"  详情见: {result.get('errors_file')}")
+    print("=" * 60)
+
+    if result.get('failed'):
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
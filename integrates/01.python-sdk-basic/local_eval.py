@@ -0,0 +1,738 @@
+"""
+本地权限计算模块
+
+在进程内加载授权模型和关系元组，不经过 OpenFGA 服务直接计算 Check：
+- TupleIndex: 元组的哈希索引，按 (object, relation) 和 (user, relation, 对象类型) 两个方向查找
+- CheckEvaluator: 按授权模型计算 Check，语义与 OpenFGA 一致（直接授权、通配符 type:*、
+  type#relation 用户集、计算关系、x from y、or / and / but not）
+- LocalOpenFgaClient: 实现 OpenFgaClient 的常用接口，可以作为 OpenFGAClientWrapper 的后端，
+  用于测试和读多写少场景下的本地决策
+
+条件（condition）的 CEL 表达式不在本地计算，需要为每个条件提供一个 Python 函数，
+参数为请求 context 与元组 context 合并后的字典（元组中的值优先）。
+
+示例:
+    backend = LocalOpenFgaClient('authorization_model.fga', tuples=[
+        {'user': 'user:anne', 'relation': 'owner', 'object': 'document:budget'},
+    ])
+    async with create_client(backend=backend) as client:
+        result = await client.check_permission('user:anne', 'viewer', 'document:budget')
+
+作者: OpenFGA 集成示例
+日期: 2026-02-05
+"""
+
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Set, Tuple, Iterable, Iterator, AsyncIterator, Callable, Union
+
+from openfga_sdk import ReadRequestTupleKey
+from openfga_sdk.client.models import (
+    ClientTuple,
+    ClientCheckRequest,
+    ClientWriteRequest,
+    ClientBatchCheckRequest,
+    ClientBatchCheckResponse,
+    ClientBatchCheckSingleResponse,
+    ClientBatchCheckClientResponse,
+    ClientListObjectsRequest,
+    ClientExpandRequest,
+    ClientWriteResponse,
+)
+from openfga_sdk.client.models.list_users_request import ClientListUsersRequest
+from openfga_sdk.client.models.write_single_response import ClientWriteSingleResponse
+from openfga_sdk.exceptions import ValidationException
+from openfga_sdk.models import (
+    AuthorizationModel,
+    CheckError,
+    CheckResponse,
+    ExpandResponse,
+    FgaObject,
+    ListObjectsResponse,
+    ListUsersResponse,
+    ReadAuthorizationModelsResponse,
+    ReadResponse,
+    RelationshipCondition,
+    StreamedListObjectsResponse,
+    Tuple as TupleModel,
+    TupleKey,
+    TypedWildcard,
+    User,
+    UsersetUser,
+)
+
+# 与 OpenFGA 服务端默认的最大解析深度一致
+DEFAULT_MAX_DEPTH = 25
+
+# 条件函数：接收合并后的参数字典，返回是否满足
+ConditionFn = Callable[[Dict[str, Any]], bool]
+
+# 元组的条件：None 或 {'name': ..., 'context': {...}}
+Condition = Optional[Dict[str, Any]]
+
+
+def _error(message: str) -> ValidationException:
+    """构造与服务端 400 校验错误相同类型的异常"""
+    return ValidationException(status=400, reason=message)
+
+
+def _object_type(object: str) -> str:
+    return object.split(':', 1)[0]
+
+
+def tuple_fields(t: Union[Dict[str, Any], ClientTuple, TupleKey]) -> Tuple[str, str, str, Condition]:
+    """
+    从字典、ClientTuple 或 TupleKey 中取出 (user, relation, object, condition)
+
+    condition 统一转换为 {'name': ..., 'context': {...}} 或 None。
+    """
+    if isinstance(t, dict):
+        user, relation, object, condition = t['user'], t['relation'], t['object'], t.get('condition')
+    else:
+        user, relation, object = t.user, t.relation, t.object
+        condition = getattr(t, 'condition', None)
+
+    if condition is not None and not isinstance(condition, dict):
+        condition = {'name': condition.name, 'context': condition.context or {}}
+    return user, relation, object, condition
+
+
+class TupleIndex:
+    """
+    关系元组的内存索引
+
+    - by (object, relation): 具体用户和通配符 → 条件；用户集 type:id#relation 单独存放，
+      检查时只需遍历用户集，不需要遍历所有用户
+    - by (user, 对象类型): (relation, object) 集合，用于按用户反查
+    - by (user, relation, 对象类型): object → 条件，用于 ListObjects 从用户反向遍历
+    """
+
+    def __init__(self):
+        self._tuples: Dict[Tuple[str, str, str], Tuple[Condition, datetime]] = {}
+        self._users: Dict[Tuple[str, str], Dict[str, Condition]] = {}
+        self._usersets: Dict[Tuple[str, str], Dict[str, Condition]] = {}
+        self._by_user_type: Dict[Tuple[str, str], Set[Tuple[str, str]]] = {}
+        self._by_user_relation: Dict[Tuple[str, str, str], Dict[str, Condition]] = {}
+        # 每次写入或删除加一，用于判断基于索引的缓存是否失效
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._tuples)
+
+    def __contains__(self, key: Tuple[str, str, str]) -> bool:
+        return key in self._tuples
+
+    def add(self, user: str, relation: str, object: str, condition: Condition = None,
+            timestamp: Optional[datetime] = None) -> bool:
+        """添加元组，已存在时返回 False"""
+        key = (user, relation, object)
+        if key in self._tuples:
+            return False
+
+        self._tuples[key] = (condition, timestamp or datetime.now(timezone.utc))
+        self.version += 1
+        bucket = self._usersets if '#' in user else self._users
+        bucket.setdefault((object, relation), {})[user] = condition
+        self._by_user_type.setdefault((user, _object_type(object)), set()).add((relation, object))
+        self._by_user_relation.setdefault((user, relation, _object_type(object)), {})[object] = condition
+        return True
+
+    def remove(self, user: str, relation: str, object: str) -> bool:
+        """删除元组，不存在时返回 False"""
+        if self._tuples.pop((user, relation, object), None) is None:
+            return False
+        self.version += 1
+
+        bucket = self._usersets if '#' in user else self._users
+        users = bucket[(object, relation)]
+        del users[user]
+        if not users:
+            del bucket[(object, relation)]
+
+        key = (user, _object_type(object))
+        objects = self._by_user_type[key]
+        objects.discard((relation, object))
+        if not objects:
+            del self._by_user_type[key]
+
+        key = (user, relation, _object_type(object))
+        related = self._by_user_relation[key]
+        del related[object]
+        if not related:
+            del self._by_user_relation[key]
+        return True
+
+    def users(self, object: str, relation: str) -> Dict[str, Condition]:
+        """直接关联的具体用户和通配符（user → 条件）"""
+        return self._users.get((object, relation), {})
+
+    def usersets(self, object: str, relation: str) -> Dict[str, Condition]:
+        """直接关联的用户集 type:id#relation（用户集 → 条件）"""
+        return self._usersets.get((object, relation), {})
+
+    def objects(self, user: str, object_type: str) -> Set[Tuple[str, str]]:
+        """用户直接关联的某类型对象，返回 (relation, object) 集合"""
+        return self._by_user_type.get((user, object_type), set())
+
+    def related_objects(self, user: str, relation: str, object_type: str) -> Dict[str, Condition]:
+        """与 user 直接有 relation 关系的某类型对象（object → 条件）"""
+        return self._by_user_relation.get((user, relation, object_type), {})
+
+    def read(
+        self,
+        user: Optional[str] = None,
+        relation: Optional[str] = None,
+        object: Optional[str] = None
+    ) -> Iterator[Tuple[str, str, str, Condition, datetime]]:
+        """
+        按 Read API 的过滤规则遍历元组
+
+        object 可以是完整的 'type:id'，也可以只写类型 'type:'。
+        """
+        object_type = None
+        if object and object.endswith(':'):
+            object_type, object = object[:-1], None
+
+        if object and relation:
+            keys: Iterable = [
+                (u, relation, object)
+                for bucket in (self._users, self._usersets)
+                for u in bucket.get((object, relation), {})
+            ]
+        elif user and object_type:
+            keys = [(user, r, o) for r, o in self.objects(user, object_type)]
+        else:
+            keys = list(self._tuples)
+
+        for key in keys:
+            u, r, o = key
+            if (user and u != user) or (relation and r != relation) or (object and o != object) \
+                    or (object_type and _object_type(o) != object_type):
+                continue
+            condition, timestamp = self._tuples[key]
+            yield u, r, o, condition, timestamp
+
+
+class _Overlay:
+    """在基础索引上叠加上下文元组（只在单次检查中有效）"""
+
+    def __init__(self, base: TupleIndex, contextual_tuples: Iterable):
+        self.base = base
+        self.extra = TupleIndex()
+        for t in contextual_tuples:
+            self.extra.add(*tuple_fields(t))
+
+    def users(self, object: str, relation: str) -> Dict[str, Condition]:
+        extra = self.extra.users(object, relation)
+        base = self.base.users(object, relation)
+        return {**base, **extra} if extra else base
+
+    def usersets(self, object: str, relation: str) -> Dict[str, Condition]:
+        extra = self.extra.usersets(object, relation)
+        base = self.base.usersets(object, relation)
+        return {**base, **extra} if extra else base
+
+    def related_objects(self, user: str, relation: str, object_type: str) -> Dict[str, Condition]:
+        extra = self.extra.related_objects(user, relation, object_type)
+        base = self.base.related_objects(user, relation, object_type)
+        return {**base, **extra} if extra else base
+
+
+class CheckEvaluator:
+    """
+    按授权模型计算 Check
+
+    从关系定义出发递归求值，同一次检查中正在求值的 (user, relation, object) 再次出现时视为环，
+    该路径返回 False；递归深度超过 max_depth 时报错（与服务端一致）。
+
+    默认使用 model_compiler 编译后的闭包求值，compiled=False 时逐个节点解释关系定义。
+    """
+
+    def __init__(
+        self,
+        model: Dict[str, Any],
+        index: TupleIndex,
+        conditions: Optional[Dict[str, ConditionFn]] = None,
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        compiled: bool = True
+    ):
+        """
+        Args:
+            model: 授权模型 JSON（fga_dsl.parse / load_model 的结果）
+            index: 元组索引
+            conditions: 条件名 → Python 实现
+            max_depth: 最大解析深度
+            compiled: 是否使用编译后的模型求值
+        """
+        self.model = model
+        self.index = index
+        self.conditions = conditions or {}
+        self.max_depth = max_depth
+        self.compiled = None
+        if compiled:
+            from model_compiler import compile_model
+            self.compiled = compile_model(model, max_depth)
+
+        self.relations: Dict[str, Dict[str, Any]] = {}
+        self.directly_related: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for definition in model.get('type_definitions', []):
+            self.relations[definition['type']] = definition.get('relations') or {}
+            metadata = (definition.get('metadata') or {}).get('relations') or {}
+            for relation, meta in metadata.items():
+                self.directly_related[(definition['type'], relation)] = \
+                    meta.get('directly_related_user_types') or []
+
+    # ---------- 校验 ----------
+
+    def validate_check(self, user: str, relation: str, object: str):
+        """校验检查请求中的类型和关系是否在模型中定义"""
+        object_type, _, object_id = object.partition(':')
+        if not object_id:
+            raise _error(f"invalid object '{object}'")
+        if object_type not in self.relations:
+            raise _error(f"type '{object_type}' not found")
+        if relation not in self.relations[object_type]:
+            raise _error(f"relation '{object_type}#{relation}' not found")
+        if ':' not in user:
+            raise _error(f"invalid user '{user}'")
+
+    def validate_tuple(self, user: str, relation: str, object: str, condition: Condition = None):
+        """校验元组是否符合模型中的类型限制（与服务端写入校验一致）"""
+        object_type = object.split(':', 1)[0]
+        if ':' not in object or object_type not in self.relations:
+            raise _error(f"invalid object '{object}'")
+        if relation not in self.relations[object_type]:
+            raise _error(f"relation '{object_type}#{relation}' not found")
+
+        user_type, _, rest = user.partition(':')
+        user_id, _, user_relation = rest.partition('#')
+        condition_name = condition['name'] if condition else None
+        for allowed in self.directly_related.get((object_type, relation), []):
+            if allowed['type'] != user_type or allowed.get('condition') != condition_name:
+                continue
+            if user_relation:
+                matched = allowed.get('relation') == user_relation
+            elif user_id == '*':
+                matched = 'wildcard' in allowed
+            else:
+                matched = 'relation' not in allowed and 'wildcard' not in allowed
+            if matched:
+                return
+
+        raise _error(
+            f"type '{user_type}' is not an allowed type restriction for '{object_type}#{relation}'"
+            + (f" with condition '{condition_name}'" if condition_name else "")
+        )
+
+    # ---------- 求值 ----------
+
+    def check(
+        self,
+        user: str,
+        relation: str,
+        object: str,
+        contextual_tuples: Optional[Iterable] = None,
+        context: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        检查 user 是否与 object 有 relation 关系
+
+        Raises:
+            ValidationException: 类型或关系未定义、条件没有本地实现、超出解析深度
+        """
+        self.validate_check(user, relation, object)
+        return self._evaluate(user, relation, object, self.overlay(contextual_tuples), context or {})
+
+    def overlay(self, contextual_tuples: Optional[Iterable] = None):
+        """返回叠加了上下文元组的索引（没有上下文元组时返回基础索引）"""
+        if not contextual_tuples:
+            return self.index
+        # 与服务端一致，上下文元组同样要符合类型限制
+        for t in contextual_tuples:
+            self.validate_tuple(*tuple_fields(t))
+        return _Overlay(self.index, contextual_tuples)
+
+    def _evaluate(self, user: str, relation: str, object: str, index, context: Dict[str, Any]) -> bool:
+        """在给定索引上求值（请求已校验）"""
+        if self.compiled is not None:
+            return self.compiled.check(user, relation, object, index, context, self._condition_ok)
+        return self._check(user, relation, object, index, context, set(), 0)
+
+    def _check(self, user: str, relation: str, object: str, index, context: Dict[str, Any],
+               visiting: Set[Tuple[str, str, str]], depth: int) -> bool:
+        if depth >= self.max_depth:
+            raise _error("resolution too complex")
+
+        # 用户集 object#relation 总是与 object 有 relation 关系（与服务端的 IsSelfDefining 一致）
+        if user == f"{object}#{relation}":
+            return True
+
+        key = (user, relation, object)
+        if key in visiting:
+            return False
+
+        rewrite = self.relations.get(_object_type(object), {}).get(relation)
+        if rewrite is None:
+            return False
+
+        visiting.add(key)
+        try:
+            return self._rewrite(rewrite, user, relation, object, index, context, visiting, depth)
+        finally:
+            visiting.discard(key)
+
+    def _rewrite(self, rewrite: Dict[str, Any], user: str, relation: str, object: str, index,
+                 context: Dict[str, Any], visiting: Set, depth: int) -> bool:
+        if 'this' in rewrite:
+            return self._direct(user, relation, object, index, context, visiting, depth)
+
+        if 'computedUserset' in rewrite:
+            return self._check(
+                user, rewrite['computedUserset']['relation'], object, index, context, visiting, depth + 1
+            )
+
+        if 'tupleToUserset' in rewrite:
+            tupleset = rewrite['tupleToUserset']['tupleset']['relation']
+            computed = rewrite['tupleToUserset']['computedUserset']['relation']
+            for parent, condition in index.users(object, tupleset).items():
+                if not self._condition_ok(condition, context):
+                    continue
+                if computed not in self.relations.get(_object_type(parent), {}):
+                    continue
+                if self._check(user, computed, parent, index, context, visiting, depth + 1):
+                    return True
+            return False
+
+        if 'union' in rewrite:
+            return any(
+                self._rewrite(child, user, relation, object, index, context, visiting, depth)
+                for child in rewrite['union']['child']
+            )
+
+        if 'intersection' in rewrite:
+            return all(
+                self._rewrite(child, user, relation, object, index, context, visiting, depth)
+                for child in rewrite['intersection']['child']
+            )
+
+        if 'difference' in rewrite:
+            difference = rewrite['difference']
+            return self._rewrite(difference['base'], user, relation, object, index, context, visiting, depth) \
+                and not self._rewrite(difference['subtract'], user, relation, object, index, context, visiting, depth)
+
+        raise _error(f"unsupported rewrite {list(rewrite)} on '{object}#{relation}'")
+
+    def _direct(self, user: str, relation: str, object: str, index, context: Dict[str, Any],
+                visiting: Set, depth: int) -> bool:
+        """直接授权：具体用户、通配符或用户集"""
+        users = index.users(object, relation)
+        if user in users and self._condition_ok(users[user], context):
+            return True
+
+        if '#' not in user:
+            wildcard = f"{_object_type(user)}:*"
+            if wildcard in users and self._condition_ok(users[wildcard], context):
+                return True
+
+        for userset, condition in index.usersets(object, relation).items():
+            if userset == user:
+                if self._condition_ok(condition, context):
+                    return True
+                continue
+            userset_object, _, userset_relation = userset.partition('#')
+            if self._condition_ok(condition, context) and \
+                    self._check(user, userset_relation, userset_object, index, context, visiting, depth + 1):
+                return True
+        return False
+
+    def _condition_ok(self, condition: Condition, context: Dict[str, Any]) -> bool:
+        """计算元组上的条件，参数为请求 context 与元组 context 合并（元组优先）"""
+        if condition is None:
+            return True
+
+        name = condition['name']
+        fn = self.conditions.get(name)
+        if fn is None:
+            raise _error(f"condition '{name}' has no local implementation")
+        try:
+            return bool(fn({**context, **(condition.get('context') or {})}))
+        except KeyError as e:
+            raise _error(f"condition '{name}' is missing parameter {e}")
+
+
+class LocalOpenFgaClient:
+    """
+    进程内的 OpenFGA 后端
+
+    实现 OpenFGAClientWrapper、CheckBatcher、BulkTupleWriter 使用到的 OpenFgaClient 接口
+    （check / client_batch_check / batch_check / list_objects / streamed_list_objects / list_users / expand /
+    write / read / read_authorization_models），请求中的 authorization_model_id 被忽略，始终使用加载的模型。
+    """
+
+    def __init__(
+        self,
+        model: Union[str, Dict[str, Any]],
+        tuples: Iterable = (),
+        conditions: Optional[Dict[str, ConditionFn]] = None,
+        model_id: str = '01LOCALMODEL0000000000000',
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        compiled: bool = True
+    ):
+        """
+        Args:
+            model: 授权模型 JSON，或 .fga / .json 文件路径
+            tuples: 初始元组（字典或 ClientTuple），写入前按模型校验
+            conditions: 条件名 → Python 实现
+            model_id: read_authorization_models 返回的模型 ID
+            max_depth: 最大解析深度
+            compiled: 是否使用编译后的模型求值（False 时解释执行，用于对比）
+        """
+        if isinstance(model, str):
+            from fga_dsl import load_model
+            model = load_model(model)
+
+        self.model = model
+        self.model_id = model_id
+        self.index = TupleIndex()
+        self.evaluator = CheckEvaluator(model, self.index, conditions, max_depth, compiled)
+
+        from reverse_expand import ObjectLister
+        from user_expand import UserExpander
+        self.lister = ObjectLister(self.evaluator)
+        self.expander = UserExpander(self.evaluator)
+        self.add_tuples(tuples)
+
+    def add_tuples(self, tuples: Iterable):
+        """同步写入元组（已存在的跳过），用于准备测试数据"""
+        for t in tuples:
+            user, relation, object, condition = tuple_fields(t)
+            self.evaluator.validate_tuple(user, relation, object, condition)
+            self.index.add(user, relation, object, condition)
+
+    async def close(self):
+        """与 OpenFgaClient 接口一致，本地后端无需释放资源"""
+
+    # ---------- Check ----------
+
+    async def check(self, body: ClientCheckRequest, options: Optional[Dict[str, Any]] = None) -> CheckResponse:
+        """本地计算一次 Check"""
+        allowed = self.evaluator.check(
+            body.user, body.relation, body.object, body.contextual_tuples, body.context
+        )
+        return CheckResponse(allowed=allowed)
+
+    async def client_batch_check(
+        self,
+        body: List[ClientCheckRequest],
+        options: Optional[Dict[str, Any]] = None
+    ) -> List[ClientBatchCheckClientResponse]:
+        """逐条检查，单条失败时记录在该项的 error 中（与 SDK 行为一致）"""
+        results = []
+        for request in body:
+            try:
+                response = await self.check(request, options)
+            except ValidationException as e:
+                results.append(ClientBatchCheckClientResponse(allowed=False, request=request, error=e))
+            else:
+                results.append(ClientBatchCheckClientResponse(
+                    allowed=response.allowed, request=request, response=response
+                ))
+        return results
+
+    async def batch_check(
+        self,
+        body: ClientBatchCheckRequest,
+        options: Optional[Dict[str, Any]] = None
+    ) -> ClientBatchCheckResponse:
+        """服务端 BatchCheck 接口，按 correlation_id 返回结果"""
+        results = []
+        for item in body.checks:
+            error = None
+            try:
+                allowed = self.evaluator.check(
+                    item.user, item.relation, item.object, item.contextual_tuples, item.context
+                )
+            except ValidationException as e:
+                allowed = False
+                error = CheckError(input_error='validation_error', message=e.reason)
+            results.append(ClientBatchCheckSingleResponse(
+                allowed=allowed,
+                request=ClientTuple(user=item.user, relation=item.relation, object=item.object),
+                correlation_id=item.correlation_id,
+                error=error
+            ))
+        return ClientBatchCheckResponse(result=results)
+
+    # ---------- ListObjects ----------
+
+    def iter_objects(
+        self,
+        user: str,
+        relation: str,
+        type: str,
+        contextual_tuples: Optional[Iterable] = None,
+        context: Optional[Dict[str, Any]] = None
+    ) -> Iterator[str]:
+        """逐个产出 user 与之有 relation 关系的 type 类型对象（reverse_expand.ObjectLister）"""
+        return self.lister.list_objects(user, relation, type, contextual_tuples, context)
+
+    async def list_objects(
+        self,
+        body: ClientListObjectsRequest,
+        options: Optional[Dict[str, Any]] = None
+    ) -> ListObjectsResponse:
+        """本地计算 ListObjects，返回全部对象（不受服务端 1000 个结果的限制）"""
+        return ListObjectsResponse(objects=list(self.iter_objects(
+            body.user, body.relation, body.type, body.contextual_tuples, body.context
+        )))
+
+    async def streamed_list_objects(
+        self,
+        body: ClientListObjectsRequest,
+        options: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[StreamedListObjectsResponse]:
+        """与 OpenFgaClient.streamed_list_objects 一致，逐个返回对象"""
+        for object in self.iter_objects(body.user, body.relation, body.type, body.contextual_tuples, body.context):
+            yield StreamedListObjectsResponse(object=object)
+
+    # ---------- ListUsers / Expand ----------
+
+    async def list_users(
+        self,
+        body: ClientListUsersRequest,
+        options: Optional[Dict[str, Any]] = None
+    ) -> ListUsersResponse:
+        """本地计算 ListUsers（user_expand.UserExpander，多次请求共享展开结果）"""
+        subjects = self.expander.list_users(
+            f"{body.object.type}:{body.object.id}",
+            body.relation,
+            [{'type': f.type, 'relation': f.relation} for f in body.user_filters or []],
+            body.contextual_tuples,
+            body.context
+        )
+
+        users = []
+        for subject in subjects:
+            subject_type, _, rest = subject.partition(':')
+            subject_id, _, subject_relation = rest.partition('#')
+            if subject_relation:
+                users.append(User(userset=UsersetUser(type=subject_type, id=subject_id, relation=subject_relation)))
+            elif subject_id == '*':
+                users.append(User(wildcard=TypedWildcard(type=subject_type)))
+            else:
+                users.append(User(object=FgaObject(type=subject_type, id=subject_id)))
+        return ListUsersResponse(users=users)
+
+    async def expand(self, body: ClientExpandRequest, options: Optional[Dict[str, Any]] = None) -> ExpandResponse:
+        """本地计算 Expand，返回与服务端相同结构的一层权限树"""
+        return ExpandResponse(tree=self.expander.expand(body.object, body.relation, body.contextual_tuples))
+
+    # ---------- Write / Read ----------
+
+    async def write(self, body: ClientWriteRequest, options: Optional[Dict[str, Any]] = None) -> ClientWriteResponse:
+        """
+        写入和删除元组
+
+        默认是事务模式：写入已存在的元组或删除不存在的元组时整体失败，不做任何修改。
+        options['transaction'].disabled 为 True 时逐个元组处理，在结果中标记成功或失败。
+        options['conflict'] 的 on_duplicate_writes / on_missing_deletes 为 'ignore' 时跳过这两类元组。
+        """
+        writes = list(body.writes or [])
+        deletes = list(body.deletes or [])
+        transaction = (options or {}).get('transaction')
+        conflict = (options or {}).get('conflict')
+        if conflict is not None:
+            if getattr(conflict.on_duplicate_writes, 'value', None) == 'ignore':
+                writes = [t for t in writes if tuple_fields(t)[:3] not in self.index]
+            if getattr(conflict.on_missing_deletes, 'value', None) == 'ignore':
+                deletes = [t for t in deletes if tuple_fields(t)[:3] in self.index]
+
+        if transaction is not None and transaction.disabled:
+            return ClientWriteResponse(
+                writes=[self._write_one(t) for t in writes],
+                deletes=[self._delete_one(t) for t in deletes]
+            )
+
+        for t in writes:
+            user, relation, object, condition = tuple_fields(t)
+            self.evaluator.validate_tuple(user, relation, object, condition)
+            if (user, relation, object) in self.index:
+                raise _error(f"cannot write a tuple which already exists: {user} {relation} {object}")
+        for t in deletes:
+            user, relation, object, _ = tuple_fields(t)
+            if (user, relation, object) not in self.index:
+                raise _error(f"cannot delete a tuple which does not exist: {user} {relation} {object}")
+
+        for t in deletes:
+            self.index.remove(*tuple_fields(t)[:3])
+        for t in writes:
+            self.index.add(*tuple_fields(t))
+
+        return ClientWriteResponse(
+            writes=[ClientWriteSingleResponse(tuple_key=t, success=True) for t in writes],
+            deletes=[ClientWriteSingleResponse(tuple_key=t, success=True) for t in deletes]
+        )
+
+    def _write_one(self, t) -> ClientWriteSingleResponse:
+        user, relation, object, condition = tuple_fields(t)
+        try:
+            self.evaluator.validate_tuple(user, relation, object, condition)
+            if not self.index.add(user, relation, object, condition):
+                raise _error(f"cannot write a tuple which already exists: {user} {relation} {object}")
+        except ValidationException as e:
+            return ClientWriteSingleResponse(tuple_key=t, success=False, error=e)
+        return ClientWriteSingleResponse(tuple_key=t, success=True)
+
+    def _delete_one(self, t) -> ClientWriteSingleResponse:
+        user, relation, object, _ = tuple_fields(t)
+        if not self.index.remove(user, relation, object):
+            error = _error(f"cannot delete a tuple which does not exist: {user} {relation} {object}")
+            return ClientWriteSingleResponse(tuple_key=t, success=False, error=error)
+        return ClientWriteSingleResponse(tuple_key=t, success=True)
+
+    async def read(
+        self,
+        body: Optional[ReadRequestTupleKey] = None,
+        options: Optional[Dict[str, Any]] = None
+    ) -> ReadResponse:
+        """按过滤条件分页读取元组，continuation_token 为下一页的起始位置"""
+        options = options or {}
+        page_size = int(options.get('page_size') or 50)
+        offset = int(options.get('continuation_token') or 0)
+
+        matches = self.index.read(
+            user=body.user if body else None,
+            relation=body.relation if body else None,
+            object=body.object if body else None
+        )
+
+        tuples = []
+        for position, (user, relation, object, condition, timestamp) in enumerate(matches):
+            if position < offset:
+                continue
+            if len(tuples) == page_size:
+                return ReadResponse(tuples=tuples, continuation_token=str(offset + page_size))
+            key = TupleKey(user=user, relation=relation, object=object)
+            if condition:
+                key.condition = RelationshipCondition(name=condition['name'], context=condition.get('context'))
+            tuples.append(TupleModel(key=key, timestamp=timestamp))
+        return ReadResponse(tuples=tuples, continuation_token='')
+
+    # ---------- 授权模型 ----------
+
+    def _authorization_model(self) -> AuthorizationModel:
+        return AuthorizationModel(
+            id=self.model_id,
+            schema_version=self.model.get('schema_version', '1.1'),
+            type_definitions=self.model.get('type_definitions', []),
+            conditions=self.model.get('conditions')
+        )
+
+    async def read_authorization_models(self, options: Optional[Dict[str, Any]] = None):
+        """返回加载的唯一模型"""
+        return ReadAuthorizationModelsResponse(authorization_models=[self._authorization_model()])
+
+    def get_authorization_model_id(self) -> str:
+        return self.model_id
+
+    def set_authorization_model_id(self, value: str):
+        """本地后端只有一个模型，忽略设置"""
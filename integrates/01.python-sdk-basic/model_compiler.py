@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+授权模型编译模块
+
+CheckEvaluator 逐个节点解释关系定义的 JSON 树，每次检查都要重复判断节点类型、查找关系定义。
+本模块把每个 type#relation 预先编译为一个 Python 闭包：
+- 计算关系（如 `or editor`）直接内联为目标关系的闭包，不再经过按名称分派和环检测
+- or / and 的分支按估算代价排序，只查一次字典的直接授权排在最前面
+- 按模型的类型限制裁剪直接授权：模型不允许通配符或用户集时不做对应的查找
+- 不会递归的关系（如 `define owner: [user]`）不维护环检测集合
+- 编译结果按模型内容的哈希缓存，同一个模型只编译一次
+
+编译后的求值结果与 CheckEvaluator 的解释执行一致，区别只有一处：内联的计算关系不计入解析深度。
+
+使用方法:
+    # 在仓库中的 .fga 模型上对比解释执行和编译执行的耗时
+    python model_compiler.py ../*/authorization_model.fga
+
+不需要运行 OpenFGA 服务。
+
+作者: OpenFGA 集成示例
+日期: 2026-02-05
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+import timeit
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+from openfga_sdk.exceptions import ValidationException
+
+from local_eval import DEFAULT_MAX_DEPTH, Condition, _error, _object_type
+
+# 编译后的关系：(user, object, 求值状态, 深度) → 是否有关系
+Program = Callable[[str, str, '_State', int], bool]
+
+# 估算代价：一次字典查找记 1
+_COST_DIRECT = 1
+_COST_USERSETS = 4
+_COST_DISPATCH = 5
+_COST_TUPLE_TO_USERSET = 10
+
+_cache: Dict[Tuple[str, int], 'CompiledModel'] = {}
+
+
+class _State:
+    """单次检查的求值状态"""
+
+    __slots__ = ('index', 'context', 'condition_ok', 'visiting', 'self_object', 'self_relation')
+
+    def __init__(self, user: str, index, context: Dict[str, Any],
+                 condition_ok: Callable[[Condition, Dict[str, Any]], bool]):
+        self.index = index
+        self.context = context
+        self.condition_ok = condition_ok
+        self.visiting = set()
+        # user 是用户集 object#relation 时，它与 object 总是有 relation 关系
+        self.self_object, _, self.self_relation = user.partition('#') if '#' in user else (None, None, None)
+
+
+def _false(user: str, object: str, st: _State, depth: int) -> bool:
+    return False
+
+
+class CompiledModel:
+    """
+    编译后的授权模型
+
+    programs[(type, relation)] 是该关系的入口闭包，负责深度限制和环检测，
+    内部调用编译好的关系体；跨对象的调用（用户集、x from y）在运行时按对象类型查找入口闭包。
+    """
+
+    def __init__(self, model: Dict[str, Any], max_depth: int = DEFAULT_MAX_DEPTH):
+        """
+        Args:
+            model: 授权模型 JSON（fga_dsl.parse / load_model 的结果）
+            max_depth: 最大解析深度
+        """
+        self.max_depth = max_depth
+        self.relations: Dict[str, Dict[str, Any]] = {}
+        self.directly_related: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for definition in model.get('type_definitions', []):
+            self.relations[definition['type']] = definition.get('relations') or {}
+            metadata = (definition.get('metadata') or {}).get('relations') or {}
+            for relation, meta in metadata.items():
+                self.directly_related[(definition['type'], relation)] = \
+                    meta.get('directly_related_user_types') or []
+
+        self.programs: Dict[Tuple[str, str], Program] = {}
+        for object_type, relations in self.relations.items():
+            for relation, rewrite in relations.items():
+                body, _, recursive = self._compile(rewrite, object_type, relation, (relation,))
+                self.programs[(object_type, relation)] = \
+                    self._entry(body, relation) if recursive else body
+
+    def check(
+        self,
+        user: str,
+        relation: str,
+        object: str,
+        index,
+        context: Dict[str, Any],
+        condition_ok: Callable[[Condition, Dict[str, Any]], bool]
+    ) -> bool:
+        """
+        检查 user 是否与 object 有 relation 关系（请求已经过 CheckEvaluator.validate_check 校验）
+
+        Args:
+            index: TupleIndex 或叠加了上下文元组的索引
+            context: 请求的 context
+            condition_ok: 计算元组条件的函数
+        """
+        program = self.programs.get((_object_type(object), relation))
+        if program is None:
+            return False
+        st = _State(user, index, context, condition_ok)
+        if st.self_relation == relation and st.self_object == object:
+            return True
+        return program(user, object, st, 0)
+
+    # ---------- 编译 ----------
+
+    def _entry(self, body: Program, relation: str) -> Program:
+        """关系的入口：深度限制和环检测"""
+        max_depth = self.max_depth
+
+        def entry(user: str, object: str, st: _State, depth: int) -> bool:
+            if depth >= max_depth:
+                raise _error("resolution too complex")
+            key = (user, relation, object)
+            visiting = st.visiting
+            if key in visiting:
+                return False
+            visiting.add(key)
+            try:
+                return body(user, object, st, depth)
+            finally:
+                visiting.discard(key)
+
+        return entry
+
+    def _compile(
+        self,
+        rewrite: Dict[str, Any],
+        object_type: str,
+        relation: str,
+        inlining: Tuple[str, ...]
+    ) -> Tuple[Program, int, bool]:
+        """
+        编译一个关系定义节点
+
+        Args:
+            inlining: 正在内联的关系（用于在计算关系成环时改为调用入口闭包）
+
+        Returns:
+            (闭包, 估算代价, 是否会调用其他入口闭包)
+        """
+        if 'this' in rewrite:
+            return self._compile_direct(object_type, relation)
+
+        if 'computedUserset' in rewrite:
+            target = rewrite['computedUserset']['relation']
+            target_rewrite = self.relations[object_type].get(target)
+            if target_rewrite is None:
+                return _false, 0, False
+            if target in inlining:
+                return self._compile_call(object_type, target), _COST_DISPATCH, True
+            body, cost, recursive = self._compile(target_rewrite, object_type, target, inlining + (target,))
+            return self._compile_self_defining(body, target), cost, recursive
+
+        if 'tupleToUserset' in rewrite:
+            return self._compile_tuple_to_userset(
+                rewrite['tupleToUserset']['tupleset']['relation'],
+                rewrite['tupleToUserset']['computedUserset']['relation']
+            ), _COST_TUPLE_TO_USERSET, True
+
+        if 'union' in rewrite or 'intersection' in rewrite:
+            operator = 'union' if 'union' in rewrite else 'intersection'
+            children = sorted(
+                (self._compile(child, object_type, relation, inlining) for child in rewrite[operator]['child']),
+                key=lambda compiled: compiled[1]
+            )
+            programs = tuple(program for program, _, _ in children)
+            cost = sum(cost for _, cost, _ in children)
+            recursive = any(recursive for _, _, recursive in children)
+            if operator == 'union':
+                return self._compile_union(programs), cost, recursive
+            return self._compile_intersection(programs), cost, recursive
+
+        if 'difference' in rewrite:
+            base, base_cost, base_recursive = self._compile(
+                rewrite['difference']['base'], object_type, relation, inlining
+            )
+            subtract, subtract_cost, subtract_recursive = self._compile(
+                rewrite['difference']['subtract'], object_type, relation, inlining
+            )
+
+            def difference(user: str, object: str, st: _State, depth: int) -> bool:
+                return base(user, object, st, depth) and not subtract(user, object, st, depth)
+
+            return difference, base_cost + subtract_cost, base_recursive or subtract_recursive
+
+        raise _error(f"unsupported rewrite {list(rewrite)} on '{object_type}#{relation}'")
+
+    def _compile_direct(self, object_type: str, relation: str) -> Tuple[Program, int, bool]:
+        """直接授权：按类型限制只保留需要的查找"""
+        restrictions = self.directly_related.get((object_type, relation), [])
+        wildcards = {r['type']: f"{r['type']}:*" for r in restrictions if 'wildcard' in r}
+        has_usersets = any('relation' in r for r in restrictions)
+        programs = self.programs
+
+        def direct(user: str, object: str, st: _State, depth: int) -> bool:
+            users = st.index.users(object, relation)
+            if users:
+                if user in users:
+                    condition = users[user]
+                    if condition is None or st.condition_ok(condition, st.context):
+                        return True
+                if wildcards and '#' not in user:
+                    wildcard = wildcards.get(user[:user.find(':')])
+                    if wildcard in users:
+                        condition = users[wildcard]
+                        if condition is None or st.condition_ok(condition, st.context):
+                            return True
+            if not has_usersets:
+                return False
+
+            for userset, condition in st.index.usersets(object, relation).items():
+                if condition is not None and not st.condition_ok(condition, st.context):
+                    continue
+                if userset == user:
+                    return True
+                userset_object, _, userset_relation = userset.partition('#')
+                program = programs.get((userset_object[:userset_object.find(':')], userset_relation))
+                if program is not None and program(user, userset_object, st, depth + 1):
+                    return True
+            return False
+
+        if has_usersets:
+            return direct, _COST_USERSETS, True
+        return direct, _COST_DIRECT, False
+
+    @staticmethod
+    def _compile_self_defining(body: Program, relation: str) -> Program:
+        """内联的计算关系：先判断用户集 object#relation 自身（与服务端的 IsSelfDefining 一致）"""
+        def self_defining(user: str, object: str, st: _State, depth: int) -> bool:
+            if st.self_relation == relation and st.self_object == object:
+                return True
+            return body(user, object, st, depth)
+
+        return self_defining
+
+    def _compile_call(self, object_type: str, relation: str) -> Program:
+        """调用同一对象上另一个关系的入口闭包（计算关系成环时使用）"""
+        programs = self.programs
+        key = (object_type, relation)
+
+        def call(user: str, object: str, st: _State, depth: int) -> bool:
+            if st.self_relation == relation and st.self_object == object:
+                return True
+            return programs[key](user, object, st, depth + 1)
+
+        return call
+
+    def _compile_tuple_to_userset(self, tupleset: str, computed: str) -> Program:
+        """x from y：对每个 y 关联的对象检查 x"""
+        programs = self.programs
+
+        def tuple_to_userset(user: str, object: str, st: _State, depth: int) -> bool:
+            for parent, condition in st.index.users(object, tupleset).items():
+                if condition is not None and not st.condition_ok(condition, st.context):
+                    continue
+                if parent == st.self_object and computed == st.self_relation:
+                    return True
+                program = programs.get((parent[:parent.find(':')], computed))
+                if program is not None and program(user, parent, st, depth + 1):
+                    return True
+            return False
+
+        return tuple_to_userset
+
+    @staticmethod
+    def _compile_union(programs: Tuple[Program, ...]) -> Program:
+        if len(programs) == 2:
+            first, second = programs
+
+            def union2(user: str, object: str, st: _State, depth: int) -> bool:
+                return first(user, object, st, depth) or second(user, object, st, depth)
+
+            return union2
+
+        def union(user: str, object: str, st: _State, depth: int) -> bool:
+            for program in programs:
+                if program(user, object, st, depth):
+                    return True
+            return False
+
+        return union
+
+    @staticmethod
+    def _compile_intersection(programs: Tuple[Program, ...]) -> Program:
+        def intersection(user: str, object: str, st: _State, depth: int) -> bool:
+            for program in programs:
+                if not program(user, object, st, depth):
+                    return False
+            return True
+
+        return intersection
+
+
+def model_hash(model: Dict[str, Any]) -> str:
+    """模型内容的哈希（与字典的键顺序无关）"""
+    text = json.dumps(model, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def compile_model(model: Dict[str, Any], max_depth: int = DEFAULT_MAX_DEPTH) -> CompiledModel:
+    """编译授权模型，相同内容的模型返回同一个编译结果"""
+    key = (model_hash(model), max_depth)
+    compiled = _cache.get(key)
+    if compiled is None:
+        compiled = _cache[key] = CompiledModel(model, max_depth)
+    return compiled
+
+
+# ---------- 基准测试 ----------
+
+def generate_tuples(model: Dict[str, Any], objects: int, per_relation: int,
+                    rng: random.Random) -> List[Dict[str, Any]]:
+    """
+    按模型的类型限制随机生成元组，每种类型 objects 个对象
+
+    同类型之间的引用（父文件夹、嵌套组）只指向编号更小的对象，生成的层级较浅且没有环。
+    """
+    tuples = []
+    for definition in model.get('type_definitions', []):
+        object_type = definition['type']
+        metadata = (definition.get('metadata') or {}).get('relations') or {}
+        for relation, meta in metadata.items():
+            restrictions = meta.get('directly_related_user_types') or []
+            if not restrictions:
+                continue
+            for i in range(objects):
+                for _ in range(per_relation):
+                    r = rng.choice(restrictions)
+                    user_id = rng.randrange(objects)
+                    if r['type'] == object_type:
+                        if i == 0:
+                            continue
+                        user_id = rng.randrange(max(1, i // 2))
+                    if 'wildcard' in r:
+                        if rng.random() > 0.1:
+                            continue
+                        user = f"{r['type']}:*"
+                    elif 'relation' in r:
+                        user = f"{r['type']}:{user_id}#{r['relation']}"
+                    else:
+                        user = f"{r['type']}:{user_id}"
+                    t = {'user': user, 'relation': relation, 'object': f"{object_type}:{i}"}
+                    if r.get('condition'):
+                        t['condition'] = {'name': r['condition'], 'context': {}}
+                    tuples.append(t)
+    return tuples
+
+
+def benchmark(path: str, objects: int, per_relation: int, checks: int,
+              seed: int = 0) -> Dict[str, Any]:
+    """
+    在随机生成的元组上对比解释执行和编译执行
+
+    两种方式的结果逐条比对，耗时重复 5 轮取最快一轮。
+    """
+    from fga_dsl import load_model
+    from local_eval import LocalOpenFgaClient
+
+    rng = random.Random(seed)
+    model = load_model(path)
+    conditions = {name: (lambda params: True) for name in model.get('conditions') or {}}
+    backend = LocalOpenFgaClient(model, conditions=conditions, compiled=False)
+    backend.add_tuples(generate_tuples(model, objects, per_relation, rng))
+    interpreter = backend.evaluator
+    compiled = CompiledModel(model, interpreter.max_depth)
+
+    relations = [(t, r) for t, rels in interpreter.relations.items() for r in rels]
+    user_types = sorted({
+        r['type'] for restrictions in interpreter.directly_related.values()
+        for r in restrictions if 'relation' not in r and 'wildcard' not in r
+    })
+    requests = []
+    for _ in range(checks):
+        object_type, relation = rng.choice(relations)
+        requests.append((
+            f"{rng.choice(user_types)}:{rng.randrange(objects)}",
+            relation,
+            f"{object_type}:{rng.randrange(objects)}"
+        ))
+
+    def run(check) -> List[Optional[bool]]:
+        results = []
+        for u, r, o in requests:
+            try:
+                results.append(check(u, r, o))
+            except ValidationException:
+                results.append(None)
+        return results
+
+    def run_interpreted():
+        return run(lambda u, r, o: interpreter._check(u, r, o, interpreter.index, {}, set(), 0))
+
+    def run_compiled():
+        return run(lambda u, r, o: compiled.check(u, r, o, interpreter.index, {}, interpreter._condition_ok))
+
+    expected, actual = run_interpreted(), run_compiled()
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+
+    started = time.perf_counter()
+    CompiledModel(model, interpreter.max_depth)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    interpreted_us = min(timeit.repeat(run_interpreted, number=1, repeat=5)) / checks * 1e6
+    compiled_us = min(timeit.repeat(run_compiled, number=1, repeat=5)) / checks * 1e6
+    return {
+        'path': path,
+        'relations': len(relations),
+        'tuples': len(interpreter.index),
+        'allowed': sum(1 for allowed in expected if allowed),
+        'mismatches': mismatches,
+        'compile_ms': compile_ms,
+        'interpreted_us': interpreted_us,
+        'compiled_us': compiled_us,
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description='对比授权模型解释执行和编译执行的 Check 耗时',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  python model_compiler.py authorization_model.fga
+  python model_compiler.py ../*/authorization_model.fga --objects 100 --checks 20000
+        """
+    )
+    parser.add_argument('files', nargs='+', help='.fga 或 .json 模型文件')
+    parser.add_argument('--objects', type=int, default=50, help='每种类型生成的对象数 (默认: 50)')
+    parser.add_argument('--per-relation', type=int, default=2, help='每个对象每个关系生成的元组数 (默认: 2)')
+    parser.add_argument('--checks', type=int, default=5000, help='随机检查的次数 (默认: 5000)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子 (默认: 0)')
+    args = parser.parse_args()
+
+    failed = False
+    for path in args.files:
+        result = benchmark(path, args.objects, args.per_relation, args.checks, args.seed)
+        speedup = result['interpreted_us'] / result['compiled_us']
+        mark = '✓' if result['mismatches'] == 0 else '✗'
+        print(
+            f"{mark} {path}: {result['relations']} 个关系, {result['tuples']} 个元组, "
+            f"允许 {result['allowed']}/{args.checks}, 编译 {result['compile_ms']:.2f} ms\n"
+            f"    解释执行 {result['interpreted_us']:.2f} µs/检查, "
+            f"编译执行 {result['compiled_us']:.2f} µs/检查 ({speedup:.1f}x)"
+        )
+        if result['mismatches']:
+            print(f"    ✗ {result['mismatches']} 次检查结果不一致", file=sys.stderr)
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
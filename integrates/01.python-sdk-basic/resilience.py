@@ -0,0 +1,284 @@
+"""
+调用弹性策略模块
+
+为 OpenFGA 请求提供统一的弹性策略，避免一次 429 / 5xx 直接变成用户看到的错误，
+同时在集群过载时限制重试带来的额外负载：
+- 只重试幂等的读请求（Check、ListObjects、Read 等），使用带随机抖动的指数退避
+- 服务端返回 Retry-After 时按其等待
+- 每次调用有总的截止时间预算，所有重试共享，等待时间超出预算时直接放弃
+- 按接口维护熔断器，连续失败达到阈值后快速失败，冷却后放行一个探测请求
+
+作者: OpenFGA 集成示例
+日期: 2026-02-05
+"""
+
+import asyncio
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, Callable, Awaitable, TypeVar
+
+from openfga_sdk.rest import ApiException
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class ResilienceError(Exception):
+    """弹性策略拒绝或放弃请求时抛出，带有与 ApiException 相同的 status / body 字段"""
+
+    status: int = 503
+
+    def __init__(self, message: str, endpoint: str):
+        super().__init__(message)
+        self.endpoint = endpoint
+        self.body = None
+
+
+class CircuitOpenError(ResilienceError):
+    """熔断器处于打开状态，请求未发送"""
+
+    status = 503
+
+
+class DeadlineExceededError(ResilienceError):
+    """在截止时间预算内没有得到结果"""
+
+    status = 504
+
+
+def is_retryable(error: BaseException) -> bool:
+    """限流、服务端错误（501 除外）、超时和网络错误可以重试"""
+    if isinstance(error, ApiException):
+        status = error.status or 0
+        return status == 429 or (status >= 500 and status != 501)
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError, OSError)) or \
+        type(error).__module__.startswith('aiohttp')
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """从 ApiException 的 Retry-After 头中解析等待秒数（支持秒数和 HTTP 日期）"""
+    headers = getattr(error, 'header', None) or {}
+    value = headers.get('retry-after') or headers.get('Retry-After')
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    closed: 正常放行，连续失败 failure_threshold 次后进入 open
+    open: 直接拒绝，经过 reset_timeout 秒后进入 half_open
+    half_open: 只放行一个探测请求，成功则回到 closed，失败则重新 open
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """判断是否放行本次请求"""
+        if self.state == 'closed':
+            return True
+
+        if self.state == 'open':
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = 'half_open'
+            self._probing = False
+
+        # half_open：同一时间只放行一个探测请求
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self):
+        """记录成功"""
+        self.state = 'closed'
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        """记录一次可归因于服务端的失败"""
+        self.failures += 1
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            if self.state != 'open':
+                logger.warning(f"熔断器打开: 连续失败 {self.failures} 次，{self.reset_timeout}s 后探测")
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """请求以不影响熔断判断的方式结束（如 400 校验错误）时释放探测名额"""
+        self._probing = False
+
+
+class ResiliencePolicy:
+    """
+    弹性策略
+
+    所有请求都经过 call()：检查熔断器 → 在截止时间内发送 → 失败时按需退避重试。
+
+    示例:
+        policy = ResiliencePolicy(max_retries=3, deadline=2.0)
+        response = await policy.call('check', lambda: client.check(body), idempotent=True)
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 0.05,
+        max_delay: float = 2.0,
+        deadline: Optional[float] = 5.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        respect_retry_after: bool = True
+    ):
+        """
+        初始化弹性策略
+
+        Args:
+            max_retries: 幂等请求的最大重试次数
+            base_delay: 第一次重试的退避上限（秒），之后每次翻倍，实际等待在 [0, 上限] 内随机
+            max_delay: 单次退避的最大秒数
+            deadline: 每次调用（含所有重试）的总时间预算（秒），None 表示不限制
+            failure_threshold: 熔断器打开前允许的连续失败次数
+            reset_timeout: 熔断器打开后多久放行探测请求（秒）
+            respect_retry_after: 是否遵循服务端返回的 Retry-After
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.respect_retry_after = respect_retry_after
+
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        """获取（或创建）接口的熔断器"""
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            self.breakers[endpoint] = breaker
+        return breaker
+
+    def _count(self, endpoint: str, name: str):
+        stats = self._stats.setdefault(endpoint, {
+            'calls': 0, 'retries': 0, 'failures': 0, 'rejected': 0, 'deadline_exceeded': 0
+        })
+        stats[name] += 1
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        """计算下一次重试前的等待时间"""
+        if self.respect_retry_after:
+            retry_after = retry_after_seconds(error)
+            if retry_after is not None:
+                return retry_after
+        # full jitter：在 [0, 上限] 内均匀随机，避免大量客户端同时重试
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def call(
+        self,
+        endpoint: str,
+        fn: Callable[[], Awaitable[T]],
+        idempotent: bool = True,
+        deadline: Optional[float] = None
+    ) -> T:
+        """
+        按策略执行一次调用
+
+        Args:
+            endpoint: 接口名，每个接口有独立的熔断器和统计
+            fn: 发起请求的无参协程函数，每次重试都会重新调用
+            idempotent: 是否幂等，只有幂等请求才会重试
+            deadline: 覆盖默认的时间预算（秒）
+
+        Raises:
+            CircuitOpenError: 熔断器打开
+            DeadlineExceededError: 超出时间预算
+            ApiException: 不可重试的错误，或重试次数用尽
+        """
+        budget = deadline if deadline is not None else self.deadline
+        expires_at = time.monotonic() + budget if budget is not None else None
+        breaker = self.breaker(endpoint)
+        self._count(endpoint, 'calls')
+
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                self._count(endpoint, 'rejected')
+                raise CircuitOpenError(f"{endpoint} 熔断中，请稍后重试", endpoint)
+
+            remaining = expires_at - time.monotonic() if expires_at is not None else None
+            if remaining is not None and remaining <= 0:
+                breaker.release()
+                self._count(endpoint, 'deadline_exceeded')
+                raise DeadlineExceededError(f"{endpoint} 超出 {budget}s 时间预算", endpoint)
+
+            try:
+                if remaining is None:
+                    result = await fn()
+                else:
+                    result = await asyncio.wait_for(fn(), remaining)
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as e:
+                error = e
+            else:
+                breaker.record_success()
+                return result
+
+            retryable = is_retryable(error)
+            if retryable:
+                breaker.record_failure()
+                self._count(endpoint, 'failures')
+            else:
+                breaker.release()
+                raise error
+
+            if isinstance(error, asyncio.TimeoutError) and expires_at is not None \
+                    and time.monotonic() >= expires_at:
+                self._count(endpoint, 'deadline_exceeded')
+                raise DeadlineExceededError(f"{endpoint} 超出 {budget}s 时间预算", endpoint) from error
+
+            if not idempotent or attempt >= self.max_retries:
+                raise error
+
+            delay = self._backoff(attempt, error)
+            if expires_at is not None and time.monotonic() + delay >= expires_at:
+                # 等待后也没有剩余预算，不再重试，避免给过载的集群增加负载
+                raise error
+
+            attempt += 1
+            self._count(endpoint, 'retries')
+            logger.debug(f"{endpoint} 失败，{delay:.3f}s 后第 {attempt} 次重试: {error}")
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        """按接口返回调用统计和熔断器状态"""
+        return {
+            endpoint: {**counters, 'circuit': self.breaker(endpoint).state}
+            for endpoint, counters in self._stats.items()
+        }
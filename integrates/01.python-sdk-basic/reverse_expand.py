@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+本地 ListObjects 模块
+
+ListObjects 是 OpenFGA 最慢的接口：服务端需要对候选对象逐个展开关系。本模块在进程内的元组存储上
+从用户出发反向遍历模型的关系图：
+- 先通过反向索引 (user, relation, 对象类型) → 对象，找到用户直接关联的对象
+- 再沿着关系图的反向边传播：用户集（group#member → 授权给该用户集的对象）、
+  x from y（父对象 → 指向它的子对象）、计算关系（owner → 包含 owner 的 viewer）
+- 只遍历能到达目标关系的边，结果以生成器逐个产出并去重，第一个结果不需要等待整个遍历结束
+- and / but not 下的边只能得到候选对象，产出前用一次 Check 确认
+
+使用方法:
+    lister = ObjectLister(backend.evaluator)
+    for object in lister.list_objects('user:anne', 'viewer', 'document'):
+        print(object)
+
+    # 测量大量可访问对象时第一个结果和全部结果的耗时
+    python reverse_expand.py --objects 100000
+
+不需要运行 OpenFGA 服务。
+
+作者: OpenFGA 集成示例
+日期: 2026-02-05
+"""
+
+import argparse
+import gc
+import time
+from collections import namedtuple
+from typing import Optional, Dict, Any, List, Set, Tuple, Iterable, Iterator
+
+from local_eval import CheckEvaluator, _error, _object_type
+
+# 反向边：源关系上的事实 (user 与 x 有 relation) 推出目标关系上的事实
+# kind: 'computed'（同一个对象）/ 'userset'（授权给 x#relation 的对象）/ 'tupleset'（通过 via 关系指向 x 的对象）
+_Edge = namedtuple('_Edge', ['kind', 'type', 'relation', 'via', 'guarded'])
+
+
+class ObjectLister:
+    """
+    在 CheckEvaluator 的元组索引上计算 ListObjects
+
+    构造时从模型生成反向关系图：每条边从被引用的关系指向引用它的关系，
+    guarded 表示这条边位于 and / but not 之下，推出的只是候选，需要 Check 确认。
+    """
+
+    def __init__(self, evaluator: CheckEvaluator):
+        self.evaluator = evaluator
+        # (type, relation) → 直接授权是否需要确认
+        self.direct: Dict[Tuple[str, str], bool] = {}
+        self.edges: Dict[Tuple[str, str], List[_Edge]] = {}
+        self._relevant: Dict[Tuple[str, str], Set[Tuple[str, str]]] = {}
+
+        for object_type, relations in evaluator.relations.items():
+            for relation, rewrite in relations.items():
+                self._walk(rewrite, object_type, relation, False)
+
+    def _walk(self, rewrite: Dict[str, Any], object_type: str, relation: str, guarded: bool):
+        """把一个关系定义中的引用登记为反向边"""
+        if 'this' in rewrite:
+            key = (object_type, relation)
+            self.direct[key] = self.direct.get(key, True) and guarded
+            for allowed in self.evaluator.directly_related.get(key, []):
+                if 'relation' in allowed:
+                    self._add_edge(allowed['type'], allowed['relation'],
+                                   _Edge('userset', object_type, relation, None, guarded))
+
+        elif 'computedUserset' in rewrite:
+            self._add_edge(object_type, rewrite['computedUserset']['relation'],
+                           _Edge('computed', object_type, relation, None, guarded))
+
+        elif 'tupleToUserset' in rewrite:
+            tupleset = rewrite['tupleToUserset']['tupleset']['relation']
+            computed = rewrite['tupleToUserset']['computedUserset']['relation']
+            for allowed in self.evaluator.directly_related.get((object_type, tupleset), []):
+                if 'relation' in allowed or 'wildcard' in allowed:
+                    continue
+                if computed in self.evaluator.relations.get(allowed['type'], {}):
+                    self._add_edge(allowed['type'], computed,
+                                   _Edge('tupleset', object_type, relation, tupleset, guarded))
+
+        elif 'union' in rewrite:
+            for child in rewrite['union']['child']:
+                self._walk(child, object_type, relation, guarded)
+
+        elif 'intersection' in rewrite:
+            # 交集的结果一定在任一分支中，只需要从第一个分支生成候选
+            self._walk(rewrite['intersection']['child'][0], object_type, relation, True)
+
+        elif 'difference' in rewrite:
+            # 减去的部分不会授予权限
+            self._walk(rewrite['difference']['base'], object_type, relation, True)
+
+    def _add_edge(self, source_type: str, source_relation: str, edge: _Edge):
+        edges = self.edges.setdefault((source_type, source_relation), [])
+        if edge not in edges:
+            edges.append(edge)
+
+    def relevant(self, object_type: str, relation: str) -> Set[Tuple[str, str]]:
+        """能到达目标关系的所有关系（包括目标本身），按目标缓存"""
+        target = (object_type, relation)
+        relevant = self._relevant.get(target)
+        if relevant is not None:
+            return relevant
+
+        incoming: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        for source, edges in self.edges.items():
+            for edge in edges:
+                incoming.setdefault((edge.type, edge.relation), []).append(source)
+
+        relevant = {target}
+        pending = [target]
+        while pending:
+            for source in incoming.get(pending.pop(), []):
+                if source not in relevant:
+                    relevant.add(source)
+                    pending.append(source)
+
+        self._relevant[target] = relevant
+        return relevant
+
+    def list_objects(
+        self,
+        user: str,
+        relation: str,
+        type: str,
+        contextual_tuples: Optional[Iterable] = None,
+        context: Optional[Dict[str, Any]] = None
+    ) -> Iterator[str]:
+        """
+        逐个产出 user 与之有 relation 关系的 type 类型对象（不重复，顺序不固定）
+
+        遍历过程中可以写入元组，但结果不是一致的快照：与服务端的 StreamedListObjects 一样，
+        写入前后的对象都可能出现或缺失。
+
+        Raises:
+            ValidationException: 类型或关系未定义、条件没有本地实现
+        """
+        evaluator = self.evaluator
+        if type not in evaluator.relations:
+            raise _error(f"type '{type}' not found")
+        if relation not in evaluator.relations[type]:
+            raise _error(f"relation '{type}#{relation}' not found")
+        if ':' not in user:
+            raise _error(f"invalid user '{user}'")
+
+        index = evaluator.overlay(contextual_tuples)
+        context = context or {}
+        target = (type, relation)
+        relevant = self.relevant(type, relation)
+
+        subjects = [user]
+        if '#' not in user:
+            subjects.append(f"{user.split(':', 1)[0]}:*")
+
+        def seeds():
+            # 用户集 x#y 自身与 x 有 y 关系（与服务端的 IsSelfDefining 一致）
+            user_object, _, user_relation = user.partition('#')
+            if (_object_type(user_object), user_relation) in relevant:
+                yield _object_type(user_object), user_relation, user_object, None, False
+            for (object_type, direct_relation), guarded in self.direct.items():
+                if (object_type, direct_relation) not in relevant:
+                    continue
+                for subject in subjects:
+                    # 复制后再遍历：生成器挂起期间索引可能被写入修改
+                    for object, condition in list(index.related_objects(subject, direct_relation, object_type).items()):
+                        yield object_type, direct_relation, object, condition, guarded
+
+        def derived(object_type: str, source_relation: str, object: str):
+            for edge in self.edges.get((object_type, source_relation), []):
+                if (edge.type, edge.relation) not in relevant:
+                    continue
+                if edge.kind == 'computed':
+                    if edge.type == object_type:
+                        yield edge.type, edge.relation, object, None, edge.guarded
+                    continue
+                if edge.kind == 'userset':
+                    related = index.related_objects(f"{object}#{source_relation}", edge.relation, edge.type)
+                else:
+                    related = index.related_objects(object, edge.via, edge.type)
+                for child, condition in list(related.items()):
+                    yield edge.type, edge.relation, child, condition, edge.guarded
+
+        # 深度优先：每得到一个事实立即沿反向边展开，第一个结果不需要等待其他种子
+        visited: Set[Tuple[str, str, str]] = set()
+        stack = [seeds()]
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:
+                stack.pop()
+                continue
+
+            object_type, fact_relation, object, condition, guarded = item
+            key = (object_type, fact_relation, object)
+            if key in visited:
+                continue
+            if condition is not None and not evaluator._condition_ok(condition, context):
+                continue
+            visited.add(key)
+            if guarded and not evaluator._evaluate(user, fact_relation, object, index, context):
+                continue
+
+            if (object_type, fact_relation) == target:
+                yield object
+            if (object_type, fact_relation) in self.edges:
+                stack.append(derived(object_type, fact_relation, object))
+
+
+# ---------- 基准测试 ----------
+
+BENCHMARK_MODEL = """
+model
+  schema 1.1
+
+type user
+
+type group
+  relations
+    define member: [user, group#member]
+
+type folder
+  relations
+    define parent: [folder]
+    define viewer: [user, group#member] or viewer from parent
+
+type document
+  relations
+    define parent: [folder]
+    define owner: [user]
+    define blocked: [user]
+    define viewer: ([user, group#member] or owner or viewer from parent) but not blocked
+"""
+
+
+def benchmark(objects: int, first: int = 10) -> Dict[str, float]:
+    """
+    构造 user:anne 可以访问 objects 个文档的 Store，测量 ListObjects 的耗时
+
+    文档一半通过组授权（user:anne → group:eng → 文档），一半通过文件夹继承
+    （group:eng → 文件夹 → 父文件夹 → 文档），另有少量被 but not 排除。
+    """
+    from fga_dsl import parse
+    from local_eval import LocalOpenFgaClient
+
+    backend = LocalOpenFgaClient(parse(BENCHMARK_MODEL))
+    tuples = [
+        {'user': 'user:anne', 'relation': 'member', 'object': 'group:eng'},
+        {'user': 'group:eng#member', 'relation': 'viewer', 'object': 'folder:root'},
+    ]
+    folders = max(1, objects // 1000)
+    for f in range(folders):
+        tuples.append({'user': 'folder:root', 'relation': 'parent', 'object': f'folder:{f}'})
+    for i in range(objects):
+        if i % 2:
+            tuples.append({'user': 'group:eng#member', 'relation': 'viewer', 'object': f'document:{i}'})
+        else:
+            tuples.append({'user': f'folder:{i % folders}', 'relation': 'parent', 'object': f'document:{i}'})
+        if i % 97 == 0:
+            tuples.append({'user': 'user:anne', 'relation': 'blocked', 'object': f'document:{i}'})
+    backend.add_tuples(tuples)
+    lister = ObjectLister(backend.evaluator)
+    # 构造数据产生的垃圾回收不计入耗时
+    gc.collect()
+
+    started = time.perf_counter()
+    results = lister.list_objects('user:anne', 'viewer', 'document')
+    next(results)
+    first_us = (time.perf_counter() - started) * 1e6
+    for _ in range(first - 1):
+        next(results)
+    first_n_us = (time.perf_counter() - started) * 1e6
+
+    started = time.perf_counter()
+    count = sum(1 for _ in lister.list_objects('user:anne', 'viewer', 'document'))
+    all_ms = (time.perf_counter() - started) * 1000
+    return {'count': count, 'first_us': first_us, 'first_n_us': first_n_us, 'all_ms': all_ms}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='测量本地 ListObjects 的首个结果和全部结果耗时')
+    parser.add_argument('--objects', type=int, default=100000, help='用户可访问的文档数 (默认: 100000)')
+    parser.add_argument('--first', type=int, default=10, help='测量前 N 个结果的耗时 (默认: 10)')
+    args = parser.parse_args()
+
+    result = benchmark(args.objects, args.first)
+    print(f"✓ {result['count']} 个对象")
+    print(f"  第 1 个结果: {result['first_us']:.1f} µs")
+    print(f"  前 {args.first} 个结果: {result['first_n_us']:.1f} µs")
+    print(f"  全部结果: {result['all_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
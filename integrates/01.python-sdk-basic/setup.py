@@ -18,6 +18,8 @@ import os
 import sys
 from pathlib import Path
 
+from fga_dsl import load_model, FgaSyntaxError
+
 try:
     import aiohttp
 except ImportError:
@@ -55,14 +57,13 @@ async def create_authorization_model(api_url: str, store_id: str, model_file: st
     """创建授权模型"""
     print(f"\n上传授权模型: {model_file}")
 
-    # 读取模型文件
+    # 读取模型文件（.fga 文件转换为 API JSON，解析结果按内容哈希缓存）
     try:
-        with open(model_file, 'r', encoding='utf-8') as f:
-            model_data = json.load(f)
+        model_data = load_model(model_file)
     except FileNotFoundError:
         print(f"✗ 模型文件不存在: {model_file}")
         return {'success': False, 'error': 'File not found'}
-    except json.JSONDecodeError as e:
+    except (json.JSONDecodeError, FgaSyntaxError) as e:
         print(f"✗ 模型文件格式错误: {str(e)}")
         return {'success': False, 'error': str(e)}
 
@@ -162,8 +163,8 @@ async def main():
   # 指定 Store 名称
   python setup.py --store-name my-app
 
-  # 使用自定义授权模型
-  python setup.py --model-file my_model.json
+  # 使用自定义授权模型（.fga 或 .json）
+  python setup.py --model-file my_model.fga
         """
     )
 
@@ -179,8 +180,8 @@ async def main():
     )
     parser.add_argument(
         '--model-file',
-        default='authorization_model.json',
-        help='授权模型文件路径 (默认: authorization_model.json)'
+        default='authorization_model.fga',
+        help='授权模型文件路径，支持 .fga 和 .json (默认: authorization_model.fga)'
     )
     parser.add_argument(
         '--env-file',
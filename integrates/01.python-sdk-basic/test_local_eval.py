@@ -0,0 +1,469 @@
+"""
+本地权限计算单元测试
+
+不需要运行 OpenFGA 服务。
+"""
+
+import asyncio
+import copy
+
+import pytest
+
+from openfga_sdk.client.models import (
+    ClientCheckRequest,
+    ClientListObjectsRequest,
+    ClientTuple,
+    ClientWriteRequest,
+    WriteTransactionOpts,
+)
+from openfga_sdk.exceptions import ValidationException
+from openfga_sdk.rest import ApiException
+
+from bulk import BulkTupleWriter
+from client import create_client
+from import_tuples import TupleFileReader
+from fga_dsl import parse
+from hedging import HedgingPolicy
+from local_eval import LocalOpenFgaClient
+from model_compiler import compile_model
+from resilience import ResiliencePolicy
+
+MODEL = parse("""
+model
+  schema 1.1
+
+type user
+
+type group
+  relations
+    define member: [user, group#member]
+
+type folder
+  relations
+    define owner: [user]
+    define parent: [folder]
+    define viewer: [user, user:*, group#member] or owner or viewer from parent
+
+type document
+  relations
+    define parent: [folder]
+    define owner: [user]
+    define editor: [user, user with in_hours] or owner
+    define blocked: [user]
+    define viewer: ([user] or editor or viewer from parent) but not blocked
+    define approver: [user]
+    define can_publish: editor and approver
+condition in_hours(hour: int) {
+  hour >= 9 && hour < 18
+}
+""")
+
+TUPLES = [
+    {'user': 'user:anne', 'relation': 'owner', 'object': 'document:budget'},
+    {'user': 'user:beth', 'relation': 'editor', 'object': 'document:budget'},
+    {'user': 'user:beth', 'relation': 'approver', 'object': 'document:budget'},
+    {'user': 'user:carl', 'relation': 'approver', 'object': 'document:budget'},
+    {'user': 'folder:root', 'relation': 'parent', 'object': 'document:budget'},
+    {'user': 'folder:home', 'relation': 'parent', 'object': 'folder:root'},
+    {'user': 'group:eng#member', 'relation': 'member', 'object': 'group:staff'},
+    {'user': 'user:dave', 'relation': 'member', 'object': 'group:eng'},
+    {'user': 'group:staff#member', 'relation': 'viewer', 'object': 'folder:home'},
+    {'user': 'user:erin', 'relation': 'blocked', 'object': 'document:budget'},
+    {'user': 'group:eng#member', 'relation': 'viewer', 'object': 'folder:home'},
+    {'user': 'user:erin', 'relation': 'member', 'object': 'group:eng'},
+    {'user': 'user:*', 'relation': 'viewer', 'object': 'folder:public'},
+    {'user': 'user:fred', 'relation': 'editor', 'object': 'document:budget',
+     'condition': {'name': 'in_hours', 'context': {}}},
+]
+
+
+@pytest.fixture(params=[True, False], ids=['compiled', 'interpreted'])
+def backend(request):
+    """加载测试模型和元组的本地后端（编译执行和解释执行各测一遍）"""
+    return LocalOpenFgaClient(
+        MODEL,
+        tuples=TUPLES,
+        conditions={'in_hours': lambda params: 9 <= params['hour'] < 18},
+        compiled=request.param
+    )
+
+
+def check(backend, user, relation, object, **kwargs) -> bool:
+    return backend.evaluator.check(user, relation, object, **kwargs)
+
+
+class TestCheckEvaluator:
+    """测试 Check 语义"""
+
+    def test_direct_and_computed(self, backend):
+        """直接授权和计算关系"""
+        assert check(backend, 'user:anne', 'owner', 'document:budget')
+        assert check(backend, 'user:anne', 'editor', 'document:budget')
+        assert check(backend, 'user:anne', 'viewer', 'document:budget')
+        assert not check(backend, 'user:beth', 'owner', 'document:budget')
+
+    def test_intersection(self, backend):
+        """and：同时是 editor 和 approver"""
+        assert check(backend, 'user:beth', 'can_publish', 'document:budget')
+        assert not check(backend, 'user:carl', 'can_publish', 'document:budget')
+        assert not check(backend, 'user:anne', 'can_publish', 'document:budget')
+
+    def test_tuple_to_userset_and_nested_usersets(self, backend):
+        """x from y 跨两级文件夹，group#member 嵌套两级"""
+        assert check(backend, 'user:dave', 'viewer', 'folder:home')
+        assert check(backend, 'user:dave', 'viewer', 'folder:root')
+        assert check(backend, 'user:dave', 'viewer', 'document:budget')
+        assert check(backend, 'group:eng#member', 'viewer', 'folder:home')
+        assert not check(backend, 'user:zoe', 'viewer', 'document:budget')
+
+    def test_exclusion(self, backend):
+        """but not：被屏蔽的用户即使通过文件夹获得权限也不能查看"""
+        assert check(backend, 'user:erin', 'viewer', 'folder:home')
+        assert not check(backend, 'user:erin', 'viewer', 'document:budget')
+
+    def test_self_defining_userset(self, backend):
+        """用户集 x#y 自身与 x 有 y 关系，经过计算关系和 x from y 同样成立"""
+        assert check(backend, 'group:x#member', 'member', 'group:x')
+        assert check(backend, 'document:budget#owner', 'editor', 'document:budget')
+        assert check(backend, 'folder:home#viewer', 'viewer', 'document:budget')
+        assert not check(backend, 'group:x#member', 'member', 'group:y')
+        assert list(backend.iter_objects('group:x#member', 'member', 'group')) == ['group:x']
+        assert 'group:x#member' in backend.expander.list_users('group:x', 'member', [{'type': 'group', 'relation': 'member'}])
+        assert 'folder:home#viewer' in backend.expander.subjects('document:budget', 'viewer', context={'hour': 10})
+
+    def test_wildcard(self, backend):
+        """user:* 匹配所有 user，但不匹配其他类型"""
+        assert check(backend, 'user:anyone', 'viewer', 'folder:public')
+        assert not check(backend, 'group:eng#member', 'viewer', 'folder:public')
+
+    def test_condition(self, backend):
+        """带条件的元组按 context 计算"""
+        assert check(backend, 'user:fred', 'editor', 'document:budget', context={'hour': 10})
+        assert not check(backend, 'user:fred', 'editor', 'document:budget', context={'hour': 20})
+        with pytest.raises(ValidationException):
+            check(backend, 'user:fred', 'editor', 'document:budget')
+
+    def test_contextual_tuples(self, backend):
+        """上下文元组只在本次检查中生效"""
+        contextual = [ClientTuple(user='user:zoe', relation='owner', object='document:budget')]
+        assert check(backend, 'user:zoe', 'viewer', 'document:budget', contextual_tuples=contextual)
+        assert not check(backend, 'user:zoe', 'viewer', 'document:budget')
+
+    def test_cycle(self, backend):
+        """循环的父文件夹不会无限递归"""
+        backend.add_tuples([
+            {'user': 'folder:b', 'relation': 'parent', 'object': 'folder:a'},
+            {'user': 'folder:a', 'relation': 'parent', 'object': 'folder:b'},
+        ])
+        assert not check(backend, 'user:anne', 'viewer', 'folder:a')
+
+    def test_validation(self, backend):
+        """未定义的关系和不符合类型限制的元组与服务端一样返回 400"""
+        with pytest.raises(ValidationException):
+            check(backend, 'user:anne', 'nope', 'document:budget')
+        with pytest.raises(ValidationException):
+            backend.add_tuples([{'user': 'group:eng', 'relation': 'owner', 'object': 'document:budget'}])
+        with pytest.raises(ValidationException):
+            check(backend, 'user:anne', 'viewer', 'document:budget',
+                  contextual_tuples=[ClientTuple(user='group:eng', relation='owner', object='document:budget')])
+
+
+class TestModelCompiler:
+    """测试模型编译"""
+
+    def test_memoized_per_model(self):
+        """相同内容的模型只编译一次"""
+        assert compile_model(MODEL) is compile_model(copy.deepcopy(MODEL))
+        assert compile_model(MODEL) is not compile_model(MODEL, max_depth=5)
+
+    def test_computed_cycle(self):
+        """计算关系互相引用时不会无限内联"""
+        model = parse("""
+model
+  schema 1.1
+type user
+type doc
+  relations
+    define a: [user] or b
+    define b: [user] or a
+""")
+        backend = LocalOpenFgaClient(model, tuples=[{'user': 'user:anne', 'relation': 'b', 'object': 'doc:1'}])
+        assert check(backend, 'user:anne', 'a', 'doc:1')
+        assert not check(backend, 'user:beth', 'a', 'doc:1')
+
+
+class TestObjectLister:
+    """测试本地 ListObjects"""
+
+    USERS = ['user:anne', 'user:beth', 'user:dave', 'user:erin', 'user:fred', 'user:zoe',
+             'group:eng#member', 'folder:home#viewer', 'document:budget#owner']
+
+    def objects_of_type(self, backend, object_type):
+        return {o for _, _, o, _, _ in backend.index.read() if o.startswith(object_type + ':')} | \
+            {u.split('#')[0] for u, _, _, _, _ in backend.index.read() if u.startswith(object_type + ':')}
+
+    def test_matches_check(self, backend):
+        """每个用户、每个关系的结果与逐个对象 Check 的结果一致"""
+        context = {'hour': 10}
+        for object_type, relations in backend.evaluator.relations.items():
+            candidates = self.objects_of_type(backend, object_type)
+            for relation in relations:
+                for user in self.USERS:
+                    listed = list(backend.iter_objects(user, relation, object_type, context=context))
+                    assert len(listed) == len(set(listed))
+                    expected = {
+                        o for o in candidates
+                        if check(backend, user, relation, o, context=context)
+                    }
+                    assert set(listed) == expected, (user, relation, object_type)
+
+    def test_condition_and_contextual_tuples(self, backend):
+        """条件不满足的元组不产出，上下文元组参与遍历"""
+        assert 'document:budget' not in set(backend.iter_objects('user:fred', 'editor', 'document', context={'hour': 20}))
+        contextual = [ClientTuple(user='user:zoe', relation='viewer', object='folder:home')]
+        assert set(backend.iter_objects('user:zoe', 'viewer', 'document', contextual_tuples=contextual)) == \
+            {'document:budget'}
+
+    def test_streaming(self, backend):
+        """大量对象时第一个结果不需要等待全部遍历完成"""
+        backend.add_tuples(
+            {'user': 'folder:home', 'relation': 'parent', 'object': f'document:{i}'} for i in range(2000)
+        )
+        results = backend.iter_objects('user:dave', 'viewer', 'document')
+        assert next(results).startswith('document:')
+        assert sum(1 for _ in results) == 2000
+
+    @pytest.mark.asyncio
+    async def test_write_during_stream(self, backend):
+        """流式返回期间写入元组不会中断遍历"""
+        backend.add_tuples(
+            {'user': 'user:zoe', 'relation': 'owner', 'object': f'document:{i}'} for i in range(10)
+        )
+        body = ClientListObjectsRequest(user='user:zoe', relation='viewer', type='document')
+        objects = []
+        async for response in backend.streamed_list_objects(body):
+            objects.append(response.object)
+            if len(objects) == 2:
+                await backend.write(ClientWriteRequest(writes=[
+                    ClientTuple(user='user:zoe', relation='owner', object='document:new')
+                ]))
+        assert len(objects) == len(set(objects)) and len(objects) >= 10
+
+    def test_validation(self, backend):
+        """未定义的类型和关系返回 400"""
+        with pytest.raises(ValidationException):
+            list(backend.iter_objects('user:anne', 'viewer', 'nope'))
+        with pytest.raises(ValidationException):
+            list(backend.iter_objects('user:anne', 'nope', 'document'))
+
+
+class TestUserExpander:
+    """测试本地 ListUsers 和 Expand"""
+
+    def test_matches_check(self, backend):
+        """每个对象、每个关系的 ListUsers 结果与逐个用户 Check 的结果一致"""
+        context = {'hour': 10}
+        tuples = list(backend.index.read())
+        users = {u for u, _, _, _, _ in tuples if u.startswith('user:') and u != 'user:*'} | {'user:zoe'}
+        objects = {o for _, _, o, _, _ in tuples}
+        for object in objects:
+            for relation in backend.evaluator.relations[object.split(':')[0]]:
+                listed = backend.expander.list_users(object, relation, [{'type': 'user'}], context=context)
+                for user in users:
+                    expected = check(backend, user, relation, object, context=context)
+                    assert (user in listed or 'user:*' in listed) == expected, (user, relation, object)
+
+    def test_userset_filter(self, backend):
+        """带 relation 的过滤器返回用户集"""
+        assert sorted(backend.expander.list_users('folder:root', 'viewer', [{'type': 'group', 'relation': 'member'}])) == \
+            ['group:eng#member', 'group:staff#member']
+
+    def test_shared_cache(self, backend):
+        """共享的父文件夹只展开一次，写入后缓存失效"""
+        backend.add_tuples([
+            {'user': 'folder:root', 'relation': 'parent', 'object': 'document:a'},
+            {'user': 'folder:root', 'relation': 'parent', 'object': 'document:b'},
+        ])
+        expander = backend.expander
+        expander.list_users('document:a', 'viewer', [{'type': 'user'}])
+        cache = expander.cache()
+        hits = cache.hits
+        assert 'user:dave' in expander.list_users('document:b', 'viewer', [{'type': 'user'}])
+        assert expander.cache() is cache and cache.hits > hits
+
+        backend.add_tuples([{'user': 'user:zoe', 'relation': 'viewer', 'object': 'folder:root'}])
+        assert expander.cache() is not cache
+        assert 'user:zoe' in expander.list_users('document:b', 'viewer', [{'type': 'user'}])
+
+    def test_cycle_not_cached_partially(self, backend):
+        """环中的节点在环闭合前不写入缓存"""
+        backend.add_tuples([
+            {'user': 'folder:b', 'relation': 'parent', 'object': 'folder:a'},
+            {'user': 'folder:a', 'relation': 'parent', 'object': 'folder:b'},
+            {'user': 'user:zoe', 'relation': 'viewer', 'object': 'folder:a'},
+        ])
+        assert backend.expander.list_users('folder:a', 'viewer', [{'type': 'user'}]) == ['user:zoe']
+        assert backend.expander.list_users('folder:b', 'viewer', [{'type': 'user'}]) == ['user:zoe']
+
+    def test_expand(self, backend):
+        """Expand 返回与服务端相同结构的一层树，每次返回新的树"""
+        tree = backend.expander.expand('document:budget', 'viewer')
+        root = tree.root
+        assert root.name == 'document:budget#viewer'
+        base, subtract = root.difference.base, root.difference.subtract
+        assert [node.leaf.computed.userset for node in base.union.nodes if node.leaf.computed] == \
+            ['document:budget#editor']
+        ttu = [node.leaf.tuple_to_userset for node in base.union.nodes if node.leaf.tuple_to_userset][0]
+        assert [c.userset for c in ttu.computed] == ['folder:root#viewer']
+        assert subtract.leaf.computed.userset == 'document:budget#blocked'
+        assert backend.expander.expand('document:budget', 'blocked').root.leaf.users.users == ['user:erin']
+        tree.root.name = 'changed'
+        assert backend.expander.expand('document:budget', 'viewer').root.name == 'document:budget#viewer'
+
+
+class TestLocalOpenFgaClient:
+    """测试 OpenFgaClient 兼容接口"""
+
+    @pytest.mark.asyncio
+    async def test_write_transaction(self, backend):
+        """事务模式：有一个元组已存在时整体失败"""
+        body = ClientWriteRequest(writes=[
+            ClientTuple(user='user:zoe', relation='owner', object='document:plan'),
+            ClientTuple(user='user:anne', relation='owner', object='document:budget'),
+        ])
+        with pytest.raises(ValidationException):
+            await backend.write(body)
+        assert ('user:zoe', 'owner', 'document:plan') not in backend.index
+
+    @pytest.mark.asyncio
+    async def test_write_non_transactional(self, backend):
+        """非事务模式：逐个元组返回结果"""
+        body = ClientWriteRequest(writes=[
+            ClientTuple(user='user:zoe', relation='owner', object='document:plan'),
+            ClientTuple(user='user:anne', relation='owner', object='document:budget'),
+        ])
+        response = await backend.write(body, {'transaction': WriteTransactionOpts(disabled=True)})
+        assert [w.success for w in response.writes] == [True, False]
+
+    @pytest.mark.asyncio
+    async def test_wrapper_backend(self, backend):
+        """作为 OpenFGAClientWrapper 的后端使用"""
+        async with create_client(backend=backend, batch_checks=True) as client:
+            assert (await client.check_permission('user:dave', 'viewer', 'document:budget'))['allowed']
+            assert await client.check('user:anne', 'viewer', 'document:budget')
+            assert await client.check_many([
+                ClientCheckRequest(user='user:beth', relation='can_publish', object='document:budget'),
+                ClientCheckRequest(user='user:carl', relation='can_publish', object='document:budget'),
+            ]) == [True, False]
+
+            result = await client.write_tuples(writes=[
+                ClientTuple(user='user:zoe', relation='owner', object='document:plan')
+            ])
+            assert result['success']
+            assert await client.check('user:zoe', 'viewer', 'document:plan')
+
+            failed = await client.write_tuples(writes=[
+                ClientTuple(user='user:zoe', relation='owner', object='document:plan')
+            ])
+            assert not failed['success'] and failed['status'] == 400
+
+            tuples = [t async for t in client.iter_tuples(object='document:budget', relation='approver', page_size=1)]
+            assert sorted(t['user'] for t in tuples) == ['user:beth', 'user:carl']
+
+            result = await client.list_objects('user:zoe', 'viewer', 'document')
+            assert result['success'] and result['objects'] == ['document:plan']
+            folders = [o async for o in client.iter_objects('user:dave', 'viewer', 'folder')]
+            assert sorted(folders) == ['folder:home', 'folder:public', 'folder:root']
+
+            result = await client.list_users('document:budget', 'approver', [{'type': 'user'}])
+            assert result['success']
+            assert sorted(f"{u.object.type}:{u.object.id}" for u in result['users']) == ['user:beth', 'user:carl']
+            result = await client.list_users('folder:public', 'viewer', [{'type': 'user'}])
+            assert [u.wildcard.type for u in result['users']] == ['user']
+
+            result = await client.expand('viewer', 'folder:home')
+            assert result['success'] and result['tree'].root.name == 'folder:home#viewer'
+
+    @pytest.mark.asyncio
+    async def test_batched_checks_use_resilience(self, backend):
+        """微批处理的 BatchCheck 请求同样经过弹性策略重试"""
+        batch_check = backend.batch_check
+        failures = [ApiException(status=503, reason='Service Unavailable')]
+
+        async def flaky_batch_check(body, options=None):
+            if failures:
+                raise failures.pop()
+            return await batch_check(body, options)
+
+        backend.batch_check = flaky_batch_check
+        policy = ResiliencePolicy(max_retries=2, base_delay=0.001)
+        async with create_client(backend=backend, batch_checks=True, resilience=policy) as client:
+            result = await client.check_permission('user:dave', 'viewer', 'document:budget')
+            assert result['success'] and result['allowed']
+        assert policy.stats()['batched_check']['retries'] == 1
+
+    @pytest.mark.asyncio
+    async def test_hedging_budget_counts_checks(self, backend):
+        """对冲批量请求会重发全部检查，预算和统计都按检查数计算"""
+        client_batch_check = backend.client_batch_check
+
+        async def slow_batch_check(body, options=None):
+            await asyncio.sleep(0.02)
+            return await client_batch_check(body, options)
+
+        backend.client_batch_check = slow_batch_check
+        hedging = HedgingPolicy(initial_delay=0.001, min_delay=0.001, max_hedge_ratio=0.25)
+        checks = [
+            ClientCheckRequest(user=f'user:{name}', relation='viewer', object='document:budget')
+            for name in ('anne', 'beth', 'carl', 'dave')
+        ]
+        async with create_client(backend=backend, hedging=hedging) as client:
+            for _ in range(4):
+                await client.check_many(checks)
+        stats = hedging.stats()['batch_check']
+        # 16 个检查积累 4 个令牌，只够对冲一个 4 条检查的批次
+        assert stats['requests'] == 16 and stats['hedged'] == 4 and stats['suppressed'] == 12
+        assert stats['hedged'] <= hedging.max_hedge_ratio * stats['requests']
+
+
+class TestBulkTupleWriter:
+    """本地后端上的批量写入"""
+
+    @pytest.mark.asyncio
+    async def test_split_only_invalid_tuples(self, backend):
+        """已存在的元组通过冲突选项忽略，无效元组通过拆块定位"""
+        writer = BulkTupleWriter(backend, chunk_size=4, max_parallel_requests=1)
+        report = await writer.write(writes=[
+            ClientTuple(user='user:anne', relation='owner', object='document:budget'),
+            ClientTuple(user='user:zoe', relation='owner', object='document:plan'),
+            ClientTuple(user='user:zoe', relation='no_such_relation', object='document:plan'),
+            ClientTuple(user='user:zoe', relation='approver', object='document:plan'),
+        ])
+        assert report['written'] == 3 and report['splits'] == 2
+        assert [f['tuple']['relation'] for f in report['failed']] == ['no_such_relation']
+
+    @pytest.mark.asyncio
+    async def test_abort_on_unrelated_errors(self, backend):
+        """认证错误不拆块，也不再写入其他块"""
+        async def forbidden(body, options=None):
+            raise ApiException(status=403, reason='Forbidden')
+
+        backend.write = forbidden
+        writer = BulkTupleWriter(backend, chunk_size=2, max_parallel_requests=1)
+        report = await writer.write(writes=[
+            ClientTuple(user=f'user:{i}', relation='owner', object='document:plan') for i in range(6)
+        ])
+        assert not report['success'] and report['aborted']['status'] == 403
+        assert report['requests'] == 1 and report['splits'] == 0 and report['failed'] == []
+
+
+def test_import_reader_invalid_utf8(tmp_path):
+    """非 UTF-8 的行记为无效行，不中断读取"""
+    path = tmp_path / 'tuples.csv'
+    path.write_bytes(b'user,relation,object\nuser:\xff,owner,document:a\nuser:anne,owner,document:b\n')
+    reader = TupleFileReader(str(path))
+    with open(path, 'rb') as f:
+        reader.read_header(f)
+        rows = list(reader.rows(f, 1))
+    assert rows[0][2] is None and rows[0][3].startswith('无法解析')
+    assert rows[1][2]['user'] == 'user:anne'
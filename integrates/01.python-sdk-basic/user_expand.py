@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+本地 ListUsers 和 Expand 模块
+
+权限审查页面通常对每个文档调用一次 ListUsers 或 Expand，而这些文档大多继承相同的文件夹和组。
+本模块在进程内的元组存储上从对象出发正向展开关系，并在多次请求之间共享展开结果：
+- 每个 (object, relation) 展开后的主体集合（用户、通配符、用户集）只计算一次，
+  例如 100 个文档共享的 folder:root#viewer 和 group:eng#member 只展开一次
+- 没有上下文元组和 context 的 ListUsers 请求共享缓存，直到下一次写入（TupleIndex.version 变化）时
+  整体失效；带上下文的请求只在本次请求内共享
+- Expand 与服务端一样只展开一层，只需读取当前对象的元组，不做遍历，也不使用缓存
+- 环中的节点在环闭合之前不写入缓存，避免缓存不完整的结果
+- and / but not 下只展开第一个分支 / base 得到候选，再逐个用 Check 确认
+
+使用方法:
+    expander = UserExpander(backend.evaluator)
+    expander.list_users('document:budget', 'viewer', [{'type': 'user'}])
+    expander.expand('document:budget', 'viewer')
+
+    # 测量共享缓存对权限审查（逐个文档 ListUsers）的效果
+    python user_expand.py --documents 1000
+
+不需要运行 OpenFGA 服务。
+
+作者: OpenFGA 集成示例
+日期: 2026-02-05
+"""
+
+import argparse
+import time
+from typing import Optional, Dict, Any, List, Tuple, Iterable, FrozenSet, AbstractSet
+
+from openfga_sdk.models import (
+    Computed,
+    Leaf,
+    Node,
+    Nodes,
+    Users,
+    UsersetTree,
+    UsersetTreeDifference,
+    UsersetTreeTupleToUserset,
+)
+
+from local_eval import CheckEvaluator, _error, _object_type
+
+_COMPLETE = float('inf')
+_EMPTY: FrozenSet[str] = frozenset()
+
+
+def _union(parts: List[AbstractSet[str]]) -> FrozenSet[str]:
+    """合并多个主体集合；只有一个非空集合时直接复用（共享的子树不复制）"""
+    parts = [part for part in parts if part]
+    if not parts:
+        return _EMPTY
+    if len(parts) == 1:
+        return frozenset(parts[0])
+    return frozenset().union(*parts)
+
+
+class ExpandCache:
+    """ListUsers 展开结果的缓存"""
+
+    def __init__(self):
+        # (object, relation) → 主体集合
+        self.subjects: Dict[Tuple[str, str], FrozenSet[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+
+class _Request:
+    """单次请求的展开状态"""
+
+    __slots__ = ('index', 'context', 'cache', 'stack')
+
+    def __init__(self, index, context: Dict[str, Any], cache: ExpandCache):
+        self.index = index
+        self.context = context
+        self.cache = cache
+        # 正在展开的 (object, relation) → 在栈中的位置
+        self.stack: Dict[Tuple[str, str], int] = {}
+
+
+class UserExpander:
+    """在 CheckEvaluator 的元组索引上计算 ListUsers 和 Expand"""
+
+    def __init__(self, evaluator: CheckEvaluator):
+        self.evaluator = evaluator
+        self._cache = ExpandCache()
+        self._cache_version = evaluator.index.version
+        # 主体 → (类型, 用户集关系)，同一个主体在多个对象的结果中重复出现
+        self._kinds: Dict[str, Tuple[str, str]] = {}
+
+        # 关系定义中包含 and / but not 时，展开结果只是候选，需要逐个确认
+        self.guarded = {
+            (object_type, relation): self._has_guard(rewrite)
+            for object_type, relations in evaluator.relations.items()
+            for relation, rewrite in relations.items()
+        }
+
+    @classmethod
+    def _has_guard(cls, rewrite: Dict[str, Any]) -> bool:
+        if 'intersection' in rewrite or 'difference' in rewrite:
+            return True
+        if 'union' in rewrite:
+            return any(cls._has_guard(child) for child in rewrite['union']['child'])
+        return False
+
+    def cache(self) -> ExpandCache:
+        """不带上下文的请求共享的缓存，元组发生变化后重新创建"""
+        if self._cache_version != self.evaluator.index.version:
+            self._cache = ExpandCache()
+            self._kinds.clear()
+            self._cache_version = self.evaluator.index.version
+        return self._cache
+
+    def _request(self, object: str, relation: str, contextual_tuples: Optional[Iterable],
+                 context: Optional[Dict[str, Any]]) -> _Request:
+        object_type, _, object_id = object.partition(':')
+        if not object_id:
+            raise _error(f"invalid object '{object}'")
+        if object_type not in self.evaluator.relations:
+            raise _error(f"type '{object_type}' not found")
+        if relation not in self.evaluator.relations[object_type]:
+            raise _error(f"relation '{object_type}#{relation}' not found")
+
+        if contextual_tuples or context:
+            return _Request(self.evaluator.overlay(contextual_tuples), context or {}, ExpandCache())
+        return _Request(self.evaluator.index, {}, self.cache())
+
+    # ---------- ListUsers ----------
+
+    def subjects(
+        self,
+        object: str,
+        relation: str,
+        contextual_tuples: Optional[Iterable] = None,
+        context: Optional[Dict[str, Any]] = None
+    ) -> FrozenSet[str]:
+        """
+        与 object 有 relation 关系的全部主体：具体用户 'user:anne'、通配符 'user:*'、用户集 'group:eng#member'
+
+        与 Check 一致，结果包括 object#relation 自身以及展开过程中经过的每个 x#y 用户集。
+
+        Raises:
+            ValidationException: 类型或关系未定义、条件没有本地实现
+        """
+        request = self._request(object, relation, contextual_tuples, context)
+        subjects, _ = self._subjects(object, relation, request)
+        return subjects
+
+    def list_users(
+        self,
+        object: str,
+        relation: str,
+        user_filters: Iterable[Dict[str, str]],
+        contextual_tuples: Optional[Iterable] = None,
+        context: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """
+        按用户类型过滤的 ListUsers
+
+        Args:
+            user_filters: [{'type': 'user'}] 返回具体用户和通配符；
+                [{'type': 'group', 'relation': 'member'}] 返回 group:x#member 形式的用户集
+
+        Returns:
+            主体列表（顺序不固定）
+        """
+        filters = {(f['type'], f.get('relation') or '') for f in user_filters}
+        if not filters:
+            raise _error("user_filters is required")
+
+        kinds = self._kinds
+        results = []
+        for subject in self.subjects(object, relation, contextual_tuples, context):
+            kind = kinds.get(subject)
+            if kind is None:
+                subject_type, _, rest = subject.partition(':')
+                kind = kinds[subject] = (subject_type, rest.partition('#')[2])
+            if kind in filters:
+                results.append(subject)
+        return results
+
+    def _subjects(self, object: str, relation: str, request: _Request) -> Tuple[FrozenSet[str], float]:
+        """
+        展开一个 (object, relation)
+
+        Returns:
+            (主体集合, 用到的最早一个未完成节点在栈中的位置)；没有用到未完成节点时为 _COMPLETE，
+            此时结果完整，可以写入缓存
+        """
+        key = (object, relation)
+        cache = request.cache
+        cached = cache.subjects.get(key)
+        if cached is not None:
+            cache.hits += 1
+            return cached, _COMPLETE
+
+        position = request.stack.get(key)
+        if position is not None:
+            # 环：这一路径不增加新的主体
+            return _EMPTY, position
+
+        object_type = _object_type(object)
+        rewrite = self.evaluator.relations.get(object_type, {}).get(relation)
+        if rewrite is None:
+            return _EMPTY, _COMPLETE
+
+        cache.misses += 1
+        position = len(request.stack)
+        request.stack[key] = position
+        try:
+            subjects, low = self._rewrite(rewrite, object, relation, request)
+            if self.guarded[(object_type, relation)]:
+                subjects = frozenset(
+                    subject for subject in subjects
+                    if self.evaluator._evaluate(subject, relation, object, request.index, request.context)
+                )
+            # 用户集 object#relation 自身总是有权限（与服务端的 IsSelfDefining 一致）
+            subjects = subjects.union((f"{object}#{relation}",))
+        finally:
+            del request.stack[key]
+
+        if low >= position:
+            cache.subjects[key] = subjects
+            low = _COMPLETE
+        return subjects, low
+
+    def _rewrite(self, rewrite: Dict[str, Any], object: str, relation: str,
+                 request: _Request) -> Tuple[FrozenSet[str], float]:
+        evaluator = self.evaluator
+        index, context = request.index, request.context
+
+        if 'this' in rewrite:
+            direct = {
+                user for user, condition in index.users(object, relation).items()
+                if condition is None or evaluator._condition_ok(condition, context)
+            }
+            parts, low = [direct], _COMPLETE
+            for userset, condition in index.usersets(object, relation).items():
+                if condition is not None and not evaluator._condition_ok(condition, context):
+                    continue
+                direct.add(userset)
+                userset_object, _, userset_relation = userset.partition('#')
+                nested, nested_low = self._subjects(userset_object, userset_relation, request)
+                parts.append(nested)
+                low = min(low, nested_low)
+            return _union(parts), low
+
+        if 'computedUserset' in rewrite:
+            return self._subjects(object, rewrite['computedUserset']['relation'], request)
+
+        if 'tupleToUserset' in rewrite:
+            tupleset = rewrite['tupleToUserset']['tupleset']['relation']
+            computed = rewrite['tupleToUserset']['computedUserset']['relation']
+            parts, low = [], _COMPLETE
+            for parent, condition in index.users(object, tupleset).items():
+                if condition is not None and not evaluator._condition_ok(condition, context):
+                    continue
+                nested, nested_low = self._subjects(parent, computed, request)
+                parts.append(nested)
+                low = min(low, nested_low)
+            return _union(parts), low
+
+        if 'union' in rewrite:
+            parts, low = [], _COMPLETE
+            for child in rewrite['union']['child']:
+                nested, nested_low = self._rewrite(child, object, relation, request)
+                parts.append(nested)
+                low = min(low, nested_low)
+            return _union(parts), low
+
+        if 'intersection' in rewrite:
+            # 结果一定在第一个分支中，由 _subjects 逐个确认
+            return self._rewrite(rewrite['intersection']['child'][0], object, relation, request)
+
+        if 'difference' in rewrite:
+            return self._rewrite(rewrite['difference']['base'], object, relation, request)
+
+        raise _error(f"unsupported rewrite {list(rewrite)} on '{object}'")
+
+    # ---------- Expand ----------
+
+    def expand(
+        self,
+        object: str,
+        relation: str,
+        contextual_tuples: Optional[Iterable] = None
+    ) -> UsersetTree:
+        """
+        与服务端 Expand 相同的一层权限树：直接授权列出用户和用户集，
+        计算关系和 x from y 只给出下一层的 object#relation，需要时再对它们调用 expand
+
+        一层树只读取当前对象的元组，不经过 ListUsers 的展开，也不写入缓存：
+        每次返回新构造的树，调用方可以修改。
+
+        Raises:
+            ValidationException: 类型或关系未定义
+        """
+        request = self._request(object, relation, contextual_tuples, None)
+        rewrite = self.evaluator.relations[_object_type(object)][relation]
+        return UsersetTree(root=self._node(rewrite, object, relation, request))
+
+    def _node(self, rewrite: Dict[str, Any], object: str, relation: str, request: _Request) -> Node:
+        name = f"{object}#{relation}"
+
+        if 'this' in rewrite:
+            index = request.index
+            users = sorted(index.users(object, relation)) + sorted(index.usersets(object, relation))
+            return Node(name=name, leaf=Leaf(users=Users(users=users)))
+
+        if 'computedUserset' in rewrite:
+            computed = rewrite['computedUserset']['relation']
+            return Node(name=name, leaf=Leaf(computed=Computed(userset=f"{object}#{computed}")))
+
+        if 'tupleToUserset' in rewrite:
+            tupleset = rewrite['tupleToUserset']['tupleset']['relation']
+            computed = rewrite['tupleToUserset']['computedUserset']['relation']
+            return Node(name=name, leaf=Leaf(tuple_to_userset=UsersetTreeTupleToUserset(
+                tupleset=f"{object}#{tupleset}",
+                computed=[
+                    Computed(userset=f"{parent}#{computed}")
+                    for parent in sorted(request.index.users(object, tupleset))
+                ]
+            )))
+
+        if 'union' in rewrite or 'intersection' in rewrite:
+            operator = 'union' if 'union' in rewrite else 'intersection'
+            nodes = Nodes(nodes=[
+                self._node(child, object, relation, request) for child in rewrite[operator]['child']
+            ])
+            return Node(name=name, **{operator: nodes})
+
+        if 'difference' in rewrite:
+            return Node(name=name, difference=UsersetTreeDifference(
+                base=self._node(rewrite['difference']['base'], object, relation, request),
+                subtract=self._node(rewrite['difference']['subtract'], object, relation, request)
+            ))
+
+        raise _error(f"unsupported rewrite {list(rewrite)} on '{name}'")
+
+
+# ---------- 基准测试 ----------
+
+BENCHMARK_MODEL = """
+model
+  schema 1.1
+
+type user
+
+type group
+  relations
+    define member: [user, group#member]
+
+type folder
+  relations
+    define parent: [folder]
+    define viewer: [user, group#member] or viewer from parent
+
+type document
+  relations
+    define parent: [folder]
+    define owner: [user]
+    define viewer: [user, group#member] or owner or viewer from parent
+"""
+
+
+def benchmark(documents: int, folders: int = 10, groups: int = 20, members: int = 50) -> Dict[str, Any]:
+    """
+    权限审查：对每个文档调用一次 ListUsers
+
+    文档分布在 folders 个文件夹中，文件夹继承根文件夹，根文件夹授权给 groups 个组，
+    每个组 members 个成员。对比每次请求使用新缓存（不共享）和共享缓存的总耗时。
+    """
+    from fga_dsl import parse
+    from local_eval import LocalOpenFgaClient
+
+    backend = LocalOpenFgaClient(parse(BENCHMARK_MODEL))
+    tuples = []
+    for g in range(groups):
+        tuples.append({'user': f'group:{g}#member', 'relation': 'viewer', 'object': 'folder:root'})
+        for m in range(members):
+            tuples.append({'user': f'user:{g}_{m}', 'relation': 'member', 'object': f'group:{g}'})
+    for f in range(folders):
+        tuples.append({'user': 'folder:root', 'relation': 'parent', 'object': f'folder:{f}'})
+    for d in range(documents):
+        tuples.append({'user': f'folder:{d % folders}', 'relation': 'parent', 'object': f'document:{d}'})
+        tuples.append({'user': f'user:owner_{d}', 'relation': 'owner', 'object': f'document:{d}'})
+    backend.add_tuples(tuples)
+    expander = UserExpander(backend.evaluator)
+    filters = [{'type': 'user'}]
+
+    started = time.perf_counter()
+    for d in range(documents):
+        # 每次请求使用新缓存，相当于不共享
+        expander._cache = ExpandCache()
+        expander.list_users(f'document:{d}', 'viewer', filters)
+    unshared_ms = (time.perf_counter() - started) * 1000
+
+    expander._cache = ExpandCache()
+    started = time.perf_counter()
+    for d in range(documents):
+        users = expander.list_users(f'document:{d}', 'viewer', filters)
+    shared_ms = (time.perf_counter() - started) * 1000
+
+    cache = expander.cache()
+    return {
+        'users_per_document': len(users),
+        'unshared_ms': unshared_ms,
+        'shared_ms': shared_ms,
+        'hits': cache.hits,
+        'misses': cache.misses,
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='测量共享展开缓存对逐个文档 ListUsers 的效果')
+    parser.add_argument('--documents', type=int, default=1000, help='文档数 (默认: 1000)')
+    parser.add_argument('--groups', type=int, default=20, help='可以查看根文件夹的组数 (默认: 20)')
+    parser.add_argument('--members', type=int, default=50, help='每个组的成员数 (默认: 50)')
+    args = parser.parse_args()
+
+    result = benchmark(args.documents, groups=args.groups, members=args.members)
+    print(f"✓ {args.documents} 个文档，每个文档 {result['users_per_document']} 个用户")
+    print(f"  不共享缓存: {result['unshared_ms']:.1f} ms")
+    print(f"  共享缓存:   {result['shared_ms']:.1f} ms "
+          f"(命中 {result['hits']} 次, 展开 {result['misses']} 次)")
+
+
+if __name__ == "__main__":
+    main()
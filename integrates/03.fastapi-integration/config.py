@@ -25,6 +25,8 @@ class Settings(BaseSettings):
     OPENFGA_API_URL: str = "http://localhost:8080"
     OPENFGA_STORE_ID: str = ""
     OPENFGA_MODEL_ID: Optional[str] = None
+    # 未配置 OPENFGA_MODEL_ID 时，刷新最新授权模型 ID 的间隔（秒），0 表示只在启动时解析
+    OPENFGA_MODEL_REFRESH_INTERVAL: float = 60.0
 
     # ==================== 数据库配置（可选）====================
     # 如果使用真实数据库，可以添加数据库配置
@@ -74,6 +76,7 @@ if __name__ == "__main__":
     print(f"  OPENFGA_API_URL: {settings.OPENFGA_API_URL}")
     print(f"  OPENFGA_STORE_ID: {settings.OPENFGA_STORE_ID}")
     print(f"  OPENFGA_MODEL_ID: {settings.OPENFGA_MODEL_ID}")
+    print(f"  OPENFGA_MODEL_REFRESH_INTERVAL: {settings.OPENFGA_MODEL_REFRESH_INTERVAL}")
     print(f"  JWT_ALGORITHM: {settings.JWT_ALGORITHM}")
     print(f"  ACCESS_TOKEN_EXPIRE_MINUTES: {settings.ACCESS_TOKEN_EXPIRE_MINUTES}")
     print()
@@ -44,8 +44,10 @@ async def lifespan(app: FastAPI):
     logger.info("应用启动中...")
     logger.info(f"OpenFGA API URL: {settings.OPENFGA_API_URL}")
     logger.info(f"OpenFGA Store ID: {settings.OPENFGA_STORE_ID}")
+    await openfga_service.start_model_refresh(settings.OPENFGA_MODEL_REFRESH_INTERVAL)
     yield
     logger.info("应用关闭中...")
+    await openfga_service.stop_model_refresh()
 
 
 # 创建 FastAPI 应用
@@ -4,15 +4,24 @@ OpenFGA 客户端封装
 提供与 OpenFGA 服务交互的统一接口
 """
 
-from openfga_sdk import OpenFgaClient, ClientConfiguration
-from openfga_sdk.client.models import ClientCheckRequest, ClientWriteRequest, ClientTuple
-from typing import List, Dict, Optional
+from openfga_sdk import OpenFgaClient, ClientConfiguration, ReadRequestTupleKey
+from openfga_sdk.client.models import (
+    ClientCheckRequest, ClientWriteRequest, ClientTuple,
+    ClientBatchCheckRequest, ClientBatchCheckItem, ClientListObjectsRequest,
+    WriteTransactionOpts
+)
+from typing import List, Dict, Optional, Callable, Tuple, AsyncIterator
+import asyncio
+import json
 import logging
 
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+# 服务端单次 Write 请求默认允许的最大元组数
+MAX_TUPLES_PER_WRITE = 100
+
 
 class OpenFGAService:
     """
@@ -24,6 +33,16 @@ class OpenFGAService:
     def __init__(self):
         """初始化 OpenFGA 客户端"""
         self.client = None
+        # 授权模型中各对象类型定义的关系，首次使用时从服务端读取
+        self._type_relations: Optional[Dict[str, List[str]]] = None
+        # 元组变更监听器，供缓存等组件做写入感知的失效
+        self._write_listeners: List[Callable[[str, List[Dict]], None]] = []
+        # 正在进行中的权限检查，相同的并发检查共享同一个请求
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self.coalesced_checks = 0
+        # 当前固定使用的授权模型 ID，未配置 OPENFGA_MODEL_ID 时在启动时解析为最新模型
+        self.model_id: Optional[str] = settings.OPENFGA_MODEL_ID or None
+        self._model_refresh_task: Optional[asyncio.Task] = None
         self._initialize_client()
 
     def _initialize_client(self):
@@ -42,6 +61,107 @@ class OpenFGAService:
             logger.error(f"OpenFGA 客户端初始化失败: {e}")
             raise
 
+    async def resolve_model_id(self) -> Optional[str]:
+        """
+        读取最新的授权模型 ID 并固定到客户端配置
+
+        请求不带 authorization_model_id 时，服务端每次都要先查找最新模型；
+        固定模型 ID 后每个请求都会带上它，省去这次查找。
+        模型发生变化时替换客户端配置中的模型 ID（单次赋值，正在进行的请求不受影响），
+        并清空基于旧模型的关系定义和进行中的检查。
+
+        Returns:
+            当前使用的授权模型 ID，Store 中还没有模型时返回 None
+        """
+        response = await self.client.read_authorization_models({"page_size": 1})
+        models = response.authorization_models or []
+        if not models:
+            logger.warning("Store 中还没有授权模型，请求将由服务端选择最新模型")
+            return self.model_id
+
+        model_id = models[0].id
+        if model_id != self.model_id:
+            logger.info(f"使用授权模型: {self.model_id} -> {model_id}")
+            self.client.set_authorization_model_id(model_id)
+            self.model_id = model_id
+            self._type_relations = None
+            self._inflight.clear()
+
+        return self.model_id
+
+    async def start_model_refresh(self, interval: float = 60.0):
+        """
+        启动时解析授权模型 ID，并在后台定期刷新
+
+        配置了 OPENFGA_MODEL_ID 时始终使用该模型，不做解析和刷新。
+
+        Args:
+            interval: 刷新间隔（秒），小于等于 0 时只在启动时解析一次
+        """
+        if settings.OPENFGA_MODEL_ID:
+            logger.info(f"使用配置的授权模型: {settings.OPENFGA_MODEL_ID}")
+            return
+
+        try:
+            await self.resolve_model_id()
+        except Exception as e:
+            # OpenFGA 暂时不可用时不阻止应用启动，由后台任务继续尝试
+            logger.error(f"解析授权模型 ID 失败: {e}")
+
+        if interval > 0 and self._model_refresh_task is None:
+            self._model_refresh_task = asyncio.create_task(self._refresh_model_id(interval))
+
+    async def _refresh_model_id(self, interval: float):
+        """后台定期刷新授权模型 ID，单次失败继续使用当前模型"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.resolve_model_id()
+            except Exception as e:
+                logger.warning(f"刷新授权模型 ID 失败，继续使用 {self.model_id}: {e}")
+
+    async def stop_model_refresh(self):
+        """停止后台刷新任务"""
+        task, self._model_refresh_task = self._model_refresh_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def add_write_listener(self, listener: Callable[[str, List[Dict]], None]):
+        """
+        注册元组变更监听器
+
+        每次 write_tuples / delete_tuples 成功后调用 listener(operation, tuples)，
+        operation 为 "write" 或 "delete"，tuples 为本次变更的元组列表。
+        缓存可以据此只清理受影响的条目，而不是整体清空。
+
+        Args:
+            listener: 监听函数
+
+        示例:
+            openfga_service.add_write_listener(
+                lambda operation, tuples: [
+                    cache.invalidate_tuple(t["user"], t["relation"], t["object"])
+                    for t in tuples
+                ]
+            )
+        """
+        self._write_listeners.append(listener)
+
+    def _notify_write(self, operation: str, tuples: List[Dict]):
+        """通知所有监听器，监听器的异常不影响写入结果"""
+        # 写入完成后到达的检查不能再复用写入前发出的请求
+        self._inflight.clear()
+
+        for listener in self._write_listeners:
+            try:
+                listener(operation, tuples)
+            except Exception as e:
+                logger.error(f"元组变更监听器执行失败: {e}", exc_info=True)
+
     async def check_permission(
         self,
         user: str,
@@ -52,6 +172,10 @@ class OpenFGAService:
         """
         检查用户是否有指定的权限
 
+        相同的 (user, relation, object, contextual_tuples) 检查正在进行时，
+        后到的调用直接等待同一个请求的结果，不会重复发送。不缓存已完成的结果，
+        每次检查拿到的都是请求发出时的最新权限。
+
         Args:
             user: 用户标识（格式：user:user_id）
             relation: 权限关系（如 viewer, editor, owner）
@@ -68,6 +192,42 @@ class OpenFGAService:
                 object_id="document:doc_1"
             )
         """
+        key = (
+            user, relation, object_id,
+            json.dumps(contextual_tuples, sort_keys=True) if contextual_tuples else None
+        )
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced_checks += 1
+            logger.debug(f"合并进行中的权限检查: user={user}, relation={relation}, object={object_id}")
+            # shield：某个调用方被取消时不影响共享请求和其他调用方
+            return await asyncio.shield(inflight)
+
+        task = asyncio.ensure_future(
+            self._check_permission(user, relation, object_id, contextual_tuples)
+        )
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish_inflight(key, t))
+
+        return await asyncio.shield(task)
+
+    def _finish_inflight(self, key: Tuple, task: asyncio.Future):
+        """共享请求完成后移出进行中列表"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 所有调用方都已取消时，避免出现 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
+
+    async def _check_permission(
+        self,
+        user: str,
+        relation: str,
+        object_id: str,
+        contextual_tuples: Optional[List[Dict]]
+    ) -> bool:
+        """向 OpenFGA 发送一次权限检查请求"""
         try:
             request = ClientCheckRequest(
                 user=user,
@@ -93,10 +253,130 @@ class OpenFGAService:
             logger.error(f"权限检查失败: {e}", exc_info=True)
             raise
 
+    async def batch_check(
+        self,
+        checks: List[Dict],
+        max_batch_size: int = 50,
+        max_parallel_requests: int = 10
+    ) -> List[Dict]:
+        """
+        批量检查权限
+
+        使用 OpenFGA 的 BatchCheck API，一次请求检查多个 (user, relation, object)。
+        超过 max_batch_size 的检查项由 SDK 自动拆分并并发发送。
+
+        Args:
+            checks: 检查项列表，每项包含 user, relation, object，可选 contextual_tuples
+            max_batch_size: 单个 BatchCheck 请求包含的最大检查项数
+            max_parallel_requests: 最大并发请求数
+
+        Returns:
+            与 checks 顺序一致的结果列表，每项包含 user, relation, object,
+            allowed 以及 error（检查失败时为错误信息，否则为 None）
+
+        示例:
+            results = await openfga_service.batch_check([
+                {"user": "user:alice", "relation": "viewer", "object": "document:doc_1"},
+                {"user": "user:alice", "relation": "editor", "object": "document:doc_1"}
+            ])
+        """
+        if not checks:
+            return []
+
+        try:
+            items = [
+                ClientBatchCheckItem(
+                    user=check["user"],
+                    relation=check["relation"],
+                    object=check["object"],
+                    correlation_id=str(index),
+                    contextual_tuples=[
+                        ClientTuple(**tuple_data)
+                        for tuple_data in check.get("contextual_tuples") or []
+                    ] or None
+                )
+                for index, check in enumerate(checks)
+            ]
+
+            response = await self.client.batch_check(
+                ClientBatchCheckRequest(checks=items),
+                options={
+                    "max_batch_size": max_batch_size,
+                    "max_parallel_requests": max_parallel_requests
+                }
+            )
+
+            by_id = {item.correlation_id: item for item in response.result}
+
+            results = []
+            for index, check in enumerate(checks):
+                item = by_id.get(str(index))
+                error = None
+                if item is None:
+                    error = "缺少检查结果"
+                elif item.error:
+                    error = getattr(item.error, "message", None) or str(item.error)
+
+                results.append({
+                    "user": check["user"],
+                    "relation": check["relation"],
+                    "object": check["object"],
+                    "allowed": bool(item and item.allowed and not error),
+                    "error": error
+                })
+
+            logger.debug(f"批量权限检查: count={len(checks)}")
+
+            return results
+
+        except Exception as e:
+            logger.error(f"批量权限检查失败: {e}", exc_info=True)
+            raise
+
+    async def get_type_relations(self, object_type: str) -> List[str]:
+        """
+        获取授权模型中某个对象类型定义的全部关系
+
+        首次调用时读取当前使用的授权模型（已固定模型 ID 时读取该模型，
+        否则读取最新模型），之后从内存中返回。
+
+        Args:
+            object_type: 对象类型（如 document, folder）
+
+        Returns:
+            关系名称列表，类型不存在时返回空列表
+
+        示例:
+            relations = await openfga_service.get_type_relations("document")
+            # 返回: ["owner", "editor", "viewer"]
+        """
+        if self._type_relations is None:
+            try:
+                if self.model_id:
+                    response = await self.client.read_authorization_model()
+                else:
+                    response = await self.client.read_latest_authorization_model()
+
+                model = response.authorization_model
+                self._type_relations = {
+                    type_definition.type: list(type_definition.relations or {})
+                    for type_definition in model.type_definitions or []
+                }
+
+                logger.debug(f"已加载授权模型关系定义: {self._type_relations}")
+
+            except Exception as e:
+                logger.error(f"读取授权模型失败: {e}", exc_info=True)
+                raise
+
+        return self._type_relations.get(object_type, [])
+
     async def write_tuples(self, tuples: List[Dict]) -> bool:
         """
         写入权限关系元组
 
+        超过 MAX_TUPLES_PER_WRITE 个元组时自动拆块并发写入（块之间不是事务）。
+
         Args:
             tuples: 权限关系元组列表，每个元组包含 user, relation, object
 
@@ -128,11 +408,11 @@ class OpenFGAService:
                 for t in tuples
             ]
 
-            request = ClientWriteRequest(
-                writes=client_tuples
+            written = await self._write_chunked(
+                ClientWriteRequest(writes=client_tuples), "write", tuples
             )
 
-            await self.client.write(request)
+            self._notify_write("write", written)
 
             logger.info(f"成功写入 {len(tuples)} 个权限关系")
             for t in tuples:
@@ -144,10 +424,55 @@ class OpenFGAService:
             logger.error(f"写入权限关系失败: {e}", exc_info=True)
             raise
 
+    async def _write_chunked(
+        self,
+        request: ClientWriteRequest,
+        operation: str,
+        tuples: List[Dict],
+        max_parallel_requests: int = 10
+    ) -> List[Dict]:
+        """
+        发送写入请求，超过单次上限时拆块并发写入
+
+        不超过 MAX_TUPLES_PER_WRITE 时仍是单个事务；超过时使用 SDK 的非事务模式，
+        每块 MAX_TUPLES_PER_WRITE 个元组，块之间互不影响（429/5xx 由 SDK 自动重试）。
+        部分块失败时，成功的元组仍会通知监听器，然后抛出异常说明失败的元组。
+
+        Returns:
+            成功写入（或删除）的元组列表
+        """
+        if len(tuples) <= MAX_TUPLES_PER_WRITE:
+            await self.client.write(request)
+            return tuples
+
+        response = await self.client.write(request, {
+            "transaction": WriteTransactionOpts(
+                disabled=True,
+                max_per_chunk=MAX_TUPLES_PER_WRITE,
+                max_parallel_requests=max_parallel_requests
+            )
+        })
+        results = response.writes if operation == "write" else response.deletes
+
+        succeeded = [t for t, r in zip(tuples, results) if r.success]
+        failed = [(t, r.error) for t, r in zip(tuples, results) if not r.success]
+        if failed:
+            self._notify_write(operation, succeeded)
+            for t, error in failed[:10]:
+                logger.error(f"  - 失败: {t['user']} -> {t['relation']} -> {t['object']}: {error}")
+            raise RuntimeError(
+                f"分块{'写入' if operation == 'write' else '删除'}部分失败: "
+                f"成功 {len(succeeded)} 个，失败 {len(failed)} 个"
+            )
+
+        return succeeded
+
     async def delete_tuples(self, tuples: List[Dict]) -> bool:
         """
         删除权限关系元组
 
+        超过 MAX_TUPLES_PER_WRITE 个元组时自动拆块并发删除（块之间不是事务）。
+
         Args:
             tuples: 要删除的权限关系元组列表
 
@@ -174,11 +499,11 @@ class OpenFGAService:
                 for t in tuples
             ]
 
-            request = ClientWriteRequest(
-                deletes=client_tuples
+            deleted = await self._write_chunked(
+                ClientWriteRequest(deletes=client_tuples), "delete", tuples
             )
 
-            await self.client.write(request)
+            self._notify_write("delete", deleted)
 
             logger.info(f"成功删除 {len(tuples)} 个权限关系")
             for t in tuples:
@@ -217,9 +542,11 @@ class OpenFGAService:
         """
         try:
             response = await self.client.list_objects(
-                user=user,
-                relation=relation,
-                type=object_type
+                ClientListObjectsRequest(
+                    user=user,
+                    relation=relation,
+                    type=object_type
+                )
             )
 
             objects = response.objects or []
@@ -235,6 +562,52 @@ class OpenFGAService:
             logger.error(f"列出对象失败: {e}", exc_info=True)
             raise
 
+    async def iter_tuples(
+        self,
+        user: Optional[str] = None,
+        relation: Optional[str] = None,
+        object_id: Optional[str] = None,
+        page_size: int = 100
+    ) -> AsyncIterator[Dict]:
+        """
+        逐页读取权限关系元组
+
+        自动跟随 continuation_token 读取所有分页，每次只在内存中保留一页。
+
+        Args:
+            user: 用户标识（可选）
+            relation: 权限关系（可选）
+            object_id: 对象标识（可选），只写类型（如 document:）时必须同时指定 user
+            page_size: 每页元组数（OpenFGA 上限为 100）
+
+        Yields:
+            权限关系元组
+
+        示例:
+            async for t in openfga_service.iter_tuples(object_id="document:doc_1"):
+                print(t["user"], t["relation"])
+        """
+        body = ReadRequestTupleKey(user=user, relation=relation, object=object_id)
+        continuation_token = None
+
+        while True:
+            options = {"page_size": page_size}
+            if continuation_token:
+                options["continuation_token"] = continuation_token
+
+            response = await self.client.read(body, options)
+
+            for t in response.tuples or []:
+                yield {
+                    "user": t.key.user,
+                    "relation": t.key.relation,
+                    "object": t.key.object
+                }
+
+            continuation_token = response.continuation_token
+            if not continuation_token:
+                return
+
     async def read_tuples(
         self,
         user: Optional[str] = None,
@@ -244,7 +617,8 @@ class OpenFGAService:
         """
         读取权限关系元组
 
-        可以根据 user, relation, object 进行过滤查询。
+        可以根据 user, relation, object 进行过滤查询，会读取所有分页。
+        结果可能很多时请使用 iter_tuples() 逐条处理。
 
         Args:
             user: 用户标识（可选）
@@ -261,29 +635,14 @@ class OpenFGAService:
             )
         """
         try:
-            # 构建查询参数
-            query = {}
-            if user:
-                query["user"] = user
-            if relation:
-                query["relation"] = relation
-            if object_id:
-                query["object"] = object_id
-
-            response = await self.client.read(**query)
-
-            tuples = []
-            if response.tuples:
-                tuples = [
-                    {
-                        "user": t.key.user,
-                        "relation": t.key.relation,
-                        "object": t.key.object
-                    }
-                    for t in response.tuples
-                ]
+            tuples = [
+                t async for t in self.iter_tuples(user, relation, object_id)
+            ]
 
-            logger.debug(f"读取元组: query={query}, count={len(tuples)}")
+            logger.debug(
+                f"读取元组: user={user}, relation={relation}, "
+                f"object={object_id}, count={len(tuples)}"
+            )
 
             return tuples
 
@@ -6,7 +6,8 @@ OpenFGA 权限检查装饰器
 
 from fastapi import Depends, HTTPException, status, Request
 from functools import wraps
-from typing import Callable
+from typing import Callable, Optional
+import asyncio
 import logging
 
 from auth import get_current_user
@@ -15,11 +16,167 @@ from openfga_client import openfga_service
 logger = logging.getLogger(__name__)
 
 
+# ==================== 请求级批量检查 ====================
+
+class PermissionBatch:
+    """
+    请求级的权限检查收集器
+
+    一个路由可能叠加多个权限依赖（require_permission / require_any_permission），
+    逐个检查意味着每个依赖都要一次网络往返。收集器在第一个权限依赖执行时，
+    从当前路由的依赖树中收集该请求需要的全部检查，合并成一次 BatchCheck 请求，
+    之后的依赖直接读取共享结果。
+
+    收集器保存在 request.state 中，随请求结束而释放，不会跨请求复用结果。
+    """
+
+    def __init__(self, service=None):
+        """
+        Args:
+            service: OpenFGA 服务实例，默认使用全局的 openfga_service
+        """
+        self._service = service or openfga_service
+        self._results: dict[tuple[str, str, str], dict] = {}
+        self._pending: dict[tuple[str, str, str], asyncio.Future] = {}
+        self._route_collected = False
+        self.round_trips = 0
+        # (user, object) -> 该用户对该对象拥有的关系列表
+        self.permission_sets: dict[tuple[str, str], list[str]] = {}
+
+    async def resolve(
+        self,
+        checks: list[tuple[str, str, str]]
+    ) -> dict[tuple[str, str, str], dict]:
+        """
+        获取一组检查的结果，尚未检查过的项合并为一次批量请求
+
+        Args:
+            checks: (user, relation, object) 列表
+
+        Returns:
+            以 (user, relation, object) 为键的结果字典，
+            每个结果包含 allowed 和 error
+        """
+        missing = [
+            key for key in dict.fromkeys(checks)
+            if key not in self._results and key not in self._pending
+        ]
+
+        if missing:
+            future = asyncio.get_running_loop().create_future()
+            for key in missing:
+                self._pending[key] = future
+
+            try:
+                results = await self._service.batch_check([
+                    {"user": user, "relation": relation, "object": object_id}
+                    for user, relation, object_id in missing
+                ])
+                for key, result in zip(missing, results):
+                    self._results[key] = result
+            except Exception as e:
+                logger.error(f"批量权限检查失败: {e}", exc_info=True)
+                for key in missing:
+                    self._results[key] = {"allowed": False, "error": str(e)}
+            finally:
+                self.round_trips += 1
+                for key in missing:
+                    self._pending.pop(key, None)
+                    # 发起请求的依赖被取消时没有结果，等待同一批请求的依赖按检查失败处理
+                    self._results.setdefault(key, {"allowed": False, "error": "权限检查被取消"})
+                future.set_result(None)
+
+        # 等待其他并发依赖已发出的批量请求
+        for future in {self._pending[key] for key in checks if key in self._pending}:
+            await future
+
+        return {key: self._results[key] for key in checks}
+
+    async def resolve_for_route(
+        self,
+        request: Request,
+        user: str,
+        checks: list[tuple[str, str, str]]
+    ) -> dict[tuple[str, str, str], dict]:
+        """
+        获取检查结果；第一次调用时顺带预取当前路由上所有权限依赖需要的检查
+
+        Args:
+            request: 当前请求
+            user: 用户标识（格式：user:user_id）
+            checks: 当前依赖需要的 (user, relation, object) 列表
+
+        Returns:
+            以 (user, relation, object) 为键的结果字典
+        """
+        if not self._route_collected:
+            self._route_collected = True
+            route_checks = _collect_route_checks(request, user)
+            if route_checks:
+                await self.resolve(route_checks + checks)
+
+        return await self.resolve(checks)
+
+
+def get_permission_batch(request: Request) -> PermissionBatch:
+    """
+    获取当前请求的权限检查收集器（不存在时创建）
+
+    也可以作为 FastAPI 依赖使用：
+        batch: PermissionBatch = Depends(get_permission_batch)
+    """
+    batch = getattr(request.state, "permission_batch", None)
+    if batch is None:
+        batch = PermissionBatch()
+        request.state.permission_batch = batch
+    return batch
+
+
+def _extract_resource_id(path_params: dict, object_type: str) -> Optional[str]:
+    """从路径参数中提取资源 ID，支持 {type}_id, id, resource_id 三种命名"""
+    for param_name in [f"{object_type}_id", "id", "resource_id"]:
+        if param_name in path_params:
+            return path_params[param_name]
+    return None
+
+
+def _collect_route_checks(request: Request, user: str) -> list[tuple[str, str, str]]:
+    """
+    遍历当前路由的依赖树，收集所有权限依赖需要的检查
+
+    权限依赖函数通过 permission_spec 属性声明 (relations, object_type)。
+    """
+    route = request.scope.get("route")
+    dependant = getattr(route, "dependant", None)
+    if dependant is None:
+        return []
+
+    checks = []
+    stack = list(dependant.dependencies)
+    while stack:
+        dependency = stack.pop()
+        spec = getattr(dependency.call, "permission_spec", None)
+        if spec:
+            relations, object_type = spec
+            resource_id = _extract_resource_id(request.path_params, object_type)
+            if resource_id:
+                checks.extend(
+                    (user, relation, f"{object_type}:{resource_id}")
+                    for relation in relations
+                )
+        stack.extend(dependency.dependencies)
+
+    return checks
+
+
+# ==================== 权限依赖 ====================
+
 def require_permission(relation: str, object_type: str = "document"):
     """
     权限检查装饰器工厂
 
     创建一个 FastAPI 依赖函数，用于检查用户是否有指定的权限。
+    同一路由上的多个权限依赖会通过 PermissionBatch 合并为一次批量检查。
 
     Args:
         relation: 需要的权限关系（如 "viewer", "editor", "owner"）
@@ -46,20 +203,14 @@ def require_permission(relation: str, object_type: str = "document"):
         """
         实际的权限检查函数
 
-        从请求路径中提取资源 ID，然后调用 OpenFGA 检查权限。
+        从请求路径中提取资源 ID，然后从请求级收集器中获取检查结果。
         """
         user_id = current_user["user_id"]
 
         # 从路径参数中提取资源 ID
         # 支持多种命名方式：document_id, id, folder_id 等
         path_params = request.path_params
-        resource_id = None
-
-        # 尝试不同的参数名
-        for param_name in [f"{object_type}_id", "id", "resource_id"]:
-            if param_name in path_params:
-                resource_id = path_params[param_name]
-                break
+        resource_id = _extract_resource_id(path_params, object_type)
 
         if not resource_id:
             logger.error(f"无法从路径参数中提取资源 ID: {path_params}")
@@ -70,54 +221,63 @@ def require_permission(relation: str, object_type: str = "document"):
 
         # 构造 OpenFGA 对象 ID
         object_id = f"{object_type}:{resource_id}"
+        key = (f"user:{user_id}", relation, object_id)
 
         logger.debug(
             f"检查权限: user={user_id}, relation={relation}, object={object_id}"
         )
 
-        # 调用 OpenFGA 检查权限
-        try:
-            allowed = await openfga_service.check_permission(
-                user=f"user:{user_id}",
-                relation=relation,
-                object_id=object_id
-            )
-
-            if not allowed:
-                logger.warning(
-                    f"权限被拒绝: user={user_id}, relation={relation}, "
-                    f"object={object_id}"
-                )
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail=f"您没有对该{object_type}的{relation}权限"
-                )
-
-            logger.debug(f"权限检查通过: user={user_id}, object={object_id}")
-            return True
+        results = await get_permission_batch(request).resolve_for_route(
+            request, key[0], [key]
+        )
+        result = results[key]
 
-        except HTTPException:
-            # 重新抛出 HTTP 异常
-            raise
-        except Exception as e:
-            logger.error(f"权限检查失败: {e}", exc_info=True)
+        if result.get("error"):
+            logger.error(f"权限检查失败: {result['error']}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="权限检查失败"
             )
 
+        if not result["allowed"]:
+            logger.warning(
+                f"权限被拒绝: user={user_id}, relation={relation}, "
+                f"object={object_id}"
+            )
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"您没有对该{object_type}的{relation}权限"
+            )
+
+        logger.debug(f"权限检查通过: user={user_id}, object={object_id}")
+        return True
+
+    permission_checker.permission_spec = ([relation], object_type)
     return permission_checker
 
 
-def require_any_permission(relations: list[str], object_type: str = "document"):
+def require_any_permission(
+    relations: list[str],
+    object_type: str = "document",
+    concurrent: bool = False,
+    max_in_flight: int = 4,
+    timeout: Optional[float] = None
+):
     """
     检查用户是否有任意一个指定的权限
 
     只要用户有列表中的任意一个权限，就允许访问。
 
+    默认模式下，所有关系在一次批量检查中完成（与同一路由的其他权限依赖合并）。
+    concurrent=True 时改为并发竞速：所有关系的 Check 同时发出，任意一个返回
+    allowed 立即通过并取消其余请求，延迟由最慢的单次检查决定，而不是 N 次之和。
+
     Args:
         relations: 权限关系列表（如 ["viewer", "editor", "owner"]）
         object_type: 对象类型
+        concurrent: 是否使用并发竞速模式
+        max_in_flight: 竞速模式下同时进行的最大检查数
+        timeout: 竞速模式下所有检查共享的延迟预算（秒），超时返回 503
 
     Returns:
         FastAPI 依赖函数
@@ -130,6 +290,9 @@ def require_any_permission(relations: list[str], object_type: str = "document"):
             _: bool = Depends(require_any_permission(["viewer", "editor", "owner"]))
         ):
             return {"metadata": "..."}
+
+        # 并发竞速，总耗时不超过 200ms
+        Depends(require_any_permission(["owner", "editor", "viewer"], concurrent=True, timeout=0.2))
     """
 
     async def permission_checker(
@@ -139,13 +302,7 @@ def require_any_permission(relations: list[str], object_type: str = "document"):
         user_id = current_user["user_id"]
 
         # 提取资源 ID
-        path_params = request.path_params
-        resource_id = None
-
-        for param_name in [f"{object_type}_id", "id", "resource_id"]:
-            if param_name in path_params:
-                resource_id = path_params[param_name]
-                break
+        resource_id = _extract_resource_id(request.path_params, object_type)
 
         if not resource_id:
             raise HTTPException(
@@ -155,26 +312,61 @@ def require_any_permission(relations: list[str], object_type: str = "document"):
 
         object_id = f"{object_type}:{resource_id}"
 
-        # 检查是否有任意一个权限
-        for relation in relations:
+        if concurrent:
             try:
-                allowed = await openfga_service.check_permission(
+                matched = await check_any_permission(
                     user=f"user:{user_id}",
-                    relation=relation,
-                    object_id=object_id
+                    relations=relations,
+                    object_id=object_id,
+                    max_in_flight=max_in_flight,
+                    timeout=timeout
+                )
+            except TimeoutError:
+                logger.error(
+                    f"权限检查超时: user={user_id}, relations={relations}, "
+                    f"object={object_id}, timeout={timeout}"
+                )
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="权限检查超时"
                 )
 
-                if allowed:
-                    logger.debug(
-                        f"权限检查通过: user={user_id}, relation={relation}, "
-                        f"object={object_id}"
-                    )
-                    return True
+            if matched:
+                logger.debug(
+                    f"权限检查通过: user={user_id}, relation={matched}, "
+                    f"object={object_id}"
+                )
+                return True
 
-            except Exception as e:
-                logger.error(f"权限检查失败: {e}")
+            logger.warning(
+                f"权限被拒绝: user={user_id}, relations={relations}, "
+                f"object={object_id}"
+            )
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"您没有访问该{object_type}的权限"
+            )
+
+        keys = [(f"user:{user_id}", relation, object_id) for relation in relations]
+
+        # 检查是否有任意一个权限
+        results = await get_permission_batch(request).resolve_for_route(
+            request, f"user:{user_id}", keys
+        )
+
+        for key in keys:
+            result = results[key]
+            if result.get("error"):
+                logger.error(f"权限检查失败: {result['error']}")
                 continue
 
+            if result["allowed"]:
+                logger.debug(
+                    f"权限检查通过: user={user_id}, relation={key[1]}, "
+                    f"object={object_id}"
+                )
+                return True
+
         # 所有权限都不满足
         logger.warning(
             f"权限被拒绝: user={user_id}, relations={relations}, "
@@ -185,9 +377,71 @@ def require_any_permission(relations: list[str], object_type: str = "document"):
             detail=f"您没有访问该{object_type}的权限"
         )
 
+    # 竞速模式自行发出请求，不参与请求级批量预取
+    if not concurrent:
+        permission_checker.permission_spec = (list(relations), object_type)
     return permission_checker
 
 
+async def check_any_permission(
+    user: str,
+    relations: list[str],
+    object_id: str,
+    max_in_flight: int = 4,
+    timeout: Optional[float] = None
+) -> Optional[str]:
+    """
+    并发检查多个关系，返回第一个被允许的关系
+
+    所有检查同时发出（最多 max_in_flight 个并发），任意一个返回 allowed
+    后立即取消其余检查。单个检查失败只记录日志，不影响其他检查。
+
+    Args:
+        user: 用户标识（格式：user:user_id）
+        relations: 权限关系列表
+        object_id: 对象 ID（完整格式）
+        max_in_flight: 同时进行的最大检查数
+        timeout: 所有检查共享的延迟预算（秒），None 表示不限制
+
+    Returns:
+        第一个被允许的关系；全部被拒绝时返回 None
+
+    Raises:
+        TimeoutError: 在延迟预算内既没有允许的结果，也没有全部完成
+    """
+    semaphore = asyncio.Semaphore(max(1, max_in_flight))
+
+    async def check(relation: str) -> Optional[str]:
+        async with semaphore:
+            allowed = await openfga_service.check_permission(
+                user=user,
+                relation=relation,
+                object_id=object_id
+            )
+            return relation if allowed else None
+
+    tasks = [asyncio.create_task(check(relation)) for relation in relations]
+
+    try:
+        async with asyncio.timeout(timeout):
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    matched = await next_done
+                except Exception as e:
+                    logger.error(f"权限检查失败: {e}")
+                    continue
+
+                if matched:
+                    return matched
+
+        return None
+
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
 async def check_permission_direct(
     user_id: str,
     relation: str,
@@ -233,42 +487,70 @@ async def check_permission_direct(
         return False
 
 
-async def get_user_permissions(user_id: str, object_id: str) -> list[str]:
+async def get_user_permissions(
+    user_id: str,
+    object_id: str,
+    request: Optional[Request] = None
+) -> list[str]:
     """
     获取用户对某个对象的所有权限
 
+    从授权模型中读取该对象类型定义的全部关系，在一次批量检查中完成评估。
+    传入 request 时，结果在本次请求内按 (user, object) 缓存，并与同一请求中
+    权限依赖的检查结果共享；列表页为每一行绘制操作按钮时，每个对象只需一次往返。
+
     Args:
         user_id: 用户 ID
         object_id: 对象 ID（完整格式）
+        request: 当前请求（可选），用于请求级缓存
 
     Returns:
         用户拥有的权限关系列表
 
     使用示例:
-        permissions = await get_user_permissions("user_1", "document:doc_1")
+        permissions = await get_user_permissions("user_1", "document:doc_1", request)
         # 返回: ["viewer", "editor"]
     """
-    # 常见的权限关系
-    common_relations = ["viewer", "editor", "owner", "admin"]
+    user = f"user:{user_id}"
+    batch = get_permission_batch(request) if request is not None else None
 
-    user_permissions = []
+    if batch is not None and (user, object_id) in batch.permission_sets:
+        return list(batch.permission_sets[(user, object_id)])
 
-    for relation in common_relations:
-        try:
-            allowed = await openfga_service.check_permission(
-                user=f"user:{user_id}",
-                relation=relation,
-                object_id=object_id
-            )
+    object_type = object_id.split(":", 1)[0]
+    try:
+        relations = await openfga_service.get_type_relations(object_type)
+    except Exception as e:
+        logger.error(f"读取 {object_type} 的关系定义失败: {e}")
+        return []
 
-            if allowed:
-                user_permissions.append(relation)
+    keys = [(user, relation, object_id) for relation in relations]
 
+    if batch is not None:
+        results = await batch.resolve(keys)
+    else:
+        try:
+            checked = await openfga_service.batch_check([
+                {"user": user, "relation": relation, "object": object_id}
+                for relation in relations
+            ])
         except Exception as e:
-            logger.error(f"检查权限 {relation} 失败: {e}")
-            continue
+            logger.error(f"检查用户权限失败: {e}")
+            return []
+        results = dict(zip(keys, checked))
+
+    user_permissions = []
+    for key in keys:
+        result = results[key]
+        if result.get("error"):
+            logger.error(f"检查权限 {key[1]} 失败: {result['error']}")
+        elif result["allowed"]:
+            user_permissions.append(key[1])
+
+    if batch is not None:
+        batch.permission_sets[(user, object_id)] = user_permissions
 
-    return user_permissions
+    return list(user_permissions)
 
 
 # ==================== 批量权限检查 ====================
@@ -276,37 +558,80 @@ async def get_user_permissions(user_id: str, object_id: str) -> list[str]:
 async def filter_accessible_objects(
     user_id: str,
     relation: str,
-    object_ids: list[str]
+    object_ids: list[str],
+    list_objects_threshold: int = 200,
+    max_batch_size: int = 50,
+    list_objects_max_results: int = 1000
 ) -> list[str]:
     """
     从对象列表中过滤出用户有权限访问的对象
 
-    注意：这个方法会对每个对象进行单独的权限检查，性能较差。
-    如果可能，应该使用 OpenFGA 的 ListObjects API。
+    根据候选列表的大小自动选择策略：
+    - 少于 list_objects_threshold 个对象：使用 BatchCheck，按 max_batch_size
+      分块后并发发送，只需少量往返
+    - 达到阈值：每种对象类型调用一次 ListObjects，与候选列表求交集
+
+    ListObjects 的结果数量受服务端上限（默认 1000）限制。如果返回数量达到
+    list_objects_max_results，结果可能被截断，未命中的候选对象会改用
+    BatchCheck 复核，保证不会漏掉有权限的对象。
 
     Args:
         user_id: 用户 ID
         relation: 权限关系
         object_ids: 对象 ID 列表（完整格式）
+        list_objects_threshold: 切换到 ListObjects 的候选数量阈值
+        max_batch_size: 单个 BatchCheck 请求的最大检查项数
+        list_objects_max_results: 服务端 ListObjects 的结果上限
 
     Returns:
-        用户有权限访问的对象 ID 列表
+        用户有权限访问的对象 ID 列表，保持输入顺序
     """
-    accessible = []
+    if not object_ids:
+        return []
+
+    user = f"user:{user_id}"
+    candidates = list(dict.fromkeys(object_ids))
+    accessible: set[str] = set()
+    to_check = candidates
 
-    for object_id in object_ids:
+    if len(candidates) >= list_objects_threshold:
+        object_types = dict.fromkeys(object_id.split(":", 1)[0] for object_id in candidates)
         try:
-            allowed = await openfga_service.check_permission(
-                user=f"user:{user_id}",
-                relation=relation,
-                object_id=object_id
+            truncated = False
+            for object_type in object_types:
+                objects = await openfga_service.list_objects(
+                    user=user,
+                    relation=relation,
+                    object_type=object_type
+                )
+                accessible.update(objects)
+                truncated = truncated or len(objects) >= list_objects_max_results
+
+            # ListObjects 结果完整时，交集就是最终结果
+            to_check = (
+                [object_id for object_id in candidates if object_id not in accessible]
+                if truncated else []
+            )
+        except Exception as e:
+            logger.error(f"ListObjects 过滤失败，改用批量检查: {e}")
+
+    if to_check:
+        try:
+            results = await openfga_service.batch_check(
+                [
+                    {"user": user, "relation": relation, "object": object_id}
+                    for object_id in to_check
+                ],
+                max_batch_size=max_batch_size
             )
 
-            if allowed:
-                accessible.append(object_id)
+            for result in results:
+                if result["error"]:
+                    logger.error(f"检查对象 {result['object']} 权限失败: {result['error']}")
+                elif result["allowed"]:
+                    accessible.add(result["object"])
 
         except Exception as e:
-            logger.error(f"检查对象 {object_id} 权限失败: {e}")
-            continue
+            logger.error(f"批量检查对象权限失败: {e}")
 
-    return accessible
+    return [object_id for object_id in object_ids if object_id in accessible]
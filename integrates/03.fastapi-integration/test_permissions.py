@@ -0,0 +1,85 @@
+"""
+权限依赖单元测试
+
+使用替身服务，不需要运行 OpenFGA 和 FastAPI 服务。
+"""
+
+import asyncio
+import importlib
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+
+from auth import get_current_user
+
+
+def import_permissions():
+    """导入时会创建全局的 OpenFGA 客户端，需要在事件循环中导入"""
+    return importlib.import_module("permissions")
+
+
+class FakeService:
+    """记录 batch_check 调用次数的替身服务"""
+
+    def __init__(self, allowed: set, delay: float = 0):
+        self.allowed = allowed
+        self.delay = delay
+        self.calls = []
+
+    async def batch_check(self, checks):
+        self.calls.append(checks)
+        await asyncio.sleep(self.delay)
+        return [
+            {"allowed": (c["user"], c["relation"], c["object"]) in self.allowed, "error": None}
+            for c in checks
+        ]
+
+
+@pytest.mark.asyncio
+async def test_route_guards_share_one_round_trip(monkeypatch):
+    """同一路由上的多个权限依赖合并为一次 BatchCheck"""
+    permissions = import_permissions()
+    service = FakeService({
+        ("user:alice", "viewer", "document:1"),
+        ("user:alice", "editor", "document:1"),
+    })
+    monkeypatch.setattr(permissions, "openfga_service", service)
+
+    app = FastAPI()
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": "alice"}
+
+    @app.get("/documents/{document_id}")
+    async def get_document(
+        document_id: str,
+        _viewer: bool = Depends(permissions.require_permission("viewer")),
+        _editor: bool = Depends(permissions.require_permission("editor")),
+        _any: bool = Depends(permissions.require_any_permission(["owner", "editor"])),
+        batch=Depends(permissions.get_permission_batch)
+    ):
+        return {"round_trips": batch.round_trips}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/documents/1")
+    assert response.status_code == 200
+    assert response.json() == {"round_trips": 1}
+    assert len(service.calls) == 1 and len(service.calls[0]) == 3
+
+
+@pytest.mark.asyncio
+async def test_waiters_survive_cancelled_leader():
+    """发起批量请求的依赖被取消时，等待同一批结果的依赖得到错误结果"""
+    batch = import_permissions().PermissionBatch(FakeService(set(), delay=10))
+    key = ("user:alice", "viewer", "document:1")
+
+    leader = asyncio.create_task(batch.resolve([key]))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(batch.resolve([key]))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    result = (await waiter)[key]
+    assert not result["allowed"] and result["error"]
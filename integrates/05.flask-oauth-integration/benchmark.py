@@ -0,0 +1,100 @@
+"""
+权限检查吞吐量基准测试
+
+对比两种同步调用方式的每秒检查次数：
+1. 旧方式：每次调用新建 OpenFgaClient 和事件循环，用完即丢弃
+2. 桥接器：进程内常驻事件循环线程 + 长期存在的客户端（OpenFGASyncBridge）
+
+使用方法:
+    # 需要先启动 OpenFGA 并配置 OPENFGA_API_URL / OPENFGA_STORE_ID
+    python benchmark.py --requests 500 --threads 8
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from openfga_sdk.client.models import ClientCheckRequest
+
+from permissions import get_openfga_client, OpenFGASyncBridge
+
+
+def legacy_check(user_id: str, relation: str, object_id: str) -> bool:
+    """旧实现：每次调用都新建客户端和事件循环"""
+    client = get_openfga_client()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    try:
+        response = loop.run_until_complete(
+            client.check(ClientCheckRequest(
+                user=f"user:{user_id}",
+                relation=relation,
+                object=object_id
+            ))
+        )
+        loop.run_until_complete(client.close())
+        return response.allowed
+    finally:
+        loop.close()
+
+
+def run_benchmark(name: str, check, total: int, threads: int) -> float:
+    """执行 total 次检查并返回每秒检查次数"""
+    def task(i: int):
+        return check(f"bench-{i % 10}", 'viewer', 'document:benchmark')
+
+    # 预热，排除首次建连的开销
+    task(0)
+
+    started = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(task, range(total)))
+    else:
+        for i in range(total):
+            task(i)
+    elapsed = time.perf_counter() - started
+
+    rate = total / elapsed
+    print(f"  {name:<10} {total} 次检查, 耗时 {elapsed:.2f}s, {rate:.1f} checks/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OpenFGA 同步权限检查基准测试')
+    parser.add_argument('--requests', type=int, default=200, help='检查次数 (默认: 200)')
+    parser.add_argument('--threads', type=int, default=1, help='并发线程数 (默认: 1)')
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    bridge = OpenFGASyncBridge()
+
+    def bridge_check(user_id: str, relation: str, object_id: str) -> bool:
+        response = bridge.call(
+            lambda client: client.check(ClientCheckRequest(
+                user=f"user:{user_id}",
+                relation=relation,
+                object=object_id
+            ))
+        )
+        return response.allowed
+
+    print("=" * 60)
+    print(f"同步权限检查基准测试 (threads={args.threads})")
+    print("=" * 60)
+
+    try:
+        before = run_benchmark('旧方式', legacy_check, args.requests, args.threads)
+        after = run_benchmark('桥接器', bridge_check, args.requests, args.threads)
+    finally:
+        bridge.shutdown()
+
+    print(f"\n提升: {after / before:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,10 +7,14 @@ OpenFGA 权限检查装饰器和工具函数
 from functools import wraps
 from flask import session, jsonify, request
 from openfga_sdk.client import OpenFgaClient
-from openfga_sdk.client.models import ClientConfiguration, ClientCheckRequest, ClientWriteRequest, ClientTuple
+from openfga_sdk.client.models import (
+    ClientConfiguration, ClientCheckRequest, ClientWriteRequest, ClientTuple, ClientListObjectsRequest
+)
 import os
-from typing import Optional, List
+from typing import Optional, List, Callable, Awaitable, Any
 import asyncio
+import atexit
+import threading
 
 
 # 初始化 OpenFGA 客户端
@@ -24,6 +28,163 @@ def get_openfga_client():
     return OpenFgaClient(config)
 
 
+class OpenFGASyncBridge:
+    """
+    进程级的同步桥接器
+
+    Flask 视图是同步代码，而 OpenFGA SDK 只提供异步接口。
+    如果每次调用都新建事件循环和客户端，连接池会随之丢弃，
+    每个受保护的请求都要重新建立 TCP/TLS 连接。
+
+    桥接器在每个进程（gunicorn worker）中维护：
+        - 一个运行常驻事件循环的后台线程
+        - 一个长期存在的 OpenFgaClient（在事件循环内创建，复用连接池）
+
+    同步代码通过 run_coroutine_threadsafe 把协程提交到该循环并等待结果。
+    进程退出时由 atexit 调用 shutdown() 关闭客户端并停止事件循环。
+
+    使用示例:
+        bridge = get_sync_bridge()
+        response = bridge.call(lambda client: client.check(request))
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], OpenFgaClient] = get_openfga_client,
+        timeout: Optional[float] = None
+    ):
+        """
+        参数:
+            client_factory: 创建 OpenFgaClient 的工厂函数
+            timeout: 单次调用的默认超时时间（秒），None 表示不限制
+        """
+        self._client_factory = client_factory
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[OpenFgaClient] = None
+        self._pid: Optional[int] = None
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        """确保当前进程中的后台事件循环已启动"""
+        # fork 出来的 worker 不会继承父进程的线程，需要按 PID 重新启动
+        if self._loop is not None and self._pid == os.getpid():
+            return self._loop
+
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=self._run_loop,
+                    args=(loop,),
+                    name='openfga-sync-bridge',
+                    daemon=True
+                )
+                thread.start()
+
+                self._loop = loop
+                self._thread = thread
+                self._client = None
+                self._pid = os.getpid()
+
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop):
+        """后台线程入口：持续运行事件循环"""
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    async def _invoke(self, fn: Callable[[OpenFgaClient], Awaitable[Any]]) -> Any:
+        """在后台事件循环中执行调用，首次调用时创建客户端"""
+        if self._client is None:
+            self._client = self._client_factory()
+        return await fn(self._client)
+
+    @staticmethod
+    async def _drain(client: Optional[OpenFgaClient]):
+        """取消仍在执行的调用并关闭客户端"""
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        if client is not None:
+            await client.close()
+
+    def call(
+        self,
+        fn: Callable[[OpenFgaClient], Awaitable[Any]],
+        timeout: Optional[float] = None
+    ) -> Any:
+        """
+        同步执行一次 OpenFGA 调用
+
+        参数:
+            fn: 接收客户端并返回协程的函数，例如 lambda client: client.check(...)
+            timeout: 本次调用的超时时间（秒），默认使用 self.timeout
+
+        返回:
+            协程的返回值
+
+        异常:
+            TimeoutError: 调用超时（后台协程会被取消）
+            其他异常: 原样抛出 SDK 抛出的异常
+        """
+        loop = self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self._invoke(fn), loop)
+
+        try:
+            return future.result(timeout if timeout is not None else self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def shutdown(self, timeout: float = 5.0):
+        """
+        关闭客户端并停止后台事件循环
+
+        参数:
+            timeout: 等待关闭完成的最长时间（秒）
+        """
+        with self._lock:
+            loop, thread, client = self._loop, self._thread, self._client
+            owned = self._pid == os.getpid()
+
+            self._loop = None
+            self._thread = None
+            self._client = None
+            self._pid = None
+
+        # 从父进程继承来的对象不属于当前进程，无需清理
+        if loop is None or not owned:
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._drain(client), loop).result(timeout)
+        except Exception as e:
+            print(f"关闭 OpenFGA 客户端失败: {e}")
+
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout)
+        if not loop.is_running():
+            loop.close()
+
+
+_sync_bridge = OpenFGASyncBridge(
+    timeout=float(os.getenv('OPENFGA_TIMEOUT', '10'))
+)
+atexit.register(_sync_bridge.shutdown)
+
+
+def get_sync_bridge() -> OpenFGASyncBridge:
+    """获取当前进程共享的同步桥接器"""
+    return _sync_bridge
+
+
 def check_permission_sync(user_id: str, relation: str, object_id: str) -> bool:
     """
     同步检查权限
@@ -37,24 +198,14 @@ def check_permission_sync(user_id: str, relation: str, object_id: str) -> bool:
         bool: 是否有权限
     """
     try:
-        client = get_openfga_client()
-
-        # 创建新的事件循环
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        try:
-            # 执行权限检查
-            response = loop.run_until_complete(
-                client.check(ClientCheckRequest(
-                    user=f"user:{user_id}",
-                    relation=relation,
-                    object=object_id
-                ))
-            )
-            return response.allowed
-        finally:
-            loop.close()
+        response = get_sync_bridge().call(
+            lambda client: client.check(ClientCheckRequest(
+                user=f"user:{user_id}",
+                relation=relation,
+                object=object_id
+            ))
+        )
+        return response.allowed
 
     except Exception as e:
         print(f"权限检查失败: {e}")
@@ -86,6 +237,79 @@ async def check_permission_async(user_id: str, relation: str, object_id: str) ->
         return False
 
 
+async def _first_allowed_relation(
+    client: OpenFgaClient,
+    user: str,
+    relations: List[str],
+    object_id: str,
+    max_in_flight: int
+) -> Optional[str]:
+    """并发检查多个关系，返回第一个被允许的关系，其余检查随即取消"""
+    semaphore = asyncio.Semaphore(max(1, max_in_flight))
+
+    async def check(relation: str) -> Optional[str]:
+        async with semaphore:
+            response = await client.check(ClientCheckRequest(
+                user=user,
+                relation=relation,
+                object=object_id
+            ))
+            return relation if response.allowed else None
+
+    tasks = [asyncio.create_task(check(relation)) for relation in relations]
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                matched = await next_done
+            except Exception as e:
+                print(f"权限检查失败: {e}")
+                continue
+
+            if matched:
+                return matched
+
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def check_any_permission_sync(
+    user_id: str,
+    relations: List[str],
+    object_id: str,
+    max_in_flight: int = 4,
+    timeout: Optional[float] = None
+) -> Optional[str]:
+    """
+    并发检查多个关系，任意一个允许即返回
+
+    所有关系的检查同时发出，第一个返回 allowed 的结果胜出并取消其余检查，
+    延迟由最慢的单次检查决定，而不是 N 次检查之和。
+
+    参数:
+        user_id: 用户 ID
+        relations: 关系列表
+        object_id: 对象 ID (例如: document:123)
+        max_in_flight: 同时进行的最大检查数
+        timeout: 所有检查共享的延迟预算（秒），默认使用桥接器的超时时间
+
+    返回:
+        第一个被允许的关系，全部被拒绝时返回 None
+
+    异常:
+        TimeoutError: 在延迟预算内没有得到结论
+    """
+    return get_sync_bridge().call(
+        lambda client: _first_allowed_relation(
+            client, f"user:{user_id}", relations, object_id, max_in_flight
+        ),
+        timeout=timeout
+    )
+
+
 def write_tuples_sync(tuples: List[dict]) -> bool:
     """
     同步写入权限关系
@@ -104,8 +328,6 @@ def write_tuples_sync(tuples: List[dict]) -> bool:
         bool: 是否成功
     """
     try:
-        client = get_openfga_client()
-
         # 转换为 ClientTuple 对象
         client_tuples = [
             ClientTuple(
@@ -116,19 +338,12 @@ def write_tuples_sync(tuples: List[dict]) -> bool:
             for t in tuples
         ]
 
-        # 创建新的事件循环
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        try:
-            loop.run_until_complete(
-                client.write(ClientWriteRequest(
-                    writes=client_tuples
-                ))
-            )
-            return True
-        finally:
-            loop.close()
+        get_sync_bridge().call(
+            lambda client: client.write(ClientWriteRequest(
+                writes=client_tuples
+            ))
+        )
+        return True
 
     except Exception as e:
         print(f"写入权限关系失败: {e}")
@@ -146,8 +361,6 @@ def delete_tuples_sync(tuples: List[dict]) -> bool:
         bool: 是否成功
     """
     try:
-        client = get_openfga_client()
-
         # 转换为 ClientTuple 对象
         client_tuples = [
             ClientTuple(
@@ -158,19 +371,12 @@ def delete_tuples_sync(tuples: List[dict]) -> bool:
             for t in tuples
         ]
 
-        # 创建新的事件循环
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        try:
-            loop.run_until_complete(
-                client.write(ClientWriteRequest(
-                    deletes=client_tuples
-                ))
-            )
-            return True
-        finally:
-            loop.close()
+        get_sync_bridge().call(
+            lambda client: client.write(ClientWriteRequest(
+                deletes=client_tuples
+            ))
+        )
+        return True
 
     except Exception as e:
         print(f"删除权限关系失败: {e}")
@@ -239,7 +445,14 @@ def require_permission(relation: str, object_type: str = 'document', object_id_p
     return decorator
 
 
-def require_any_permission(relations: List[str], object_type: str = 'document', object_id_param: str = 'document_id'):
+def require_any_permission(
+    relations: List[str],
+    object_type: str = 'document',
+    object_id_param: str = 'document_id',
+    concurrent: bool = False,
+    max_in_flight: int = 4,
+    timeout: Optional[float] = None
+):
     """
     多个权限之一的检查装饰器
 
@@ -249,11 +462,18 @@ def require_any_permission(relations: List[str], object_type: str = 'document',
         relations: 权限列表 ['viewer', 'editor', 'owner']
         object_type: 对象类型
         object_id_param: URL 参数名
+        concurrent: 是否并发检查所有关系（任意一个允许即通过，其余取消）
+        max_in_flight: 并发模式下同时进行的最大检查数
+        timeout: 并发模式下所有检查共享的延迟预算（秒），超时返回 503
 
     使用示例:
         @require_any_permission(['editor', 'owner'], 'document')
         def update_document(document_id):
             ...
+
+        @require_any_permission(['owner', 'editor', 'viewer'], concurrent=True, timeout=0.2)
+        def get_document(document_id):
+            ...
     """
     def decorator(f):
         @wraps(f)
@@ -279,10 +499,23 @@ def require_any_permission(relations: List[str], object_type: str = 'document',
 
             # 检查是否有任意一个权限
             has_permission = False
-            for relation in relations:
-                if check_permission_sync(user_id, relation, full_object_id):
-                    has_permission = True
-                    break
+            if concurrent:
+                try:
+                    has_permission = check_any_permission_sync(
+                        user_id, relations, full_object_id, max_in_flight, timeout
+                    ) is not None
+                except TimeoutError:
+                    return jsonify({
+                        'error': 'Service Unavailable',
+                        'message': 'Permission check timed out'
+                    }), 503
+                except Exception as e:
+                    print(f"权限检查失败: {e}")
+            else:
+                for relation in relations:
+                    if check_permission_sync(user_id, relation, full_object_id):
+                        has_permission = True
+                        break
 
             if not has_permission:
                 return jsonify({
@@ -348,23 +581,14 @@ def list_user_objects(user_id: str, relation: str, object_type: str) -> List[str
         对象 ID 列表
     """
     try:
-        client = get_openfga_client()
-
-        # 创建新的事件循环
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        try:
-            response = loop.run_until_complete(
-                client.list_objects(
-                    user=f"user:{user_id}",
-                    relation=relation,
-                    type=object_type
-                )
-            )
-            return response.objects or []
-        finally:
-            loop.close()
+        response = get_sync_bridge().call(
+            lambda client: client.list_objects(ClientListObjectsRequest(
+                user=f"user:{user_id}",
+                relation=relation,
+                type=object_type
+            ))
+        )
+        return response.objects or []
 
     except Exception as e:
         print(f"列出对象失败: {e}")
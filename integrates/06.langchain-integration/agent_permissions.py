@@ -6,16 +6,24 @@ AI Agent 权限控制封装模块
 
 import asyncio
 import logging
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Callable, Awaitable
 from openfga_sdk import OpenFgaClient, ClientConfiguration
 from openfga_sdk.client.models import ClientWriteRequest, ClientTuple, ClientCheckRequest
 
+from audit import AuditLog
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# get_or_load 中发起加载的调用被取消时交给等待者的标记
+_LOAD_CANCELLED = object()
+
+
 class PermissionDeniedError(Exception):
     """权限被拒绝异常"""
     pass
@@ -32,7 +40,9 @@ class OpenFGAPermissionChecker:
         api_url: str,
         store_id: str,
         model_id: str,
-        enable_audit: bool = True
+        enable_audit: bool = True,
+        cache: Optional["PermissionCache"] = None,
+        audit_log: Optional[AuditLog] = None
     ):
         """初始化权限检查器
 
@@ -41,6 +51,8 @@ class OpenFGAPermissionChecker:
             store_id: Store ID
             model_id: Authorization Model ID
             enable_audit: 是否启用审计日志
+            cache: 权限缓存（可选），不带上下文元组的检查结果会被缓存
+            audit_log: 审计日志（可选），默认使用只保存在内存中的有界 AuditLog
         """
         configuration = ClientConfiguration(
             api_url=api_url,
@@ -49,7 +61,8 @@ class OpenFGAPermissionChecker:
         )
         self.client = OpenFgaClient(configuration)
         self.enable_audit = enable_audit
-        self.audit_logs: List[Dict[str, Any]] = []
+        self.cache = cache
+        self.audit = audit_log or AuditLog()
 
         logger.info(f"OpenFGA 权限检查器已初始化: {api_url}")
 
@@ -71,18 +84,19 @@ class OpenFGAPermissionChecker:
         Returns:
             bool: 是否有权限
         """
+        contextual_tuples = context.get("tuples", []) if context else []
+
         try:
-            # 执行权限检查
-            response = await self.client.check(
-                ClientCheckRequest(
+            # 执行权限检查（上下文元组会改变结果，不走缓存）
+            if self.cache is not None and not contextual_tuples:
+                allowed = await self.cache.get_or_load(
+                    PermissionCache.make_key(user, relation, object),
+                    lambda: self._check(user, relation, object, contextual_tuples),
                     user=user,
-                    relation=relation,
-                    object=object,
-                    contextual_tuples=context.get("tuples", []) if context else []
+                    object=object
                 )
-            )
-
-            allowed = response.allowed
+            else:
+                allowed = await self._check(user, relation, object, contextual_tuples)
 
             # 记录审计日志
             if self.enable_audit:
@@ -107,6 +121,24 @@ class OpenFGAPermissionChecker:
             # 默认拒绝原则：出错时拒绝访问
             return False
 
+    async def _check(
+        self,
+        user: str,
+        relation: str,
+        object: str,
+        contextual_tuples: List[Any]
+    ) -> bool:
+        """向 OpenFGA 发送一次 Check 请求"""
+        response = await self.client.check(
+            ClientCheckRequest(
+                user=user,
+                relation=relation,
+                object=object,
+                contextual_tuples=contextual_tuples
+            )
+        )
+        return response.allowed
+
     async def grant_permission(
         self,
         user: str,
@@ -136,6 +168,10 @@ class OpenFGAPermissionChecker:
                 )
             )
 
+            # 清理受影响的缓存条目
+            if self.cache is not None:
+                self.cache.invalidate_tuple(user, relation, object)
+
             # 记录审计日志
             if self.enable_audit:
                 self._log_audit(
@@ -185,6 +221,10 @@ class OpenFGAPermissionChecker:
                 )
             )
 
+            # 清理受影响的缓存条目
+            if self.cache is not None:
+                self.cache.invalidate_tuple(user, relation, object)
+
             # 记录审计日志
             if self.enable_audit:
                 self._log_audit(
@@ -258,9 +298,9 @@ class OpenFGAPermissionChecker:
             "context": context or {}
         }
 
-        self.audit_logs.append(audit_entry)
+        # 只写内存并入队，落盘由 AuditLog 的后台任务完成
+        self.audit.record(audit_entry)
 
-        # 在实际应用中，应该将审计日志持久化到数据库或日志系统
         logger.debug(f"审计日志: {audit_entry}")
 
     def get_audit_logs(
@@ -277,18 +317,19 @@ class OpenFGAPermissionChecker:
         Returns:
             List[Dict]: 审计日志列表
         """
-        logs = self.audit_logs
-
-        # 按用户过滤
-        if user:
-            logs = [log for log in logs if log["user"] == user]
+        return self.audit.query(user=user, limit=limit)
 
-        # 返回最新的 N 条日志
-        return logs[-limit:]
+    @property
+    def audit_logs(self) -> List[Dict[str, Any]]:
+        """内存中保留的全部审计日志"""
+        return self.audit.all()
 
     async def close(self):
         """关闭客户端连接"""
         # OpenFGA SDK 会自动管理连接
+        if self.cache is not None:
+            await self.cache.close()
+        await self.audit.close()
         logger.info("OpenFGA 权限检查器已关闭")
 
 
@@ -296,16 +337,57 @@ class PermissionCache:
     """权限缓存
 
     用于缓存权限检查结果，提升性能。
+
+    - 容量上限 + LRU 淘汰：长时间运行的 Agent 会话内存占用保持平稳
+    - 过期时间基于单调时钟，不受系统时间调整影响
+    - 后台任务定期清理过期条目，不依赖再次读取同一个键
+    - 单飞（single-flight）：同一个键的并发未命中只触发一次实际检查
+    - 命中率、淘汰数等计数器可通过 stats() 读取
+    - 写入感知的失效：按对象、按用户建立二级索引，元组变更时只清理受影响的条目；
+      经由用户集（如 group:eng#member）或父对象继承的结果通过按类型的纪元计数器失效
     """
 
-    def __init__(self, ttl_seconds: int = 300):
+    def __init__(
+        self,
+        ttl_seconds: float = 300,
+        max_size: int = 10000,
+        sweep_interval: Optional[float] = 60,
+        type_dependents: Optional[Dict[str, List[str]]] = None
+    ):
         """初始化权限缓存
 
         Args:
             ttl_seconds: 缓存过期时间（秒）
+            max_size: 最大缓存条目数，超出后淘汰最久未使用的条目
+            sweep_interval: 后台清理过期条目的间隔（秒），None 表示不启动后台清理
+            type_dependents: 类型依赖关系，如 {"folder": ["document"]} 表示
+                document 的权限通过 "from parent" 继承自 folder，
+                folder 的元组变更会使所有 document 条目失效
         """
-        self.cache: Dict[str, tuple[bool, datetime]] = {}
+        # key -> (权限结果, 过期时间点, 写入时对象类型的纪元)，按最近使用顺序排列
+        self.cache: "OrderedDict[str, Tuple[bool, float, int]]" = OrderedDict()
         self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.sweep_interval = sweep_interval
+        self.type_dependents = type_dependents or {}
+
+        # 二级索引：对象 -> 键、用户 -> 键，以及键 -> (用户, 对象)
+        self._by_object: Dict[str, set] = {}
+        self._by_user: Dict[str, set] = {}
+        self._refs: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._type_epochs: Dict[str, int] = {}
+        # 每次失效操作递增，用于判断加载期间是否发生过写入
+        self._generation = 0
+
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+        self.invalidations = 0
 
     def get(self, key: str) -> Optional[bool]:
         """获取缓存的权限结果
@@ -316,30 +398,302 @@ class PermissionCache:
         Returns:
             Optional[bool]: 权限结果，如果缓存不存在或已过期则返回 None
         """
-        if key not in self.cache:
+        entry = self.cache.get(key)
+        if entry is None:
+            self.misses += 1
             return None
 
-        result, timestamp = self.cache[key]
+        result, expires_at, epoch = entry
 
         # 检查是否过期
-        if (datetime.now() - timestamp).total_seconds() > self.ttl_seconds:
-            del self.cache[key]
+        if time.monotonic() >= expires_at:
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        # 检查对象类型是否已整体失效
+        if epoch != self._epoch_of(key):
+            self._remove(key)
+            self.invalidations += 1
+            self.misses += 1
             return None
 
+        self.cache.move_to_end(key)
+        self.hits += 1
         return result
 
-    def set(self, key: str, value: bool):
+    def set(
+        self,
+        key: str,
+        value: bool,
+        user: Optional[str] = None,
+        object: Optional[str] = None
+    ):
         """设置缓存
 
         Args:
             key: 缓存键
             value: 权限结果
+            user: 用户标识（可选），用于按用户失效
+            object: 对象标识（可选），用于按对象和按类型失效
         """
-        self.cache[key] = (value, datetime.now())
+        if key in self._refs:
+            self._unindex(key)
+
+        self._refs[key] = (user, object)
+        if user is not None:
+            self._by_user.setdefault(user, set()).add(key)
+        if object is not None:
+            self._by_object.setdefault(object, set()).add(key)
+
+        self.cache[key] = (value, time.monotonic() + self.ttl_seconds, self._epoch_of(key))
+        self.cache.move_to_end(key)
+
+        while len(self.cache) > self.max_size:
+            oldest = next(iter(self.cache))
+            self._remove(oldest)
+            self.evictions += 1
+
+        self._ensure_sweeper()
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[bool]],
+        user: Optional[str] = None,
+        object: Optional[str] = None
+    ) -> bool:
+        """获取缓存结果，未命中时调用 loader 加载并写入缓存
+
+        同一个键的并发未命中会等待同一次加载，而不是各自发起请求。
+        加载失败时异常传给所有等待者，失败结果不会被缓存；
+        发起加载的调用被取消时，等待者中的一个重新加载，其他等待者不会收到 CancelledError。
+
+        Args:
+            key: 缓存键
+            loader: 返回权限结果的异步函数
+            user: 用户标识（可选），用于按用户失效
+            object: 对象标识（可选），用于按对象和按类型失效
+
+        Returns:
+            bool: 权限结果
+        """
+        while True:
+            result = self.get(key)
+            if result is not None:
+                return result
+
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            self.coalesced += 1
+            result = await asyncio.shield(future)
+            if result is not _LOAD_CANCELLED:
+                return result
+            # 发起加载的调用被取消：重新进入，第一个等待者接手加载，其余等待者合并到新的加载
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generation
+
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            # 取消只属于发起加载的调用，不能传给合并进来的等待者
+            self._inflight.pop(key, None)
+            future.set_result(_LOAD_CANCELLED)
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        else:
+            # 加载期间发生过失效，结果可能已过时，不写入缓存
+            if generation == self._generation:
+                self.set(key, result, user=user, object=object)
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def sweep(self) -> int:
+        """清理所有已过期的条目
+
+        Returns:
+            int: 清理的条目数
+        """
+        now = time.monotonic()
+        expired = [key for key, (_, expires_at, _) in self.cache.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+
+        self.expirations += len(expired)
+        return len(expired)
+
+    def _ensure_sweeper(self):
+        """在有运行中的事件循环时启动后台清理任务"""
+        if self.sweep_interval is None:
+            return
+        if self._sweeper is not None and not self._sweeper.done():
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        self._sweeper = loop.create_task(self._sweep_periodically())
+
+    async def _sweep_periodically(self):
+        """后台清理任务"""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            removed = self.sweep()
+            if removed:
+                logger.debug(f"权限缓存清理过期条目: {removed}")
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息
+
+        Returns:
+            Dict: 包含 size, hits, misses, hit_rate, evictions, expirations, coalesced
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.cache),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations
+        }
+
+    def invalidate(
+        self,
+        user: Optional[str] = None,
+        object: Optional[str] = None
+    ) -> int:
+        """清理与指定用户或对象相关的缓存条目
+
+        Args:
+            user: 用户标识（可选）
+            object: 对象标识（可选）
+
+        Returns:
+            int: 清理的条目数
+        """
+        self._generation += 1
+
+        keys = set()
+        if user is not None:
+            keys |= self._by_user.get(user, set())
+        if object is not None:
+            keys |= self._by_object.get(object, set())
+
+        for key in keys:
+            self._remove(key)
+
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def invalidate_type(self, object_type: str):
+        """使某个对象类型（及依赖它的类型）的全部条目失效
+
+        通过递增纪元计数器实现，旧条目在下次读取或清理时被移除。
+
+        Args:
+            object_type: 对象类型（如 document）
+        """
+        self._generation += 1
+
+        pending = [object_type]
+        seen = set()
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            self._type_epochs[current] = self._type_epochs.get(current, 0) + 1
+            pending.extend(self.type_dependents.get(current, []))
+
+    def invalidate_tuple(self, user: str, relation: str, object: str) -> int:
+        """元组写入或删除后清理受影响的缓存条目
+
+        - 清理该对象上的全部条目（覆盖 owner -> editor -> viewer 这类计算关系）
+        - 清理该用户的全部条目（覆盖经由组成员、父对象间接获得的权限）
+        - 用户是用户集（如 group:eng#member）或通配符（如 user:*）时，
+          受影响的用户无法逐个列出，改为使对象类型整体失效
+        - 依赖该类型的类型（type_dependents）同样整体失效
+
+        Args:
+            user: 元组的用户
+            relation: 元组的关系
+            object: 元组的对象
+
+        Returns:
+            int: 直接清理的条目数
+        """
+        removed = self.invalidate(user=user, object=object)
+
+        object_type = object.split(":", 1)[0]
+        if "#" in user or user.endswith(":*"):
+            self.invalidate_type(object_type)
+        else:
+            for dependent in self.type_dependents.get(object_type, []):
+                self.invalidate_type(dependent)
+
+        return removed
+
+    def _epoch_of_object(self, object: Optional[str]) -> int:
+        """获取对象所属类型的当前纪元"""
+        if object is None:
+            return 0
+        return self._type_epochs.get(object.split(":", 1)[0], 0)
+
+    def _epoch_of(self, key: str) -> int:
+        """获取缓存键对应对象类型的当前纪元"""
+        _, object = self._refs.get(key, (None, None))
+        return self._epoch_of_object(object)
+
+    def _unindex(self, key: str):
+        """从二级索引中移除缓存键"""
+        user, object = self._refs.pop(key, (None, None))
+        for index, value in ((self._by_user, user), (self._by_object, object)):
+            if value is None:
+                continue
+            keys = index.get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[value]
+
+    def _remove(self, key: str):
+        """移除缓存条目及其索引"""
+        self.cache.pop(key, None)
+        self._unindex(key)
 
     def clear(self):
         """清空缓存"""
         self.cache.clear()
+        self._by_object.clear()
+        self._by_user.clear()
+        self._refs.clear()
+
+    async def close(self):
+        """停止后台清理任务"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
 
     @staticmethod
     def make_key(user: str, relation: str, object: str) -> str:
@@ -0,0 +1,229 @@
+"""
+审计日志模块
+
+为 Agent 权限检查提供有界的审计日志：
+- 内存环形缓冲区保存最近的审计记录，长时间运行也不会无限增长
+- 按用户建立索引，查询某个用户的记录无需扫描全部日志；索引只引用环形缓冲区中的记录，
+  记录被缓冲区淘汰时同时从索引中移除，总内存不超过 capacity 条
+- 后台任务批量写入按大小轮转的 JSONL 文件，记录审计不会阻塞权限检查
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Optional, List, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLog:
+    """审计日志
+
+    record() 只做内存操作和非阻塞入队，文件写入在后台任务中通过线程池完成。
+    写入队列已满时丢弃该条记录的落盘（内存中仍保留），并计入 dropped。
+    """
+
+    def __init__(
+        self,
+        capacity: int = 10000,
+        per_user_capacity: int = 1000,
+        max_users: int = 10000,
+        log_dir: Optional[str] = None,
+        file_name: str = "audit.jsonl",
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        batch_size: int = 500,
+        queue_size: int = 10000
+    ):
+        """初始化审计日志
+
+        Args:
+            capacity: 内存中保留的最大记录数（包括用户索引）
+            per_user_capacity: 每个用户索引保留的最大记录数（不超过缓冲区中该用户的记录数）
+            max_users: 用户索引的最大用户数，超出后淘汰最久未活动的用户
+            log_dir: JSONL 文件目录，None 表示只保存在内存中
+            file_name: 当前日志文件名
+            max_bytes: 单个文件的最大字节数，超出后轮转
+            backup_count: 保留的历史文件数（audit.jsonl.1 ... audit.jsonl.N）
+            batch_size: 后台任务单次写入的最大记录数
+            queue_size: 待写入队列的容量
+        """
+        self._entries: deque = deque(maxlen=capacity)
+        self._by_user: "OrderedDict[str, deque]" = OrderedDict()
+        self.per_user_capacity = per_user_capacity
+        self.max_users = max_users
+
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, file_name) if log_dir else None
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+
+        self._queue: Optional[asyncio.Queue] = asyncio.Queue(queue_size) if log_dir else None
+        self._writer: Optional[asyncio.Task] = None
+
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+
+    def record(self, entry: Dict[str, Any]):
+        """记录一条审计日志（不阻塞）
+
+        Args:
+            entry: 审计记录，需包含 user 字段
+        """
+        if len(self._entries) == self._entries.maxlen:
+            self._evict_oldest()
+        self._entries.append(entry)
+        self.recorded += 1
+
+        user = entry.get("user")
+        if user is not None:
+            user_entries = self._by_user.get(user)
+            if user_entries is None:
+                user_entries = deque(maxlen=self.per_user_capacity)
+                self._by_user[user] = user_entries
+                if len(self._by_user) > self.max_users:
+                    self._by_user.popitem(last=False)
+            else:
+                self._by_user.move_to_end(user)
+            user_entries.append(entry)
+
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                return
+            self._ensure_writer()
+
+    def _evict_oldest(self):
+        """从缓冲区淘汰最旧的记录，并从用户索引中移除"""
+        oldest = self._entries.popleft()
+        user = oldest.get("user")
+        user_entries = self._by_user.get(user)
+        # 用户索引与缓冲区按相同顺序追加，最旧的记录如果还在索引中，一定在索引的最前面
+        if user_entries and user_entries[0] is oldest:
+            user_entries.popleft()
+            if not user_entries:
+                del self._by_user[user]
+
+    def __len__(self) -> int:
+        """内存中保留的记录数"""
+        return len(self._entries)
+
+    def all(self) -> List[Dict[str, Any]]:
+        """内存中保留的全部记录（按时间顺序）"""
+        return list(self._entries)
+
+    def query(
+        self,
+        user: Optional[str] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """查询最近的审计记录
+
+        Args:
+            user: 用户标识（可选，用于过滤）
+            limit: 返回的记录数量限制
+
+        Returns:
+            List[Dict]: 按时间顺序排列的最近 limit 条记录
+        """
+        source = self._by_user.get(user, ()) if user else self._entries
+        latest = list(islice(reversed(source), limit))
+        latest.reverse()
+        return latest
+
+    def stats(self) -> Dict[str, int]:
+        """获取审计日志统计信息"""
+        return {
+            "in_memory": len(self._entries),
+            "users": len(self._by_user),
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "pending": self._queue.qsize() if self._queue is not None else 0
+        }
+
+    def _ensure_writer(self):
+        """在有运行中的事件循环时启动后台写入任务"""
+        if self._writer is not None and not self._writer.done():
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        self._writer = loop.create_task(self._write_periodically())
+
+    async def _write_periodically(self):
+        """后台写入任务：攒批后写入文件"""
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            try:
+                lines = "".join(
+                    json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+                    for entry in batch
+                )
+                await asyncio.to_thread(self._write_lines, lines)
+                self.written += len(batch)
+            except Exception as e:
+                logger.error(f"写入审计日志失败: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_lines(self, lines: str):
+        """追加写入文件，超过大小上限时先轮转"""
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def _rotate(self):
+        """轮转文件：audit.jsonl -> audit.jsonl.1 -> ... -> audit.jsonl.N"""
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+
+        os.replace(self.path, f"{self.path}.1")
+
+    async def flush(self):
+        """等待所有待写入的记录落盘"""
+        if self._queue is None:
+            return
+
+        self._ensure_writer()
+        await self._queue.join()
+
+    async def close(self):
+        """写完剩余记录并停止后台任务"""
+        await self.flush()
+
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
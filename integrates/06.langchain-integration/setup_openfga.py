@@ -6,13 +6,16 @@ OpenFGA 设置脚本
 """
 
 import asyncio
-import json
 import os
 import sys
 from typing import Optional
 import aiohttp
 from dotenv import load_dotenv
 
+# 复用 01 示例中的 .fga 解析器
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "01.python-sdk-basic"))
+from fga_dsl import load_model, FgaSyntaxError  # noqa: E402
+
 # 加载环境变量
 load_dotenv()
 
@@ -70,17 +73,16 @@ class OpenFGASetup:
         Returns:
             Optional[str]: Model ID，失败返回 None
         """
-        # 读取模型文件
+        # 读取模型文件并转换为 JSON 格式（解析结果按内容哈希缓存）
         try:
-            with open(model_file, "r", encoding="utf-8") as f:
-                model_content = f.read()
+            model_json = load_model(model_file)
+        except FgaSyntaxError as e:
+            print(f"❌ 授权模型格式错误: {e}")
+            return None
         except Exception as e:
             print(f"❌ 读取模型文件失败: {e}")
             return None
 
-        # 转换为 JSON 格式
-        model_json = self._fga_to_json(model_content)
-
         url = f"{self.api_url}/stores/{store_id}/authorization-models"
 
         async with aiohttp.ClientSession() as session:
@@ -99,177 +101,6 @@ class OpenFGASetup:
                 print(f"❌ 上传授权模型时发生错误: {e}")
                 return None
 
-    def _fga_to_json(self, fga_content: str) -> dict:
-        """将 FGA 格式转换为 JSON 格式
-
-        Args:
-            fga_content: FGA 格式的模型内容
-
-        Returns:
-            dict: JSON 格式的模型
-        """
-        # 这是一个简化的转换，实际应用中可能需要更复杂的解析
-        # 这里我们直接返回一个预定义的 JSON 结构
-
-        return {
-            "schema_version": "1.1",
-            "type_definitions": [
-                {
-                    "type": "user"
-                },
-                {
-                    "type": "agent",
-                    "relations": {
-                        "owner": {
-                            "this": {}
-                        }
-                    },
-                    "metadata": {
-                        "relations": {
-                            "owner": {
-                                "directly_related_user_types": [
-                                    {"type": "user"}
-                                ]
-                            },
-                            "can_act_as": {
-                                "directly_related_user_types": [
-                                    {"type": "user"}
-                                ]
-                            }
-                        }
-                    }
-                },
-                {
-                    "type": "document",
-                    "relations": {
-                        "owner": {
-                            "this": {}
-                        },
-                        "viewer": {
-                            "union": {
-                                "child": [
-                                    {"this": {}},
-                                    {"computedUserset": {"relation": "owner"}}
-                                ]
-                            }
-                        },
-                        "editor": {
-                            "union": {
-                                "child": [
-                                    {"this": {}},
-                                    {"computedUserset": {"relation": "owner"}}
-                                ]
-                            }
-                        },
-                        "can_read": {
-                            "computedUserset": {"relation": "viewer"}
-                        },
-                        "can_write": {
-                            "computedUserset": {"relation": "editor"}
-                        }
-                    },
-                    "metadata": {
-                        "relations": {
-                            "owner": {
-                                "directly_related_user_types": [
-                                    {"type": "user"}
-                                ]
-                            },
-                            "viewer": {
-                                "directly_related_user_types": [
-                                    {"type": "user"},
-                                    {"type": "agent"}
-                                ]
-                            },
-                            "editor": {
-                                "directly_related_user_types": [
-                                    {"type": "user"}
-                                ]
-                            }
-                        }
-                    }
-                },
-                {
-                    "type": "database",
-                    "relations": {
-                        "owner": {
-                            "this": {}
-                        },
-                        "reader": {
-                            "union": {
-                                "child": [
-                                    {"this": {}},
-                                    {"computedUserset": {"relation": "owner"}}
-                                ]
-                            }
-                        },
-                        "admin": {
-                            "union": {
-                                "child": [
-                                    {"this": {}},
-                                    {"computedUserset": {"relation": "owner"}}
-                                ]
-                            }
-                        },
-                        "can_query": {
-                            "computedUserset": {"relation": "reader"}
-                        },
-                        "can_manage": {
-                            "computedUserset": {"relation": "admin"}
-                        }
-                    },
-                    "metadata": {
-                        "relations": {
-                            "owner": {
-                                "directly_related_user_types": [
-                                    {"type": "user"}
-                                ]
-                            },
-                            "reader": {
-                                "directly_related_user_types": [
-                                    {"type": "user"},
-                                    {"type": "agent"}
-                                ]
-                            },
-                            "admin": {
-                                "directly_related_user_types": [
-                                    {"type": "user"}
-                                ]
-                            }
-                        }
-                    }
-                },
-                {
-                    "type": "sensitive_operation",
-                    "relations": {
-                        "owner": {
-                            "this": {}
-                        },
-                        "approver": {
-                            "this": {}
-                        },
-                        "can_execute": {
-                            "computedUserset": {"relation": "approver"}
-                        }
-                    },
-                    "metadata": {
-                        "relations": {
-                            "owner": {
-                                "directly_related_user_types": [
-                                    {"type": "user"}
-                                ]
-                            },
-                            "approver": {
-                                "directly_related_user_types": [
-                                    {"type": "user"}
-                                ]
-                            }
-                        }
-                    }
-                }
-            ]
-        }
-
     def save_env_file(self, store_id: str, model_id: str):
         """保存环境变量到 .env 文件
 
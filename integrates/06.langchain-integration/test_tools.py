@@ -9,6 +9,7 @@ import asyncio
 from unittest.mock import Mock, AsyncMock, patch
 
 from agent_permissions import OpenFGAPermissionChecker, PermissionCache
+from audit import AuditLog
 from tools import (
     ProtectedDocumentReadTool,
     ProtectedDocumentWriteTool,
@@ -81,6 +82,239 @@ class TestPermissionCache:
         result = cache.get(key)
         assert result is None
 
+    def test_cache_lru_eviction(self):
+        """测试超出容量时淘汰最久未使用的条目"""
+        cache = PermissionCache(ttl_seconds=60, max_size=2)
+
+        cache.set("a", True)
+        cache.set("b", True)
+
+        # 访问 a，使 b 成为最久未使用的条目
+        assert cache.get("a") is True
+
+        cache.set("c", False)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is True
+        assert cache.get("c") is False
+        assert cache.stats()["evictions"] == 1
+        assert len(cache.cache) == 2
+
+    def test_cache_sweep(self):
+        """测试清理过期条目"""
+        cache = PermissionCache(ttl_seconds=0)
+        cache.set("a", True)
+        cache.set("b", False)
+
+        assert cache.sweep() == 2
+        assert len(cache.cache) == 0
+        assert cache.stats()["expirations"] == 2
+
+    def test_cache_stats(self):
+        """测试命中率统计"""
+        cache = PermissionCache(ttl_seconds=60)
+        cache.set("a", True)
+
+        cache.get("a")
+        cache.get("a")
+        cache.get("missing")
+
+        stats = cache.stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+    @pytest.mark.asyncio
+    async def test_cache_single_flight(self):
+        """测试并发未命中只触发一次加载"""
+        cache = PermissionCache(ttl_seconds=60)
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return True
+
+        results = await asyncio.gather(
+            *[cache.get_or_load("a", loader) for _ in range(5)]
+        )
+
+        assert results == [True] * 5
+        assert calls == 1
+        assert cache.stats()["coalesced"] == 4
+
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_cache_leader_cancelled(self):
+        """测试发起加载的调用被取消时，等待者重新加载而不是收到 CancelledError"""
+        cache = PermissionCache(ttl_seconds=60)
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05 if calls == 1 else 0.01)
+            return True
+
+        leader = asyncio.ensure_future(cache.get_or_load("a", loader))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(cache.get_or_load("a", loader)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        assert await asyncio.gather(*waiters) == [True] * 3
+        assert leader.cancelled()
+        assert calls == 2
+
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_cache_load_failure_not_cached(self):
+        """测试加载失败不会写入缓存"""
+        cache = PermissionCache(ttl_seconds=60)
+
+        async def failing_loader():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load("a", failing_loader)
+
+        assert "a" not in cache.cache
+
+    def test_invalidate_tuple_by_object_and_user(self):
+        """测试元组变更只清理受影响的条目"""
+        cache = PermissionCache(ttl_seconds=60)
+        entries = [
+            ("agent:a", "viewer", "document:doc1"),
+            ("agent:b", "viewer", "document:doc1"),
+            ("agent:a", "viewer", "document:doc2"),
+            ("agent:c", "viewer", "document:doc3"),
+        ]
+        for user, relation, object in entries:
+            cache.set(
+                PermissionCache.make_key(user, relation, object),
+                True,
+                user=user,
+                object=object
+            )
+
+        removed = cache.invalidate_tuple("agent:a", "editor", "document:doc1")
+
+        assert removed == 3
+        assert cache.get(PermissionCache.make_key("agent:c", "viewer", "document:doc3")) is True
+
+    def test_invalidate_type_for_userset(self):
+        """测试用户集元组使对象类型及依赖类型整体失效"""
+        cache = PermissionCache(ttl_seconds=60, type_dependents={"folder": ["document"]})
+        doc_key = PermissionCache.make_key("user:alice", "viewer", "document:doc1")
+        db_key = PermissionCache.make_key("user:alice", "reader", "database:db1")
+        cache.set(doc_key, True, user="user:alice", object="document:doc1")
+        cache.set(db_key, True, user="user:alice", object="database:db1")
+
+        cache.invalidate_tuple("group:eng#member", "viewer", "folder:f1")
+
+        assert cache.get(doc_key) is None
+        assert cache.get(db_key) is True
+
+    @pytest.mark.asyncio
+    async def test_checker_uses_cache(self):
+        """测试权限检查器复用缓存结果"""
+        cache = PermissionCache(ttl_seconds=60)
+        checker = OpenFGAPermissionChecker(
+            api_url="http://localhost:8080",
+            store_id="01HTESTSTORE0000000000000",
+            model_id="01HTESTMODEL0000000000000",
+            enable_audit=False,
+            cache=cache
+        )
+        checker.client.check = AsyncMock(return_value=Mock(allowed=True))
+
+        for _ in range(3):
+            assert await checker.check_permission(
+                user="agent:test",
+                relation="can_read",
+                object="document:doc1"
+            ) is True
+
+        checker.client.check.assert_called_once()
+        assert cache.stats()["hits"] == 2
+
+        # 撤销权限后缓存失效，下一次检查重新请求 OpenFGA
+        checker.client.write = AsyncMock()
+        await checker.revoke_permission(
+            user="agent:test",
+            relation="viewer",
+            object="document:doc1"
+        )
+        await checker.check_permission(
+            user="agent:test",
+            relation="can_read",
+            object="document:doc1"
+        )
+        assert checker.client.check.call_count == 2
+
+        await checker.close()
+
+
+class TestAuditLog:
+    """测试审计日志"""
+
+    def test_ring_buffer_is_bounded(self):
+        """测试内存中的记录数有上限"""
+        audit = AuditLog(capacity=3, per_user_capacity=2)
+
+        for i in range(5):
+            audit.record({"user": "agent:a", "object": f"document:doc{i}"})
+
+        assert [log["object"] for log in audit.query(limit=10)] == [
+            "document:doc2", "document:doc3", "document:doc4"
+        ]
+        assert len(audit.query(user="agent:a", limit=10)) == 2
+
+    def test_user_index_bounded_by_ring(self):
+        """测试缓冲区淘汰的记录同时从用户索引中移除"""
+        audit = AuditLog(capacity=3)
+
+        audit.record({"user": "agent:a", "object": "document:doc0"})
+        audit.record({"user": "agent:b", "object": "document:doc1"})
+        for i in range(2, 5):
+            audit.record({"user": "agent:b", "object": f"document:doc{i}"})
+
+        assert audit.query(user="agent:a", limit=10) == []
+        assert [log["object"] for log in audit.query(user="agent:b", limit=10)] == [
+            "document:doc2", "document:doc3", "document:doc4"
+        ]
+        assert len(audit) == 3 and audit.stats()["users"] == 1
+        assert audit.all() == audit.query(limit=10)
+
+    def test_query_by_user(self):
+        """测试按用户查询"""
+        audit = AuditLog()
+        audit.record({"user": "agent:a", "object": "document:doc1"})
+        audit.record({"user": "agent:b", "object": "document:doc2"})
+        audit.record({"user": "agent:a", "object": "document:doc3"})
+
+        logs = audit.query(user="agent:a", limit=1)
+
+        assert [log["object"] for log in logs] == ["document:doc3"]
+        assert audit.query(user="agent:unknown") == []
+
+    @pytest.mark.asyncio
+    async def test_writes_rotating_jsonl(self, tmp_path):
+        """测试后台批量写入并按大小轮转文件"""
+        audit = AuditLog(log_dir=str(tmp_path), max_bytes=100, backup_count=2, batch_size=2)
+
+        for i in range(10):
+            audit.record({"user": "agent:a", "object": f"document:doc{i}"})
+
+        await audit.close()
+
+        files = sorted(path.name for path in tmp_path.iterdir())
+        assert files == ["audit.jsonl", "audit.jsonl.1", "audit.jsonl.2"]
+        assert audit.stats()["written"] == 10
+
 
 class TestProtectedDocumentReadTool:
     """测试文档读取工具"""
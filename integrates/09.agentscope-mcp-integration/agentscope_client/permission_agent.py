@@ -154,18 +154,22 @@ class PermissionAgent:
         self,
         user: str,
         relation: str,
-        object_type: str
+        object_type: str,
+        max_results: int = 100,
+        continuation_token: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        列出用户有权限的对象
+        列出用户有权限的对象（分页）
 
         Args:
             user: 用户标识
             relation: 关系类型
             object_type: 对象类型
+            max_results: 本页最大返回结果数
+            continuation_token: 上一页返回的翻页令牌（可选）
 
         Returns:
-            对象列表
+            对象列表，还有更多结果时包含 continuation_token
         """
         func = await self.mcp_client.get_callable_function(
             func_name="list_objects",
@@ -175,7 +179,9 @@ class PermissionAgent:
         result = await func(
             user=user,
             relation=relation,
-            object_type=object_type
+            object_type=object_type,
+            max_results=max_results,
+            continuation_token=continuation_token
         )
 
         return result
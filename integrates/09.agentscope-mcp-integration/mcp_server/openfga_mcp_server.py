@@ -16,37 +16,145 @@ OpenFGA MCP Server
 """
 
 import asyncio
+import base64
+import bisect
+import json
+import logging
 import os
-from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Tuple
 
 from mcp.server.fastmcp import FastMCP
 from openfga_sdk import OpenFgaClient, ClientConfiguration
-from openfga_sdk.client.models import ClientTuple, ClientCheckRequest
+from openfga_sdk.client.models import (
+    ClientTuple,
+    ClientCheckRequest,
+    ClientBatchCheckRequest,
+    ClientBatchCheckItem,
+    ClientListObjectsRequest,
+    ClientWriteRequest,
+    WriteTransactionOpts,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP):
+    """服务器关闭时停止模型 ID 刷新任务并关闭 OpenFGA 客户端"""
+    try:
+        yield
+    finally:
+        await close_openfga_client()
 
 
 # 初始化 FastMCP 服务器
-mcp = FastMCP("OpenFGA Permission Service")
+mcp = FastMCP("OpenFGA Permission Service", lifespan=_lifespan)
+
+
+# 服务端单次 Write 请求默认允许的最大元组数
+MAX_TUPLES_PER_WRITE = 100
+
+
+# 未配置 OPENFGA_MODEL_ID 时，刷新最新授权模型 ID 的间隔（秒），0 表示只解析一次
+MODEL_REFRESH_INTERVAL = float(os.getenv("OPENFGA_MODEL_REFRESH_INTERVAL", "60"))
 
 
 # 全局 OpenFGA 客户端
 _openfga_client: Optional[OpenFgaClient] = None
+_model_refresh_task: Optional[asyncio.Task] = None
+# 并发的首次工具调用只创建一个客户端和一个刷新任务
+_client_lock = asyncio.Lock()
+
+
+async def resolve_model_id(client: OpenFgaClient) -> Optional[str]:
+    """
+    读取最新的授权模型 ID 并固定到客户端配置
+
+    请求不带 authorization_model_id 时服务端每次都要先查找最新模型，
+    固定后每个请求都会带上模型 ID。模型变化时直接替换配置中的 ID。
+    """
+    response = await client.read_authorization_models({"page_size": 1})
+    models = response.authorization_models or []
+    if models and models[0].id != client.get_authorization_model_id():
+        logger.info(f"使用授权模型: {models[0].id}")
+        client.set_authorization_model_id(models[0].id)
+    return client.get_authorization_model_id()
+
+
+async def _refresh_model_id(client: OpenFgaClient, interval: float):
+    """后台定期刷新授权模型 ID，单次失败继续使用当前模型"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await resolve_model_id(client)
+        except Exception as e:
+            logger.warning(f"刷新授权模型 ID 失败: {e}")
 
 
 async def get_openfga_client() -> OpenFgaClient:
-    """获取或创建 OpenFGA 客户端"""
-    global _openfga_client
+    """
+    获取或创建 OpenFGA 客户端
 
-    if _openfga_client is None:
+    未配置 OPENFGA_MODEL_ID 时，首次创建客户端时解析最新授权模型 ID，
+    并启动后台任务定期刷新。
+    """
+    global _openfga_client, _model_refresh_task
+
+    if _openfga_client is not None:
+        return _openfga_client
+
+    async with _client_lock:
+        if _openfga_client is not None:
+            return _openfga_client
+
+        model_id = os.getenv("OPENFGA_MODEL_ID") or None
         config = ClientConfiguration(
             api_url=os.getenv("OPENFGA_API_URL", "http://localhost:8080"),
             store_id=os.getenv("OPENFGA_STORE_ID"),
-            authorization_model_id=os.getenv("OPENFGA_MODEL_ID"),
+            authorization_model_id=model_id,
         )
-        _openfga_client = OpenFgaClient(config)
+        client = OpenFgaClient(config)
+
+        if model_id is None:
+            try:
+                await resolve_model_id(client)
+            except Exception as e:
+                # 解析失败时由服务端选择最新模型，后台任务继续尝试
+                logger.error(f"解析授权模型 ID 失败: {e}")
+            if MODEL_REFRESH_INTERVAL > 0:
+                _model_refresh_task = asyncio.create_task(
+                    _refresh_model_id(client, MODEL_REFRESH_INTERVAL)
+                )
+
+        _openfga_client = client
 
     return _openfga_client
 
 
+async def close_openfga_client():
+    """
+    停止后台刷新任务并关闭 OpenFGA 客户端
+
+    之后的工具调用会重新创建客户端。
+    """
+    global _openfga_client, _model_refresh_task
+
+    async with _client_lock:
+        task, _model_refresh_task = _model_refresh_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        client, _openfga_client = _openfga_client, None
+        if client is not None:
+            await client.close()
+
+
 @mcp.tool()
 async def check_permission(
     user: str,
@@ -101,15 +209,66 @@ async def check_permission(
         }
 
 
+async def _write_chunked(
+    client: OpenFgaClient,
+    operation: str,
+    tuples: List[Dict[str, str]],
+    max_parallel_requests: int
+) -> Dict[str, Any]:
+    """
+    写入或删除元组，超过单次上限时拆块并发执行
+
+    不超过 MAX_TUPLES_PER_WRITE 时是单个事务，要么全部成功要么全部失败；
+    超过时使用 SDK 的非事务模式，块之间互不影响，返回逐元组的失败列表。
+    """
+    client_tuples = [
+        ClientTuple(
+            user=t["user"],
+            relation=t["relation"],
+            object=t["object"]
+        )
+        for t in tuples
+    ]
+    if operation == "write":
+        body = ClientWriteRequest(writes=client_tuples)
+    else:
+        body = ClientWriteRequest(deletes=client_tuples)
+
+    if len(tuples) <= MAX_TUPLES_PER_WRITE:
+        await client.write(body)
+        return {"succeeded": len(tuples), "failed": []}
+
+    response = await client.write(body, {
+        "transaction": WriteTransactionOpts(
+            disabled=True,
+            max_per_chunk=MAX_TUPLES_PER_WRITE,
+            max_parallel_requests=max_parallel_requests
+        )
+    })
+    results = response.writes if operation == "write" else response.deletes
+
+    failed = [
+        {"tuple": t, "error": str(r.error)}
+        for t, r in zip(tuples, results)
+        if not r.success
+    ]
+    return {"succeeded": len(tuples) - len(failed), "failed": failed}
+
+
 @mcp.tool()
 async def write_tuples(
-    tuples: List[Dict[str, str]]
+    tuples: List[Dict[str, str]],
+    max_parallel_requests: int = 10
 ) -> Dict[str, Any]:
     """
     写入关系元组到 OpenFGA
 
+    超过 100 个元组时自动拆块并发写入，块之间不是事务，
+    部分失败时返回 failed 列表说明哪些元组没有写入。
+
     Args:
         tuples: 关系元组列表，每个元组包含 user, relation, object
+        max_parallel_requests: 拆块后最多同时发送的请求数
 
     Returns:
         写入结果
@@ -123,21 +282,12 @@ async def write_tuples(
     client = await get_openfga_client()
 
     try:
-        client_tuples = [
-            ClientTuple(
-                user=t["user"],
-                relation=t["relation"],
-                object=t["object"]
-            )
-            for t in tuples
-        ]
-
-        await client.write(writes=client_tuples)
+        result = await _write_chunked(client, "write", tuples, max_parallel_requests)
 
         return {
-            "success": True,
-            "tuples_written": len(tuples),
-            "tuples": tuples
+            "success": not result["failed"],
+            "tuples_written": result["succeeded"],
+            "failed": result["failed"]
         }
     except Exception as e:
         return {
@@ -148,13 +298,17 @@ async def write_tuples(
 
 @mcp.tool()
 async def delete_tuples(
-    tuples: List[Dict[str, str]]
+    tuples: List[Dict[str, str]],
+    max_parallel_requests: int = 10
 ) -> Dict[str, Any]:
     """
     删除关系元组
 
+    超过 100 个元组时自动拆块并发删除，块之间不是事务。
+
     Args:
         tuples: 要删除的关系元组列表
+        max_parallel_requests: 拆块后最多同时发送的请求数
 
     Returns:
         删除结果
@@ -167,21 +321,12 @@ async def delete_tuples(
     client = await get_openfga_client()
 
     try:
-        client_tuples = [
-            ClientTuple(
-                user=t["user"],
-                relation=t["relation"],
-                object=t["object"]
-            )
-            for t in tuples
-        ]
-
-        await client.write(deletes=client_tuples)
+        result = await _write_chunked(client, "delete", tuples, max_parallel_requests)
 
         return {
-            "success": True,
-            "tuples_deleted": len(tuples),
-            "tuples": tuples
+            "success": not result["failed"],
+            "tuples_deleted": result["succeeded"],
+            "failed": result["failed"]
         }
     except Exception as e:
         return {
@@ -190,24 +335,63 @@ async def delete_tuples(
         }
 
 
+def _encode_list_token(
+    user: str, relation: str, object_type: str, after: Optional[str], seen: List[str]
+) -> str:
+    """生成 list_objects 的不透明翻页令牌（记录排序后上一页最后一个对象和第一页返回的对象）"""
+    payload = json.dumps(
+        {"u": user, "r": relation, "t": object_type, "a": after, "s": seen},
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def _decode_list_token(
+    token: str, user: str, relation: str, object_type: str
+) -> Tuple[Optional[str], List[str]]:
+    """解析翻页令牌，返回 (after, seen)；令牌与查询参数不匹配时抛出 ValueError"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        after, seen = payload["a"], payload["s"]
+    except Exception:
+        raise ValueError("无效的 continuation_token")
+
+    if (payload.get("u"), payload.get("r"), payload.get("t")) != (user, relation, object_type) \
+            or not (after is None or isinstance(after, str)) or not isinstance(seen, list):
+        raise ValueError("continuation_token 与查询参数不匹配")
+
+    return after, seen
+
+
 @mcp.tool()
 async def list_objects(
     user: str,
     relation: str,
     object_type: str,
-    max_results: int = 100
+    max_results: int = 100,
+    continuation_token: Optional[str] = None
 ) -> Dict[str, Any]:
     """
-    列出用户有权限访问的所有对象
+    列出用户有权限访问的对象（分页）
+
+    使用 OpenFGA 的 StreamedListObjects 接口。第一页收到 max_results 个对象后立即停止读取，
+    不等服务端算完全部结果；还有更多结果时返回 continuation_token，传回该令牌即可获取下一页。
+
+    注意：ListObjects 没有服务端分页，服务端并发计算结果，流中对象的顺序不固定。
+    第一页按到达顺序返回；之后的页需要读取完整结果，去掉第一页已返回的对象后
+    按对象标识排序，从上一页最后一个对象之后继续，页与页之间不会重复。
+    令牌中带有第一页返回的对象，max_results 越大令牌越长。翻页期间元组发生变化时，
+    新增或失去权限的对象可能出现在后续页中，也可能被遗漏。
 
     Args:
         user: 用户标识
         relation: 关系类型
         object_type: 对象类型
-        max_results: 最大返回结果数
+        max_results: 本页最大返回结果数
+        continuation_token: 上一页返回的翻页令牌（可选）
 
     Returns:
-        用户有权限的对象列表
+        用户有权限的对象列表，以及 has_more 和 continuation_token
 
     Example:
         list_objects(
@@ -219,13 +403,40 @@ async def list_objects(
     client = await get_openfga_client()
 
     try:
-        response = await client.list_objects(
-            user=user,
-            relation=relation,
-            type=object_type
+        max_results = max(1, max_results)
+        stream = client.streamed_list_objects(
+            ClientListObjectsRequest(
+                user=user,
+                relation=relation,
+                type=object_type
+            )
         )
 
-        objects = response.objects[:max_results] if response.objects else []
+        if not continuation_token:
+            # 多读一个对象用于判断是否还有下一页，读够后关闭流
+            arrived: Dict[str, None] = {}
+            try:
+                async for response in stream:
+                    arrived[response.object] = None
+                    if len(arrived) > max_results:
+                        break
+            finally:
+                await stream.aclose()
+
+            objects = list(arrived)[:max_results]
+            has_more = len(arrived) > max_results
+            token = _encode_list_token(user, relation, object_type, None, objects) if has_more else None
+        else:
+            after, seen = _decode_list_token(continuation_token, user, relation, object_type)
+            seen_set = set(seen)
+            remaining = sorted(
+                {response.object async for response in stream} - seen_set
+            )
+
+            start = bisect.bisect_right(remaining, after) if after is not None else 0
+            objects = remaining[start:start + max_results]
+            has_more = start + max_results < len(remaining)
+            token = _encode_list_token(user, relation, object_type, objects[-1], seen) if has_more else None
 
         return {
             "success": True,
@@ -233,7 +444,9 @@ async def list_objects(
             "relation": relation,
             "object_type": object_type,
             "objects": objects,
-            "count": len(objects)
+            "count": len(objects),
+            "has_more": has_more,
+            "continuation_token": token
         }
     except Exception as e:
         return {
@@ -245,16 +458,27 @@ async def list_objects(
 
 @mcp.tool()
 async def batch_check(
-    checks: List[Dict[str, str]]
+    checks: List[Dict[str, str]],
+    chunk_size: int = 50,
+    max_parallel_requests: int = 5,
+    timeout_seconds: float = 25.0
 ) -> Dict[str, Any]:
     """
     批量检查多个权限
 
+    检查项按 chunk_size 分块，每块通过一次 OpenFGA BatchCheck 请求完成，
+    最多 max_parallel_requests 个块并发执行。单个检查项或单个块失败只影响
+    对应的结果，超过 timeout_seconds 仍未完成的块会被取消并标记为超时，
+    保证大批量请求也能在 MCP 调用超时之前返回。
+
     Args:
-        checks: 权限检查列表，每个包含 user, relation, object
+        checks: 权限检查列表，每个包含 user, relation, object，可选 context
+        chunk_size: 每个 BatchCheck 请求包含的检查项数（OpenFGA 默认上限 50）
+        max_parallel_requests: 最大并发请求数
+        timeout_seconds: 整个批量检查的时间预算（秒）
 
     Returns:
-        批量检查结果
+        批量检查结果，results 与 checks 顺序一致
 
     Example:
         batch_check([
@@ -264,34 +488,95 @@ async def batch_check(
     """
     client = await get_openfga_client()
 
-    results = []
-    for check in checks:
-        try:
-            response = await client.check(
-                ClientCheckRequest(
-                    user=check["user"],
-                    relation=check["relation"],
-                    object=check["object"]
-                )
+    def make_result(index: int, allowed: bool, error: Optional[str] = None) -> Dict[str, Any]:
+        check = checks[index]
+        result = {
+            "user": check.get("user"),
+            "relation": check.get("relation"),
+            "object": check.get("object"),
+            "allowed": allowed
+        }
+        if error:
+            result["error"] = error
+        return result
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(checks)
+
+    # 先校验字段，缺失字段的检查项直接返回错误
+    valid_indices = []
+    for index, check in enumerate(checks):
+        missing = [field for field in ("user", "relation", "object") if not check.get(field)]
+        if missing:
+            results[index] = make_result(index, False, f"缺少字段: {', '.join(missing)}")
+        else:
+            valid_indices.append(index)
+
+    chunk_size = max(1, chunk_size)
+    chunks = [
+        valid_indices[start:start + chunk_size]
+        for start in range(0, len(valid_indices), chunk_size)
+    ]
+    semaphore = asyncio.Semaphore(max(1, max_parallel_requests))
+
+    async def run_chunk(indices: List[int]):
+        async with semaphore:
+            response = await client.batch_check(
+                ClientBatchCheckRequest(
+                    checks=[
+                        ClientBatchCheckItem(
+                            user=checks[index]["user"],
+                            relation=checks[index]["relation"],
+                            object=checks[index]["object"],
+                            context=checks[index].get("context"),
+                            correlation_id=str(index)
+                        )
+                        for index in indices
+                    ]
+                ),
+                options={"max_batch_size": chunk_size}
             )
-            results.append({
-                "user": check["user"],
-                "relation": check["relation"],
-                "object": check["object"],
-                "allowed": response.allowed
-            })
-        except Exception as e:
-            results.append({
-                "user": check["user"],
-                "relation": check["relation"],
-                "object": check["object"],
-                "allowed": False,
-                "error": str(e)
-            })
+
+        for item in response.result:
+            index = int(item.correlation_id)
+            error = None
+            if item.error:
+                error = getattr(item.error, "message", None) or str(item.error)
+            results[index] = make_result(index, bool(item.allowed) and not error, error)
+
+    tasks = {asyncio.create_task(run_chunk(indices)): indices for indices in chunks}
+    timed_out = 0
+
+    if tasks:
+        done, pending = await asyncio.wait(tasks, timeout=timeout_seconds)
+
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        for task, indices in tasks.items():
+            if task in pending:
+                timed_out += len(indices)
+                error = f"超时: 未在 {timeout_seconds} 秒内完成"
+            elif task.exception() is not None:
+                error = str(task.exception())
+            else:
+                continue
+
+            for index in indices:
+                if results[index] is None:
+                    results[index] = make_result(index, False, error)
+
+    for index, result in enumerate(results):
+        if result is None:
+            results[index] = make_result(index, False, "缺少检查结果")
 
     return {
         "success": True,
         "total_checks": len(checks),
+        "allowed_count": sum(1 for result in results if result["allowed"]),
+        "error_count": sum(1 for result in results if "error" in result),
+        "timed_out": timed_out,
         "results": results
     }
 